@@ -1,12 +1,69 @@
-from flask import Flask, jsonify
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from flask_cors import CORS
-import pandas as pd
 
+import http_cache
+import leak_io
+from compiled_model import compiled_model_path
+from dataset_registry import DEFAULT_MEMORY_BUDGET, DatasetRegistry, UnknownDataset
+from fast_json import FastJSONProvider
+from leak_cascade import DEFAULT_CLEAR_BELOW, DEFAULT_LEAK_FROM, DetectionCascade
 from leak_detector_ml import LeakDetectorML
+from leak_results import ScanResults
+from leak_events import EventBroadcaster
+from leak_store import COLUMNS, INDEXED_FIELDS, LeakStore
+from leak_timeline import TIMELINE_FIELDS
+from metrics import (
+    CONTENT_TYPE, HTTP_REQUEST_SECONDS, PROFILER, REGISTRY, RESPONSE_CACHE, STAGE_SECONDS, cache_family,
+)
+from model_reload import DEFAULT_WATCH_INTERVAL, ModelReloader
+from scan_jobs import DEFAULT_WORKERS, JOB_PRIORITIES, JobDB, ScanJobScheduler
+from score_db import ScoreDB
 
 
 app = Flask(__name__)
-CORS(app)  # allow React frontend to call the API
+app.json = FastJSONProvider(app)
+# allow React frontend to call the API (and read the paging headers)
+CORS(app, expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag"])
+
+# Dataset to serve, and its scored entries, persisted so restarts don't
+# rescan everything. Overridable to run an instance on other data.
+DATA_PATH = os.environ.get("LEAK_DATA_PATH", "sample_data.json")
+SCORE_DB_PATH = os.environ.get("LEAK_SCORE_DB", "scan_results.db")
+
+# Background scan jobs (see scan_jobs.py): their checkpoints, the
+# directory job paths are relative to (and confined to), and how many
+# jobs run at once.
+JOBS_DB_PATH = os.environ.get("LEAK_JOBS_DB", "scan_jobs.db")
+SCAN_ROOT = os.environ.get("LEAK_SCAN_ROOT", ".")
+JOB_WORKERS = int(os.environ.get("LEAK_JOB_WORKERS", DEFAULT_WORKERS))
+
+# Further datasets, loaded on first use by ?dataset=<id> (see
+# dataset_registry.py), and the memory (MB) they may take before the least
+# recently used are evicted.
+DATASETS_DIR = os.environ.get("LEAK_DATASETS_DIR", "datasets")
+DATASET_MEMORY_MB = float(os.environ.get("LEAK_DATASET_MEMORY_MB", DEFAULT_MEMORY_BUDGET >> 20))
+
+# Set by serve.py when several worker processes share one copy of the
+# loaded data: writes would only reach one worker's store, so refuse them.
+READ_ONLY = bool(os.environ.get("LEAK_READ_ONLY"))
+
+# Query parameters understood by GET /api/leaks
+LEAK_QUERY_PARAMS = {
+    "limit", "offset", "cursor", "sort", "fields", "exclude", "date_from", "date_to", "dedup", "dataset",
+    *INDEXED_FIELDS,
+}
+
+# Fields /api/leaks?dedup=1 adds to each row.
+CLUSTER_FIELDS = ["cluster_id", "cluster_size"]
+
+# Query parameters understood by GET /api/timeline
+TIMELINE_QUERY_PARAMS = {"granularity", "fields", "date_from", "date_to", "dataset"}
 
 
 # ------------------------------------------------------------
@@ -14,74 +71,193 @@ CORS(app)  # allow React frontend to call the API
 # ------------------------------------------------------------
 
 # api.py is inside backend/, models/ is one level up → ../models/leak_model.pkl
-detector = LeakDetectorML(model_path="../models/leak_model.pkl")
+# The compiled export (see compiled_model.py) loads without sklearn and
+# scores identically, so prefer it when train_model.py has produced one
+# from the current pickle.
+MODEL_PATH = "../models/leak_model.pkl"
+COMPILED_MODEL_PATH = "../models/leak_model_compiled"
+
+
+# LEAK_CASCADE=1 puts the rule engine in front of the model: entries it
+# finds clearly clean or clearly leaked skip ML inference (see
+# leak_cascade.py). Its thresholds are rule scores (0-100).
+# LEAK_CASCADE=keywords only clears entries without any pattern keyword.
+CASCADE = os.environ.get("LEAK_CASCADE", "")
+CASCADE_CLEAR_BELOW = int(os.environ.get("LEAK_CASCADE_CLEAR_BELOW", DEFAULT_CLEAR_BELOW))
+CASCADE_LEAK_FROM = int(os.environ.get("LEAK_CASCADE_LEAK_FROM", DEFAULT_LEAK_FROM))
+
+# JSON file the detector's score cache (see score_cache.py) is loaded from
+# when a model is loaded and saved to at exit, so a restart does not score
+# texts it has seen again. Entries are keyed by model version, so those of
+# another model are never served, only evicted over time.
+SCORE_CACHE_PATH = os.environ.get("LEAK_SCORE_CACHE")
+
+
+def _load_detector() -> LeakDetectorML:
+    detector = LeakDetectorML(
+        model_path=compiled_model_path(MODEL_PATH, COMPILED_MODEL_PATH),
+        cascade=DetectionCascade(CASCADE_CLEAR_BELOW, CASCADE_LEAK_FROM, keywords_only=CASCADE == "keywords")
+        if CASCADE else None,
+    )
+    if SCORE_CACHE_PATH and detector.cache is not None:
+        try:
+            print(f"[INFO] Loaded {detector.cache.load(SCORE_CACHE_PATH)} cached scores from {SCORE_CACHE_PATH}")
+        except (OSError, ValueError) as e:
+            print(f"[WARN] Could not load the score cache from {SCORE_CACHE_PATH}: {e}")
+    return detector
+
+
+def _save_score_cache() -> None:
+    if detector.cache is not None:
+        detector.cache.save(SCORE_CACHE_PATH)
 
-# Load sample data (same as before – JSON first, fallback to CSV)
+
+detector = _load_detector()
+# Read-only workers (see serve.py) ingest nothing, so they only read the file.
+if SCORE_CACHE_PATH and not READ_ONLY:
+    atexit.register(_save_score_cache)
+
+# Load the dataset (JSON or CSV by extension; sample_data.csv if it is missing)
+load = detector.load_csv if DATA_PATH.endswith(".csv") else detector.load_json
 try:
-    detector.load_json("sample_data.json")
+    load(DATA_PATH)
 except FileNotFoundError:
     detector.load_csv("sample_data.csv")
 
-# Run full scan using the ML detector
-scan_results = detector.scan_all()
-
-
-def build_dataframe() -> pd.DataFrame:
+# Scores persist across restarts: only entries that are new, changed or were
+# scored by another model version are scored here; the rest is read back.
+score_db = ScoreDB(SCORE_DB_PATH)
+score_db.sync(detector, detector.leaks)
+# The store keeps its own columnar copy of the entries from here on.
+detector.leaks = []
+
+# Seed the in-memory store (includes leaks ingested via POST /api/leaks)
+store = LeakStore()
+store.add_results(score_db.load_results())
+
+# Newly ingested leaks are pushed to /api/leaks/stream subscribers
+events = EventBroadcaster(last_id=len(store) - 1)
+store.add_listener(events.publish)
+
+# Held while scoring + adding ingested leaks, so a model swap never lands
+# between the two.
+ingest_lock = threading.Lock()
+
+# LEAK_DEDUP_SCORING=1: an ingested leak that near-duplicates a stored one
+# (see leak_clusters.py) takes that leak's score instead of being scored.
+DEDUP_SCORING = bool(os.environ.get("LEAK_DEDUP_SCORING"))
+
+
+def _ingest(entries, dataset=None):
+    """Score, persist and add entries (to dataset, if given); returns their store positions."""
+    target, db = (store, score_db) if dataset is None else (dataset.store, dataset.score_db)
+    with ingest_lock:
+        results = _scan_new(entries, target)
+        # Saved only once the store took them, so a batch the store rejects
+        # is not loaded again at the next start.
+        added = target.add_results(results)
+        db.save(results, detector.score_version)
+    if dataset is not None:
+        registry.trim()
+    return added
+
+
+def _scan_new(entries, target: LeakStore) -> ScanResults:
+    """Score ingested entries (near-duplicates reuse stored scores with DEDUP_SCORING)."""
+    if not DEDUP_SCORING:
+        return detector.scan_batch(entries)
+    known = target.duplicate_scores(entries)
+    todo = [e for e, proba in zip(entries, known) if proba is None]
+    fresh = iter(detector.scan_batch(todo).column("leak_probability").tolist() if todo else [])
+    results = ScanResults()
+    results.append_batch(entries, [next(fresh) if p is None else p for p in known], datetime.now().isoformat())
+    return results
+
+
+def _use_detector(new_detector: LeakDetectorML) -> None:
+    global detector
+    detector = new_detector
+    # Other datasets are re-scored by the new model as they are used again.
+    registry.clear()
+
+
+# New models are re-scored in the background and swapped in (see
+# model_reload.py); set LEAK_MODEL_WATCH=1 to reload when the files change.
+reloader = ModelReloader(store, _load_detector, _use_detector, ingest_lock, score_db)
+
+# Datasets other than the one above, scored by the same detector.
+registry = DatasetRegistry(DATASETS_DIR, lambda: detector, int(DATASET_MEMORY_MB * 2 ** 20),
+                           read_only=READ_ONLY)
+
+# Queued scans of dump files, ingested a batch at a time in the background.
+# Jobs left unfinished by the last run resume from their checkpoints.
+jobs = ScanJobScheduler(_ingest, JobDB(JOBS_DB_PATH), root=SCAN_ROOT, workers=JOB_WORKERS)
+
+
+def start_background() -> None:
     """
-    Convert ML scan_results into a DataFrame
-    with the SAME columns expected by the dashboard.
-
-    We map:
-    - leak_probability (0–1) → risk_score (0–100)
-    - risk_level (low/moderate/high) is kept
-    - prediction ('leak'/'safe') is stored in patterns for compatibility
+    Start the scan job workers and, with LEAK_MODEL_WATCH, the model file
+    watcher (neither on a read-only server). Called by the server entry
+    points rather than on import, so importing the app starts no threads.
     """
-    rows = []
-    for result in scan_results:
-        entry = result["entry"]
+    if READ_ONLY:
+        return
+    jobs.start()
+    if os.environ.get("LEAK_MODEL_WATCH"):
+        reloader.watch([MODEL_PATH, COMPILED_MODEL_PATH], lambda: detector.model_version, DEFAULT_WATCH_INTERVAL)
 
-        leak_prob = float(result.get("leak_probability", 0.0))
-        risk_level = result.get("risk_level", "low")
 
-        # Convert probability to a 0–100 score for old UI
-        risk_score = int(round(leak_prob * 100))
-
-        rows.append(
-            {
-                "id": entry.get("id"),
-                "source": entry.get("source", "unknown"),
-                "description": entry.get("description", ""),
-                "content": entry.get("content", ""),
-                "leaked_date": entry.get("leaked_date"),
-                "severity": entry.get("severity", "unknown"),
-                "risk_score": risk_score,
-                "risk_level": risk_level,
-                # Old rule-based engine used detected_patterns (list of strings).
-                # Here we just put the ML prediction inside a list for compatibility.
-                "patterns": [result.get("prediction", "")],
-            }
-        )
+# ------------------------------------------------------------
+# Metrics (read when /api/metrics is scraped)
+# ------------------------------------------------------------
 
-    if not rows:
-        # If nothing was detected, return empty DF with expected columns.
-        return pd.DataFrame(
-            columns=[
-                "id",
-                "source",
-                "description",
-                "content",
-                "leaked_date",
-                "severity",
-                "risk_score",
-                "risk_level",
-                "patterns",
-            ]
+def _state_families():
+    yield "leak_store_rows", "gauge", "Rows in the API store", [("leak_store_rows", {}, len(store))]
+    yield "leak_store_version", "gauge", "Store version (bumped per ingest)", [("leak_store_version", {}, store.version)]
+    yield "leak_store_clusters", "gauge", "Near-duplicate clusters in the API store", [
+        ("leak_store_clusters", {}, store.cluster_count())
+    ]
+    yield "leak_model_reload_progress", "gauge", "Fraction of rows re-scored by the latest model reload", [
+        ("leak_model_reload_progress", {}, reloader.status().get("progress", 0.0))
+    ]
+    datasets = registry.stats()
+    yield "leak_datasets_loaded", "gauge", "Datasets held in memory by the registry", [
+        ("leak_datasets_loaded", {}, datasets["loaded"])
+    ]
+    yield "leak_dataset_memory_bytes", "gauge", "Estimated memory of the loaded datasets", [
+        ("leak_dataset_memory_bytes", {}, datasets["memory_bytes"])
+    ]
+    counts = jobs.counts()
+    yield "leak_scan_jobs", "gauge", "Background scan jobs per state", [
+        ("leak_scan_jobs", {"state": state}, n) for state, n in counts.items()
+    ]
+    yield "leak_profiler_running", "gauge", "1 while the sampling profiler runs", [
+        ("leak_profiler_running", {}, int(PROFILER.running))
+    ]
+    yield "leak_profiler_samples", "gauge", "Samples held by the sampling profiler", [
+        ("leak_profiler_samples", {}, PROFILER.samples)
+    ]
+
+
+REGISTRY.register_collector(lambda: cache_family({"ml": detector.cache}))
+REGISTRY.register_collector(_state_families)
+
+
+@app.before_request
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def _observe_latency(response):
+    start = g.get("request_start")
+    if start is not None:
+        # Route patterns, not raw paths, keep the label set bounded.
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        HTTP_REQUEST_SECONDS.labels(request.method, endpoint, response.status_code).observe(
+            time.perf_counter() - start
         )
-
-    return pd.DataFrame(rows)
-
-
-df = build_dataframe()
+    return response
 
 
 # ------------------------------------------------------------
@@ -93,54 +269,284 @@ def summary():
     """
     High-level KPIs for the top cards + distributions for charts.
     """
-    if df.empty:
-        return jsonify(
-            {
-                "total_leaks": 0,
-                "high_risk": 0,
-                "avg_risk_score": 0,
-                "active_sources": 0,
-                "risk_level_distribution": {},
-                "severity_distribution": {},
-            }
-        )
-
-    total = len(df)
-    high_risk = int((df["risk_level"] == "high").sum())
-    avg_score = float(df["risk_score"].mean())
-    active_sources = int(df["source"].nunique())
-
-    risk_dist = df["risk_level"].value_counts().to_dict()
-    severity_dist = df["severity"].value_counts().to_dict()
-
-    return jsonify(
-        {
-            "total_leaks": total,
-            "high_risk": high_risk,
-            "avg_risk_score": round(avg_score, 1),
-            "active_sources": active_sources,
-            "risk_level_distribution": risk_dist,
-            "severity_distribution": severity_dist,
-        }
-    )
+    return _cached_json("summary", lambda: _store().summary())
 
 
 @app.get("/api/leaks")
 def leaks():
     """
     Detailed leak entries for the Live Threat Feed / tables.
+
+    Without query parameters every row is returned. Optional parameters:
+    - source / risk_level / severity: equality filters (repeatable)
+    - date_from / date_to: inclusive leaked_date range
+    - sort: id (ingest order), leaked_date or risk_score; prefix "-" for descending
+    - limit + offset or cursor: pagination; the cursor for the next page
+      is sent in the X-Next-Cursor header
+    - fields / exclude: comma-separated columns to keep / drop
+    - dedup=1: one row per near-duplicate cluster (its representative),
+      with cluster_id and cluster_size
+    - dataset: id of the dataset to read (as on every read endpoint)
+    """
+    unknown = set(request.args) - LEAK_QUERY_PARAMS
+    if unknown:
+        return jsonify({"error": f"Unknown query parameter(s): {', '.join(sorted(unknown))}"}), 400
+    if not request.args.keys() - {"dataset"}:
+        target = _store()
+        return _cached_json("leaks", lambda: target.get_rows(range(len(target))))
+    try:
+        return _cached_response(f"leaks?{request.query_string.decode()}", _query_leaks)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def _query_leaks():
+    """A filtered / sorted / paged /api/leaks response: (rows, headers)."""
+    limit = _int_arg("limit", minimum=1)
+    offset = _int_arg("offset", minimum=0) or 0
+    after = _int_arg("cursor", minimum=0)
+    columns = _projection(request.args.get("fields"), request.args.get("exclude"))
+    dedup = _flag("dedup")
+
+    sort = request.args.get("sort", "id")
+    rows, next_cursor, total = _store().query(
+        filters={f: request.args.getlist(f) for f in INDEXED_FIELDS},
+        date_from=request.args.get("date_from"),
+        date_to=request.args.get("date_to"),
+        sort=sort.lstrip("-"),
+        descending=sort.startswith("-"),
+        after=after,
+        offset=offset,
+        limit=limit,
+        dedup=dedup,
+    )
+
+    if columns is not None:
+        if dedup:
+            columns = columns + CLUSTER_FIELDS
+        rows = [{c: row[c] for c in columns} for row in rows]
+
+    headers = {}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = str(next_cursor)
+    if total is not None:
+        headers["X-Total-Count"] = str(total)
+    return rows, headers
+
+
+def _cached_json(key: str, build):
+    """_cached_response() for a view without extra headers."""
+    return _cached_response(key, lambda: (build(), {}))
+
+
+def _cached_response(key: str, build):
+    """
+    Respond with the JSON of build() -> (data, headers) as of the current
+    store version.
+
+    A request whose If-None-Match names the current version gets a 304
+    before anything else happens. Otherwise the encoded body (and its
+    gzip / brotli variant) is reused until the store changes.
+    """
+    target = _store()
+    version = target.version
+    if_none_match = request.if_none_match
+    tags = ["*"] if if_none_match.star_tag else if_none_match.as_set(include_weak=True)
+    matched = http_cache.matching_etag(tags, version)
+    if matched is not None:
+        RESPONSE_CACHE.labels("not_modified").inc()
+        response = app.response_class(status=304)
+        response.set_etag(matched)
+        return _revalidate(response)
+
+    def encode():
+        with STAGE_SECONDS.labels("aggregate").time():
+            data, headers = build()
+        return http_cache.EncodedBody(_encode(data), headers)
+
+    encoded = target.cached(key, encode)
+    encoding, body = encoded.get(http_cache.choose_encoding(request.accept_encodings))
+    response = app.response_class(body, mimetype=app.json.mimetype, headers=encoded.headers)
+    response.set_etag(http_cache.etag(version, encoding))
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    return _revalidate(response)
+
+
+def _revalidate(response):
+    # Clients may keep the body but must check the ETag before reusing it.
+    response.headers["Cache-Control"] = "no-cache"
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def _encode(data) -> bytes:
+    with STAGE_SECONDS.labels("serialize").time():
+        return app.json.encode(data)
+
+
+def _json(data, status: int = 200):
+    """jsonify() with the encoding time recorded."""
+    with STAGE_SECONDS.labels("serialize").time():
+        response = app.json.response(data)
+    response.status_code = status
+    return response
+
+
+def _int_arg(name: str, minimum: int):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be an integer") from None
+    if number < minimum:
+        raise ValueError(f"'{name}' must be >= {minimum}")
+    return number
+
+
+def _dataset():
+    """The dataset ?dataset= names (loaded if needed), or None for the default one."""
+    if "dataset" not in g:
+        dataset_id = request.args.get("dataset")
+        g.dataset = registry.get(dataset_id) if dataset_id is not None else None
+    return g.dataset
+
+
+def _store() -> LeakStore:
+    """Store of the dataset the request is for."""
+    dataset = _dataset()
+    return store if dataset is None else dataset.store
+
+
+@app.errorhandler(UnknownDataset)
+def _unknown_dataset(e):
+    return jsonify({"error": f"Unknown dataset: {e.args[0]}"}), 404
+
+
+def _flag(name: str) -> bool:
+    return request.args.get(name, "").lower() in ("1", "true", "yes")
+
+
+def _projection(fields, exclude):
+    if fields is None and exclude is None:
+        return None
+    if fields is not None and exclude is not None:
+        raise ValueError("Use either 'fields' or 'exclude', not both")
+
+    requested = [c for c in (fields or exclude).split(",") if c]
+    unknown = set(requested) - set(COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}")
+    if fields is not None:
+        return requested
+    return [c for c in COLUMNS if c not in requested]
+
+
+@app.post("/api/leaks")
+def ingest_leaks():
+    """
+    Score and append new leak entries.
+
+    Accepts a single entry object or a list of them. Only the new entries
+    are scored; the summary/domain aggregates are updated in place.
+    """
+    if READ_ONLY:
+        return _read_only()
+    payload = request.get_json(silent=True)
+    entries = payload if isinstance(payload, list) else [payload]
+
+    if not entries or not all(isinstance(e, dict) for e in entries):
+        return jsonify({"error": "Expected a leak object or a non-empty list of leak objects"}), 400
+
+    dataset_id = request.args.get("dataset")
+    if dataset_id is None:
+        rows = store.get_rows(_ingest(entries))
+    else:
+        # Into the copy of the dataset loaded now, which is not reloaded
+        # until the rows are saved.
+        with registry.writing(dataset_id) as dataset:
+            rows = dataset.store.get_rows(_ingest(entries, dataset))
+    return _json({"ingested": len(rows), "leaks": rows}, status=201)
+
+
+@app.get("/api/leaks/stream")
+def leaks_stream():
+    """
+    Server-sent events feed of newly scored leaks.
+
+    Each "leak" event carries one dashboard row and its store position as
+    the event id. Reconnecting clients resume via the Last-Event-ID header
+    (or ?last_event_id= for the first connection); an "overflow" event
+    tells a client it fell further behind than the server keeps.
+    """
+    if "dataset" in request.args:
+        return jsonify({"error": "The stream only carries leaks of the default dataset"}), 400
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        last_id = int(last_id) if last_id is not None else None
+    except ValueError:
+        return jsonify({"error": "Last-Event-ID must be an integer"}), 400
+
+    return Response(
+        stream_with_context(events.stream(last_id)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/export")
+def export():
+    """
+    Stream the full leak dataset as a file download.
+
+    ?format=csv|ndjson|json (default csv), ?gzip=1 for a .gz file. Rows
+    are encoded a chunk at a time straight from the store, so memory stays
+    flat and the first bytes go out immediately. Leaks ingested while the
+    download runs are not included.
     """
-    if df.empty:
-        return jsonify([])
+    fmt = request.args.get("format", "csv")
+    if fmt not in leak_io.EXPORT_FORMATS:
+        return jsonify({"error": f"Unsupported format: {fmt}"}), 400
+    compress = request.args.get("gzip", "").lower() in ("1", "true", "yes")
+    return _export_response(fmt, compress)
 
-    return jsonify(df.to_dict(orient="records"))
+
+@app.get("/api/leaks_csv")
+def leaks_csv():
+    """
+    Download the full leak dataset as CSV.
+    """
+    return _export_response("csv", compress=False)
+
+
+def _export_response(fmt: str, compress: bool) -> Response:
+    # Rows are append-only, so a position snapshot gives a consistent export.
+    target = _store()
+    count = len(target)
+    rows = target.iter_rows(count)
+    chunks = leak_io.iter_export_chunks(rows, fmt, fieldnames=COLUMNS if fmt == "csv" else None)
+
+    filename = f"leaks.{fmt}"
+    mimetype = {"csv": "text/csv", "ndjson": "application/x-ndjson", "json": "application/json"}[fmt]
+    if compress:
+        body = leak_io.gzip_chunks(chunks)
+        filename += ".gz"
+        mimetype = "application/gzip"
+    else:
+        body = (chunk.encode("utf-8") for chunk in chunks)
+
+    return Response(
+        body,
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
 
 
 @app.get("/api/risk-distribution")
 def risk_distribution():
-    if df.empty:
-        return jsonify({})
-    return jsonify(df["risk_level"].value_counts().to_dict())
+    return _cached_json("risk-distribution", lambda: _store().risk_distribution())
 
 
 @app.get("/api/domains")
@@ -148,37 +554,229 @@ def domains():
     """
     Aggregate stats by source (domain/platform).
     """
-    if df.empty:
-        return jsonify([])
-
-    domain_stats = (
-        df.groupby("source")
-        .agg(
-            {
-                "risk_score": "mean",
-                "id": "count",
-                "leaked_date": "max",
-            }
-        )
-        .rename(
-            columns={
-                "risk_score": "avg_risk_score",
-                "id": "total_leaks",
-                "leaked_date": "last_seen",
-            }
-        )
-        .reset_index()
-    )
+    return _cached_json("domains", lambda: _store().domains())
+
+
+@app.get("/api/timeline")
+def timeline():
+    """
+    Leak counts per day, week or month, broken down by source, severity
+    and risk level, from buckets kept current on ingest.
+
+    Optional parameters:
+    - granularity: day (default), week (starting Monday) or month
+    - fields: comma-separated breakdowns to include (default all three)
+    - date_from / date_to: inclusive leaked_date range (ISO dates)
+    """
+    unknown = set(request.args) - TIMELINE_QUERY_PARAMS
+    if unknown:
+        return jsonify({"error": f"Unknown query parameter(s): {', '.join(sorted(unknown))}"}), 400
+    fields = request.args.get("fields")
+    try:
+        return _cached_json(f"timeline?{request.query_string.decode()}", lambda: _store().timeline(
+            granularity=request.args.get("granularity", "day"),
+            fields=[f for f in fields.split(",") if f] if fields is not None else TIMELINE_FIELDS,
+            date_from=request.args.get("date_from"),
+            date_to=request.args.get("date_to"),
+        ))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.get("/api/clusters")
+def clusters():
+    """
+    Near-duplicate clusters (reposts of the same leak), largest first.
+
+    ?min_size= (default 2) skips smaller clusters; limit / offset page
+    them. Each cluster has its id, size and representative row; the
+    number of clusters is in X-Total-Count.
+    """
+    try:
+        min_size = _int_arg("min_size", minimum=1) or 2
+        limit = _int_arg("limit", minimum=1)
+        offset = _int_arg("offset", minimum=0) or 0
+
+        def build():
+            page, total = _store().clusters(min_size=min_size, offset=offset, limit=limit)
+            return page, {"X-Total-Count": str(total)}
+
+        return _cached_response(f"clusters?{request.query_string.decode()}", build)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.get("/api/clusters/<int:cluster_id>")
+def cluster(cluster_id: int):
+    """
+    Rows of one near-duplicate cluster in ingest order (the representative
+    first); limit / offset page them.
+    """
+    try:
+        limit = _int_arg("limit", minimum=1)
+        offset = _int_arg("offset", minimum=0) or 0
+        return _cached_json(f"clusters/{cluster_id}?{request.query_string.decode()}",
+                            lambda: _store().cluster(cluster_id, offset=offset, limit=limit))
+    except KeyError:
+        return jsonify({"error": f"Unknown cluster: {cluster_id}"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    return jsonify(domain_stats.to_dict(orient="records"))
 
 @app.get("/api/ml-debug")
 def ml_debug():
     # returns raw ML results directly
-    return jsonify(scan_results)
+    target = _store()
+    return _cached_json("ml-debug", lambda: target.get_results(range(len(target))))
+
+
+@app.get("/api/datasets")
+def datasets():
+    """
+    Datasets the other endpoints serve with ?dataset=<id>, which of them
+    are loaded (rows, estimated memory), and the registry's hit / load /
+    eviction counts.
+    """
+    return jsonify({"datasets": registry.datasets(), "stats": registry.stats()})
+
+
+@app.get("/api/model")
+def model_info():
+    """
+    Model being served, the state of the latest reload and, with
+    LEAK_CASCADE, the share of entries each cascade stage resolved.
+    """
+    return jsonify({
+        "model_path": detector.model_path,
+        "model_version": detector.model_version,
+        "cascade": detector.cascade.stats() if detector.cascade is not None else None,
+        "reload": reloader.status(),
+    })
+
+
+@app.post("/api/model/reload")
+def model_reload():
+    """
+    Load the model files again and swap the new model in once every leak
+    has been re-scored; old scores are served until then. Poll
+    GET /api/model for progress.
+    """
+    if READ_ONLY:
+        return _read_only()
+    if not reloader.start(detector.model_version):
+        return jsonify({"error": "A model reload is already running", "reload": reloader.status()}), 409
+    return jsonify({"reload": reloader.status()}), 202
+
+
+@app.get("/api/jobs")
+def list_jobs():
+    """
+    Background scan jobs, newest first, with their progress.
+    """
+    return jsonify(jobs.jobs())
+
+
+@app.post("/api/jobs")
+def submit_job():
+    """
+    Queue a background scan: {"path": "dumps/2024", "priority": "high"}.
+
+    path is a .csv / .json / .ndjson / .jsonl file, or a directory of
+    them, relative to LEAK_SCAN_ROOT; priority is high, normal (default)
+    or low. Poll GET /api/jobs/<id> for progress.
+    """
+    if READ_ONLY:
+        return _read_only()
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get("path"), str):
+        return jsonify({"error": f"Expected {{\"path\": ..., \"priority\": {'|'.join(JOB_PRIORITIES)}}}"}), 400
+    try:
+        job = jobs.submit(payload["path"], payload.get("priority", "normal"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(job), 202
+
+
+@app.get("/api/jobs/<int:job_id>")
+def job_status(job_id: int):
+    """
+    State, progress and throughput of a scan job.
+    """
+    try:
+        return jsonify(jobs.status(job_id))
+    except KeyError:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+
+
+@app.post("/api/jobs/<int:job_id>/cancel")
+def cancel_job(job_id: int):
+    """
+    Cancel a scan job; a running one stops after its current batch (rows
+    it already ingested stay).
+    """
+    if READ_ONLY:
+        return _read_only()
+    try:
+        if not jobs.cancel(job_id):
+            return jsonify({"error": "The job has already finished", "job": jobs.status(job_id)}), 409
+        return jsonify(jobs.status(job_id))
+    except KeyError:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+
+
+def _read_only():
+    return jsonify({"error": "This server is read-only (multi-worker mode); send writes to a single-worker instance"}), 403
+
+
+@app.get("/api/metrics")
+def metrics():
+    """
+    Prometheus text exposition of latencies, throughput and cache stats.
+    """
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
+@app.get("/api/profiler")
+def profiler_stacks():
+    """
+    Stacks sampled by the profiler in folded format (flamegraph.pl /
+    speedscope input). ?reset=1 clears them after reading.
+    """
+    reset = request.args.get("reset", "").lower() in ("1", "true", "yes")
+    samples = PROFILER.samples
+    return Response(
+        PROFILER.folded(reset=reset),
+        mimetype="text/plain",
+        headers={"X-Profiler-Running": str(int(PROFILER.running)), "X-Profiler-Samples": str(samples)},
+    )
+
+
+@app.post("/api/profiler")
+def profiler_toggle():
+    """
+    Start or stop the sampling profiler: {"enabled": true, "interval": 0.01}.
+    """
+    if READ_ONLY:
+        return _read_only()
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get("enabled"), bool):
+        return jsonify({"error": "Expected {\"enabled\": true|false, \"interval\": seconds}"}), 400
+
+    if payload["enabled"]:
+        try:
+            PROFILER.start(float(payload.get("interval", PROFILER.interval)))
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+    else:
+        PROFILER.stop()
+    return jsonify({"running": PROFILER.running, "interval": PROFILER.interval, "samples": PROFILER.samples})
 
 
 if __name__ == "__main__":
+    # debug=True serves from a child process the reloader starts; only
+    # that one runs the background work.
+    if os.environ.get("WERKZEUG_RUN_MAIN"):
+        start_background()
     app.run(host="0.0.0.0", port=8000, debug=True)
 
 
@@ -0,0 +1,591 @@
+"""
+Benchmarks for the leak detection hot paths.
+
+Run from backend/ (same as api.py), e.g.:
+
+    python benchmark.py ml-batch --sizes 10000 100000 1000000
+    python benchmark.py rules --text-kb 1 4 16 64
+    python benchmark.py parallel --rows 200000 --workers 1 2 4 8 16
+    python benchmark.py cache --rows 100000 --dup-rate 0.8
+    python benchmark.py memory --rows 1000000
+    python benchmark.py cascade --rows 100000 --thresholds keywords 20:100 20:75 40:75
+
+End-to-end suite on synthetic data, written as JSON for comparing commits:
+
+    python benchmark.py suite --sizes 1000 10000 100000 1000000
+    python benchmark.py compare bench_results/<old>.json bench_results/<new>.json
+
+HTTP load test of the dev server (api.py) against serve.py, or of a
+running server with --url:
+
+    python benchmark.py load --rows 100000 --concurrency 32 --workers 4
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import platform
+import random
+import re
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from importlib import metadata
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from leak_cascade import DetectionCascade
+from leak_detector import LeakDetector
+from leak_detector_ml import LeakDetectorML
+from leak_results import ScanResults
+from leak_store import LeakStore
+from score_db import ScoreDB
+from synthetic_data import ENTRY_FIELDS, TRAINING_FIELDS, generate_entries, generate_training_rows, write_rows
+
+# Endpoints timed by the suite (the SSE stream never ends, so it is left out).
+SUITE_ENDPOINTS = [
+    "/api/summary",
+    "/api/risk-distribution",
+    "/api/domains",
+    "/api/leaks",
+    "/api/leaks?limit=50",
+    "/api/leaks?severity=critical&sort=-risk_score&limit=50",
+    "/api/export?format=csv",
+    "/api/ml-debug",
+]
+
+# Entries per POST /api/leaks request in the suite.
+SUITE_POST_ROWS = 100
+
+# Endpoints the load test cycles through (dashboard reads).
+LOAD_ENDPOINTS = [
+    "/api/summary",
+    "/api/domains",
+    "/api/risk-distribution",
+    "/api/leaks?limit=50",
+    "/api/leaks?severity=critical&sort=-risk_score&limit=50",
+    "/api/leaks?limit=1000&fields=id,source,risk_score,risk_level",
+]
+
+
+def replicate_entries(n: int, seed_path: str = "sample_data.json") -> List[Dict[str, Any]]:
+    """Build n entries by cycling the sample dataset with unique ids."""
+    with open(seed_path, "r", encoding="utf-8") as f:
+        seed = json.load(f)
+
+    entries = []
+    for i in range(n):
+        entry = dict(seed[i % len(seed)])
+        entry["id"] = f"bench_{i:07d}"
+        entries.append(entry)
+    return entries
+
+
+def timed(fn: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+# ------------------- BENCHMARKS -------------------
+
+def bench_ml_batch(sizes: List[int], batch_size: int) -> None:
+    """Per-entry scan_entry() loop vs. batched scan_all()."""
+    # Uncached, or the batched pass would read back what the loop scored.
+    detector = LeakDetectorML(model_path="../models/leak_model.pkl", batch_size=batch_size, cache_size=0)
+
+    print(f"{'rows':>10} {'per-entry s':>12} {'batched s':>10} {'speedup':>8}")
+    for n in sizes:
+        detector.leaks = replicate_entries(n)
+
+        per_entry: List[Dict[str, Any]] = []
+        t_single = timed(lambda: per_entry.extend(detector.scan_entry(e) for e in detector.leaks))
+        t_batch = timed(detector.scan_all)
+
+        for a, b in zip(per_entry, detector.scan_results):
+            if (a["leak_probability"], a["risk_level"]) != (b["leak_probability"], b["risk_level"]):
+                raise AssertionError(f"Batched result differs for {a['entry']['id']}")
+
+        print(f"{n:>10} {t_single:>12.3f} {t_batch:>10.3f} {t_single / t_batch:>7.1f}x")
+
+
+def bench_rules(text_kb: List[int], entries: int) -> None:
+    """Per-pattern re.search loop vs. the compiled PatternMatcher."""
+    detector = LeakDetector()
+    patterns = detector.RISK_PATTERNS
+    rng = random.Random(0)
+    filler = "lorem ipsum dolor sit amet forum dump thread reply mirror archive".split()
+
+    def naive(text: str) -> List[str]:
+        return [n for n, info in patterns.items() if re.search(info["pattern"], text, re.IGNORECASE)]
+
+    print(f"{'text KB':>8} {'naive s':>10} {'matcher s':>10} {'speedup':>8}")
+    for kb in text_kb:
+        texts = []
+        for i in range(entries):
+            words = []
+            while sum(map(len, words)) + len(words) < kb * 1024:
+                words.append(rng.choice(filler))
+            if i % 4 == 0:
+                words.append("password")
+            texts.append(" ".join(words))
+
+        matcher = detector._get_matcher()
+        t_naive = timed(lambda: [naive(t) for t in texts])
+        t_matcher = timed(lambda: [matcher.match(t) for t in texts])
+        if [naive(t) for t in texts] != [matcher.match(t) for t in texts]:
+            raise AssertionError("PatternMatcher disagrees with per-pattern search")
+
+        print(f"{kb:>8} {t_naive:>10.3f} {t_matcher:>10.3f} {t_naive / t_matcher:>7.1f}x")
+
+
+def bench_parallel(rows: int, workers: List[int]) -> None:
+    """scan_all(workers=N) scaling for the rule and ML detectors."""
+    entries = replicate_entries(rows)
+    # Uncached, so each worker count scores every row rather than reading
+    # back the scores of the run before.
+    rules = LeakDetector(cache_size=0)
+    ml = LeakDetectorML(model_path="../models/leak_model.pkl", cache_size=0)
+    rules.leaks = ml.leaks = entries
+
+    print(f"{rows} rows")
+    print(f"{'workers':>8} {'rules s':>10} {'x':>6} {'ml s':>10} {'x':>6}")
+    base_rules = base_ml = None
+    for n in workers:
+        t_rules = timed(lambda: rules.scan_all(workers=n))
+        t_ml = timed(lambda: ml.scan_all(workers=n))
+        base_rules = base_rules or t_rules
+        base_ml = base_ml or t_ml
+        print(f"{n:>8} {t_rules:>10.3f} {base_rules / t_rules:>5.1f}x {t_ml:>10.3f} {base_ml / t_ml:>5.1f}x")
+
+
+def bench_cache(rows: int, dup_rate: float) -> None:
+    """Scan time with and without the score cache on data with reposts."""
+    rng = random.Random(0)
+    unique = replicate_entries(max(1, int(rows * (1 - dup_rate))))
+    entries = unique + [dict(rng.choice(unique)) for _ in range(rows - len(unique))]
+    rng.shuffle(entries)
+
+    print(f"{rows} rows, {dup_rate:.0%} duplicates")
+    print(f"{'detector':>10} {'uncached s':>11} {'cached s':>9} {'speedup':>8} {'hit rate':>9}")
+    for name, make in (("rules", LeakDetector), ("ml", LeakDetectorML)):
+        uncached, cached = make(cache_size=0), make()
+        uncached.leaks = cached.leaks = entries
+        t_off = timed(uncached.scan_all)
+        t_on = timed(cached.scan_all)
+        hit_rate = cached.cache.stats()["hit_rate"]
+        print(f"{name:>10} {t_off:>11.3f} {t_on:>9.3f} {t_off / t_on:>7.1f}x {hit_rate:>9.1%}")
+
+
+def bench_memory(rows: int) -> None:
+    """Heap held by dict-per-row results and rows vs. the columnar ScanResults."""
+    rng = random.Random(0)
+    probas = [rng.random() for _ in range(rows)]
+    # A JSON round trip gives every entry its own strings, as a real load does.
+    raw = json.dumps(replicate_entries(rows))
+
+    def measure(build: Callable[[], Any]) -> float:
+        tracemalloc.start()
+        kept = build()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del kept
+        return size / 2**20
+
+    def columnar(entries: Optional[List[Dict[str, Any]]] = None) -> ScanResults:
+        results = ScanResults()
+        results.append_batch(entries or json.loads(raw), probas, "2025-01-01T00:00:00")
+        return results
+
+    def dicts() -> Any:
+        # What scan_all() returned and LeakStore held before: result dicts
+        # plus a dashboard row dict per entry, sharing the entries' strings.
+        entries = json.loads(raw)
+        columns = columnar(entries)
+        results = list(columns)
+        for result, entry in zip(results, entries):
+            result["entry"] = entry
+        return results, columns.rows_at(range(rows))
+
+    mb_dicts = measure(dicts)
+    mb_columnar = measure(columnar)
+    print(f"{'rows':>10} {'dicts MB':>9} {'columnar MB':>12} {'ratio':>6}")
+    print(f"{rows:>10} {mb_dicts:>9.1f} {mb_columnar:>12.1f} {mb_dicts / mb_columnar:>5.1f}x")
+
+    results = columnar()
+    t_frame = timed(results.to_dataframe)
+    print(f"to_dataframe(): {t_frame * 1000:.2f} ms")
+
+
+def bench_cascade(rows: int, thresholds: List[str], words: int) -> None:
+    """ML inference saved by the detection cascade vs. its agreement with the model alone."""
+    entries = list(generate_entries(rows, seed=0, text_words=words))
+    model_path = "../models/leak_model_compiled" if os.path.isdir("../models/leak_model_compiled") \
+        else "../models/leak_model.pkl"
+
+    ml = LeakDetectorML(model_path=model_path, cache_size=0)
+    ml.leaks = entries
+    t_ml = timed(ml.scan_all)
+    base = ml.scan_results
+
+    print(f"{rows} rows; model alone: {t_ml:.3f} s")
+    print(f"{'first stage':>12} {'to ML':>7} {'s':>8} {'speedup':>8} "
+          f"{'same pred':>10} {'same level':>11} {'mean |dp|':>10}")
+    for spec in thresholds:
+        if spec == "keywords":
+            cascade = DetectionCascade(keywords_only=True, cache_size=0)
+        else:
+            clear_below, leak_from = (int(v) for v in spec.split(":"))
+            cascade = DetectionCascade(clear_below, leak_from, cache_size=0)
+        detector = LeakDetectorML(model_path=model_path, cache_size=0, cascade=cascade)
+        detector.leaks = entries
+        t_cascade = timed(detector.scan_all)
+        got = detector.scan_results
+
+        stats = cascade.stats()
+        same_pred = (got.column("prediction") == base.column("prediction")).mean()
+        same_level = (got.column("risk_level") == base.column("risk_level")).mean()
+        delta = abs(got.column("leak_probability") - base.column("leak_probability")).mean()
+        print(f"{spec:>12} {stats['fractions']['ml']:>7.1%} {t_cascade:>8.3f} "
+              f"{t_ml / t_cascade:>7.1f}x {same_pred:>10.1%} {same_level:>11.1%} {delta:>10.3f}")
+
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _suite_meta(args: argparse.Namespace, model_path: str) -> Dict[str, Any]:
+    versions = {}
+    for package in ("numpy", "pandas", "scikit-learn", "flask"):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return {
+        "commit": _git("rev-parse", "HEAD") or None,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "packages": versions,
+        "model_path": model_path,
+        "params": {
+            "sizes": args.sizes,
+            "seed": args.seed,
+            "dup_rate": args.dup_rate,
+            "words": args.words,
+            "sources": args.sources,
+            "train_max": args.train_max,
+            "repeat": args.repeat,
+        },
+    }
+
+
+def bench_suite(args: argparse.Namespace) -> None:
+    """Load, scan, train and API timings on synthetic data, saved as JSON."""
+    # Imported here: importing api sets up the app (sample data, score DB).
+    import api
+
+    model_path = "../models/leak_model_compiled"
+    if not os.path.isdir(model_path):
+        model_path = "../models/leak_model.pkl"
+    records: List[Dict[str, Any]] = []
+
+    def record(name: str, rows: int, seconds: float, **extra: Any) -> None:
+        records.append({"name": name, "rows": rows, "seconds": round(seconds, 6), **extra})
+        print(f"{name:<58} {rows:>9} {seconds:>10.4f}s")
+
+    def best(run: Callable[[], float]) -> float:
+        return min(run() for _ in range(args.repeat))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            json_path = os.path.join(tmp, f"entries_{n}.json")
+            csv_path = os.path.join(tmp, f"entries_{n}.csv")
+            for path in (json_path, csv_path):
+                entries = generate_entries(n, args.seed, args.dup_rate, args.words, args.sources)
+                write_rows(path, entries, ENTRY_FIELDS)
+
+            ml = LeakDetectorML(model_path=model_path)
+            record("LeakDetectorML.load_json", n, best(lambda: timed(lambda: ml.load_json(json_path))))
+            record("LeakDetectorML.load_csv", n, best(lambda: timed(lambda: ml.load_csv(csv_path))))
+            leaks = ml.load_json(json_path)
+
+            # A fresh detector (and so a cold score cache) per run.
+            def scan(make: Callable[[], Any]) -> float:
+                detector = make()
+                detector.leaks = leaks
+                return timed(detector.scan_all)
+
+            record("LeakDetector.scan_all", n, best(lambda: scan(LeakDetector)))
+            record("LeakDetectorML.scan_all", n, best(lambda: scan(lambda: LeakDetectorML(model_path))))
+
+            train_rows = min(n, args.train_max)
+            train_path = os.path.join(tmp, f"training_{train_rows}.csv")
+            write_rows(train_path, generate_training_rows(train_rows, args.seed), TRAINING_FIELDS)
+            trainer = LeakDetectorML(model_path=os.path.join(tmp, "model.pkl"))
+            # sklearn is imported on first training; keep that out of the timing.
+            import sklearn.linear_model  # noqa: F401
+            record("LeakDetectorML.train_model_from_csv", train_rows,
+                   timed(lambda: trainer.train_model_from_csv(train_path)))
+            streamer = LeakDetectorML(model_path=os.path.join(tmp, "model_streaming.pkl"))
+            record("LeakDetectorML.train_model_streaming", train_rows,
+                   timed(lambda: streamer.train_model_streaming(train_path, update=False)))
+
+            # Point the app at a store (and score DB) holding this dataset.
+            api.store = LeakStore()
+            api.store.add_results(ml.scan_all())
+            api.score_db = ScoreDB(os.path.join(tmp, f"scores_{n}.db"))
+            client = api.app.test_client()
+            for url in SUITE_ENDPOINTS:
+                cold = timed(lambda: client.get(url).get_data())
+                warm = [timed(lambda: client.get(url).get_data()) for _ in range(max(3, args.repeat))]
+                record(f"GET {url}", n, cold, warm_seconds=round(statistics.median(warm), 6))
+            batch = list(generate_entries(SUITE_POST_ROWS, args.seed + 1, text_words=args.words,
+                                          sources=args.sources))
+            record(f"POST /api/leaks ({SUITE_POST_ROWS} rows)", n,
+                   best(lambda: timed(lambda: client.post("/api/leaks", json=batch).get_data())))
+            api.score_db.close()
+
+    out = args.out
+    if out is None:
+        commit = _git("rev-parse", "--short=12", "HEAD") or "nocommit"
+        out = os.path.join("bench_results", f"{commit}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"meta": _suite_meta(args, model_path), "results": records}, f, indent=2)
+    print(f"[INFO] Results written to {out}")
+
+
+def _load_client(task: Tuple[str, int, List[str], float, int]) -> List[Tuple[str, float, bool]]:
+    """One keep-alive client: GET endpoints in turn until the deadline."""
+    host, port, endpoints, deadline, offset = task
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    samples = []
+    i = offset
+    while time.time() < deadline:
+        path = endpoints[i % len(endpoints)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            ok = False
+        samples.append((path, time.perf_counter() - start, ok))
+    conn.close()
+    return samples
+
+
+def run_load(url: str, endpoints: List[str], concurrency: int, duration: float) -> Dict[str, Any]:
+    """
+    Requests/sec and latency percentiles of url under concurrency clients.
+
+    Clients are processes (not threads), so the load generator is not
+    limited by its own GIL.
+    """
+    parts = urlsplit(url)
+    deadline = time.time() + duration
+    tasks = [(parts.hostname, parts.port or 80, endpoints, deadline, i) for i in range(concurrency)]
+    with multiprocessing.Pool(concurrency) as pool:
+        samples = [s for client in pool.map(_load_client, tasks) for s in client]
+
+    def latency(values: List[float]) -> Dict[str, float]:
+        values = sorted(values)
+
+        def percentile(q: float) -> float:
+            return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2) if values else 0.0
+
+        return {"p50_ms": percentile(0.50), "p99_ms": percentile(0.99)}
+
+    ok = [s for s in samples if s[2]]
+    return {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "rps": round(len(ok) / duration, 1),
+        **latency([s[1] for s in ok]),
+        "endpoints": {e: latency([s[1] for s in ok if s[0] == e]) for e in endpoints},
+    }
+
+
+def _start_server(cmd: List[str], url: str, env: Dict[str, str], timeout: float = 600) -> subprocess.Popen:
+    """Start a server in its own process group and wait until it answers."""
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            start_new_session=True)
+    parts = urlsplit(url)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited with status {proc.returncode}: {' '.join(cmd)}")
+        try:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=5)
+            conn.request("GET", "/api/summary")
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            pass
+        time.sleep(0.5)
+    _stop_server(proc)
+    raise RuntimeError(f"Server did not come up within {timeout}s: {' '.join(cmd)}")
+
+
+def _stop_server(proc: subprocess.Popen) -> None:
+    # The dev server's reloader runs the app in a child; stop the whole group.
+    os.killpg(proc.pid, signal.SIGTERM)
+    proc.wait()
+
+
+def bench_load(args: argparse.Namespace) -> None:
+    """HTTP load test: requests/sec and p50/p99 latency under concurrent clients."""
+    def report(name: str, result: Dict[str, Any]) -> None:
+        print(f"{name:<28} {result['rps']:>9.1f} {result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+              f"{result['errors']:>7}")
+        for endpoint, stats in result["endpoints"].items():
+            print(f"    {endpoint:<56} p50 {stats['p50_ms']:>8.2f} ms  p99 {stats['p99_ms']:>8.2f} ms")
+
+    header = f"{'server':<28} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    if args.url:
+        print(header)
+        report(args.url, run_load(args.url, LOAD_ENDPOINTS, args.concurrency, args.duration))
+        return
+
+    url = f"http://127.0.0.1:{args.port}"
+    servers = [
+        ("api.py (Flask dev server)",
+         [sys.executable, "-c", f"import api; api.app.run(host='127.0.0.1', port={args.port}, debug=True)"]),
+        (f"serve.py --workers {args.workers}",
+         [sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(args.port),
+          "--workers", str(args.workers)]),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, "entries.json")
+        write_rows(data_path, generate_entries(args.rows, args.seed, args.dup_rate, args.words, args.sources),
+                   ENTRY_FIELDS)
+        # Both servers share one score DB, so the second starts without rescoring.
+        env = {**os.environ, "LEAK_DATA_PATH": data_path, "LEAK_SCORE_DB": os.path.join(tmp, "scores.db")}
+
+        results = {}
+        for name, cmd in servers:
+            print(f"[INFO] Starting {name} on {args.rows} rows ...")
+            proc = _start_server(cmd, url, env)
+            try:
+                results[name] = run_load(url, LOAD_ENDPOINTS, args.concurrency, args.duration)
+            finally:
+                _stop_server(proc)
+
+    print(f"\n{args.concurrency} clients, {args.duration:.0f}s per server, {args.rows} rows\n")
+    print(header)
+    for name, result in results.items():
+        report(name, result)
+
+
+def compare_results(old_path: str, new_path: str) -> None:
+    """Print per-benchmark timings of two suite result files side by side."""
+    def load(path: str) -> Dict[Any, float]:
+        with open(path, "r", encoding="utf-8") as f:
+            return {(r["name"], r["rows"]): r["seconds"] for r in json.load(f)["results"]}
+
+    old, new = load(old_path), load(new_path)
+    print(f"{'benchmark':<58} {'rows':>9} {'old s':>10} {'new s':>10} {'change':>8}")
+    for key in [k for k in old if k in new]:
+        name, rows = key
+        change = (new[key] - old[key]) / old[key] if old[key] else 0.0
+        print(f"{name:<58} {rows:>9} {old[key]:>10.4f} {new[key]:>10.4f} {change:>+8.1%}")
+    for key in [k for k in new if k not in old]:
+        print(f"{key[0]:<58} {key[1]:>9} {'-':>10} {new[key]:>10.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    ml_batch = sub.add_parser("ml-batch", help=bench_ml_batch.__doc__)
+    ml_batch.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ml_batch.add_argument("--batch-size", type=int, default=2048)
+
+    rules = sub.add_parser("rules", help=bench_rules.__doc__)
+    rules.add_argument("--text-kb", type=int, nargs="+", default=[1, 4, 16, 64])
+    rules.add_argument("--entries", type=int, default=500)
+
+    parallel = sub.add_parser("parallel", help=bench_parallel.__doc__)
+    parallel.add_argument("--rows", type=int, default=200_000)
+    parallel.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+
+    cache = sub.add_parser("cache", help=bench_cache.__doc__)
+    cache.add_argument("--rows", type=int, default=100_000)
+    cache.add_argument("--dup-rate", type=float, default=0.8)
+
+    memory = sub.add_parser("memory", help=bench_memory.__doc__)
+    memory.add_argument("--rows", type=int, default=1_000_000)
+
+    cascade = sub.add_parser("cascade", help=bench_cascade.__doc__)
+    cascade.add_argument("--rows", type=int, default=100_000)
+    cascade.add_argument("--thresholds", nargs="+", default=["keywords", "20:100", "20:75", "40:75"],
+                         help="First stages to try: clear_below:leak_from rule scores, or keywords")
+    cascade.add_argument("--words", type=int, default=24)
+
+    suite = sub.add_parser("suite", help=bench_suite.__doc__)
+    suite.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    suite.add_argument("--seed", type=int, default=0)
+    suite.add_argument("--dup-rate", type=float, default=0.1)
+    suite.add_argument("--words", type=int, default=24)
+    suite.add_argument("--sources", type=int, default=200)
+    suite.add_argument("--train-max", type=int, default=100_000,
+                       help="Cap on training rows (training cost grows fastest)")
+    suite.add_argument("--repeat", type=int, default=1, help="Runs per timing; the best is kept")
+    suite.add_argument("--out", help="Result file (default: bench_results/<commit>.json)")
+
+    load = sub.add_parser("load", help=bench_load.__doc__)
+    load.add_argument("--url", help="Load-test this running server instead of starting both")
+    load.add_argument("--rows", type=int, default=100_000)
+    load.add_argument("--seed", type=int, default=0)
+    load.add_argument("--dup-rate", type=float, default=0.1)
+    load.add_argument("--words", type=int, default=24)
+    load.add_argument("--sources", type=int, default=200)
+    load.add_argument("--concurrency", type=int, default=32)
+    load.add_argument("--duration", type=float, default=15.0, help="Seconds of load per server")
+    load.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="serve.py worker processes")
+    load.add_argument("--port", type=int, default=8765)
+
+    compare = sub.add_parser("compare", help=compare_results.__doc__)
+    compare.add_argument("old")
+    compare.add_argument("new")
+
+    args = parser.parse_args()
+    if args.bench == "ml-batch":
+        bench_ml_batch(args.sizes, args.batch_size)
+    elif args.bench == "rules":
+        bench_rules(args.text_kb, args.entries)
+    elif args.bench == "parallel":
+        bench_parallel(args.rows, args.workers)
+    elif args.bench == "cache":
+        bench_cache(args.rows, args.dup_rate)
+    elif args.bench == "memory":
+        bench_memory(args.rows)
+    elif args.bench == "cascade":
+        bench_cascade(args.rows, args.thresholds, args.words)
+    elif args.bench == "suite":
+        bench_suite(args)
+    elif args.bench == "load":
+        bench_load(args)
+    elif args.bench == "compare":
+        compare_results(args.old, args.new)
+
+
+if __name__ == "__main__":
+    main()
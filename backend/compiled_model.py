@@ -0,0 +1,228 @@
+"""
+Compact, memory-mappable form of the trained leak model.
+
+The sklearn Pipeline pickle (TF-IDF + LogisticRegression) is expensive to
+load: unpickling imports sklearn and rebuilds the whole vocabulary dict in
+every process. export_compiled_model() writes the parts inference needs
+to a directory:
+
+- meta.json     tokenizer settings, stop words, intercept, source version
+- terms.npy     sorted vocabulary (fixed-width UTF-8 bytes)
+- weights.npy   float64 [idf, coef] per term, in vocabulary order
+
+CompiledLeakModel memory-maps the arrays, so loading is near-instant and
+processes on one box share the pages, and scores with NumPy alone,
+reproducing the pipeline's predict_proba. An export is only used while its
+source version matches the pickle's digest (see compiled_model_path()).
+
+    python compiled_model.py ../models/leak_model.pkl ../models/leak_model_compiled
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+from typing import Any, List, Tuple
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+def file_digest(path: str) -> str:
+    """Version of a pickled model: a prefix of its SHA-256."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def compiled_model_path(model_path: str, compiled_path: str) -> str:
+    """
+    The model to load: compiled_path if it was exported from the pickle
+    now at model_path (or there is no pickle), model_path otherwise.
+
+    An export older than the pickle would otherwise keep serving, and
+    reporting the version of, the model it was compiled from.
+    """
+    try:
+        with open(os.path.join(compiled_path, "meta.json"), "r", encoding="utf-8") as f:
+            source_version = json.load(f).get("source_version")
+    except (OSError, ValueError):
+        return model_path
+    try:
+        version = file_digest(model_path)
+    except FileNotFoundError:
+        return compiled_path
+    if source_version != version:
+        print(f"[WARN] Compiled model {compiled_path} is stale (from {source_version}, "
+              f"{model_path} is {version}); loading {model_path}")
+        return model_path
+    return compiled_path
+
+
+def export_compiled_model(pipeline: Any, out_dir: str, source_version: str = "") -> None:
+    """
+    Write a fitted TfidfVectorizer + binary LogisticRegression pipeline
+    to out_dir in the compiled format.
+
+    Args:
+        pipeline: Pipeline with "tfidf" and "clf" steps
+        out_dir: Destination directory (created if needed)
+        source_version: Version of the pickled model it was compiled from;
+            the compiled model reports it as its own version since it gives
+            the same scores
+    """
+    vectorizer = pipeline.named_steps["tfidf"]
+    clf = pipeline.named_steps["clf"]
+
+    unsupported = {
+        "analyzer": vectorizer.analyzer != "word",
+        "tokenizer": vectorizer.tokenizer is not None,
+        "preprocessor": vectorizer.preprocessor is not None,
+        "strip_accents": vectorizer.strip_accents is not None,
+        "binary": vectorizer.binary,
+        "sublinear_tf": vectorizer.sublinear_tf,
+        "norm": vectorizer.norm != "l2",
+        "use_idf": not vectorizer.use_idf,
+        "classes": len(clf.classes_) != 2,
+    }
+    bad = [name for name, flag in unsupported.items() if flag]
+    if bad:
+        raise ValueError(f"Cannot compile model, unsupported settings: {', '.join(bad)}")
+
+    vocabulary = vectorizer.vocabulary_
+    terms = sorted(vocabulary)
+    order = np.array([vocabulary[t] for t in terms])
+    # Term order doubles as feature order; summing in the same order as
+    # sklearn's sparse kernels keeps the probabilities equal to within an ulp.
+    if not np.array_equal(order, np.arange(len(terms))):
+        raise ValueError("Cannot compile model: vocabulary indices are not in term order")
+
+    weights = np.column_stack([vectorizer.idf_, clf.coef_[0]]).astype(np.float64)
+    stop_words = sorted(vectorizer.get_stop_words() or ())
+
+    os.makedirs(out_dir, exist_ok=True)
+    # UTF-8 byte order equals code point order, so the array stays sorted.
+    np.save(os.path.join(out_dir, "terms.npy"), np.array([t.encode("utf-8") for t in terms], dtype=bytes))
+    np.save(os.path.join(out_dir, "weights.npy"), weights)
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "format_version": FORMAT_VERSION,
+                "source_version": source_version,
+                "token_pattern": vectorizer.token_pattern,
+                "lowercase": vectorizer.lowercase,
+                "ngram_range": list(vectorizer.ngram_range),
+                "stop_words": stop_words,
+                "intercept": float(clf.intercept_[0]),
+            },
+            f,
+        )
+
+
+class CompiledLeakModel:
+    """
+    NumPy-only drop-in for the Pipeline's predict_proba().
+
+    Tokenisation mirrors TfidfVectorizer's word analyzer; vocabulary lookup
+    is one vectorised searchsorted over the memory-mapped term array per
+    batch.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled model format in {path}")
+
+        self.version: str = meta["source_version"]
+        self.terms = np.load(os.path.join(path, "terms.npy"), mmap_mode="r")
+        weights = np.load(os.path.join(path, "weights.npy"), mmap_mode="r")
+        self.idf = weights[:, 0]
+        self.coef = weights[:, 1]
+        self.intercept: float = meta["intercept"]
+
+        self._token_re = re.compile(meta["token_pattern"])
+        self._lowercase = meta["lowercase"]
+        self._min_n, self._max_n = meta["ngram_range"]
+        self._stop_words = frozenset(meta["stop_words"])
+
+    def __reduce__(self):
+        # Re-open (and re-map) from disk instead of pickling the arrays.
+        return (CompiledLeakModel, (self.path,))
+
+    def _analyze(self, text: str) -> List[str]:
+        if self._lowercase:
+            text = text.lower()
+        tokens = [t for t in self._token_re.findall(text) if t not in self._stop_words]
+        if self._max_n == 1:
+            return tokens
+
+        grams = tokens if self._min_n == 1 else []
+        for n in range(max(2, self._min_n), self._max_n + 1):
+            grams = grams + [" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+        return grams
+
+    def transform(self, texts: List[str]) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        L2-normalised TF-IDF vectors of texts as (n_rows, rows, features,
+        values) triplets, in the CSR order of TfidfVectorizer's output.
+        """
+        n_rows = len(texts)
+        n_features = len(self.terms)
+        empty = np.empty(0, dtype=np.int64)
+
+        grams: List[str] = []
+        lengths = np.empty(n_rows, dtype=np.int64)
+        for i, text in enumerate(texts):
+            row_grams = self._analyze(text)
+            grams.extend(row_grams)
+            lengths[i] = len(row_grams)
+        if not grams:
+            return n_rows, empty, empty, np.empty(0)
+
+        rows = np.repeat(np.arange(n_rows, dtype=np.int64), lengths)
+        grams_arr = np.array([g.encode("utf-8") for g in grams], dtype=bytes)
+        features = np.searchsorted(self.terms, grams_arr)
+        found = features < n_features
+        found[found] = self.terms[features[found]] == grams_arr[found]
+        if not found.any():
+            return n_rows, empty, empty, np.empty(0)
+
+        # (row, feature) pairs in row-major, feature-ascending order with
+        # term counts, i.e. the CSR layout of CountVectorizer's output.
+        keys, counts = np.unique(rows[found] * n_features + features[found], return_counts=True)
+        rows = keys // n_features
+        features = keys % n_features
+
+        values = counts * self.idf[features]
+        norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=n_rows))
+        norms[norms == 0.0] = 1.0
+        return n_rows, rows, features, values / norms[rows]
+
+    def predict_proba_transformed(self, vectors: Tuple[int, np.ndarray, np.ndarray, np.ndarray]) -> np.ndarray:
+        """predict_proba() for the output of transform()."""
+        n_rows, rows, features, values = vectors
+        dots = np.bincount(rows, weights=values * self.coef[features], minlength=n_rows)
+        positive = 1.0 / (1.0 + np.exp(-(dots + self.intercept)))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        return self.predict_proba_transformed(self.transform(texts))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python compiled_model.py <model.pkl> <out_dir>")
+
+    from leak_detector_ml import LeakDetectorML
+
+    detector = LeakDetectorML(model_path=sys.argv[1])
+    if detector.model is None:
+        sys.exit(f"Could not load model from {sys.argv[1]}")
+    export_compiled_model(detector.model, sys.argv[2], detector.model_version or "")
+    print(f"[INFO] Compiled model written to {sys.argv[2]}")
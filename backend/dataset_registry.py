@@ -0,0 +1,290 @@
+"""
+Datasets served by one API process, loaded on demand within a memory budget.
+
+Besides the dataset the API starts with, every leak file in the datasets
+directory (<id>.json, .csv, .ndjson or .jsonl) is a dataset that requests
+name with ?dataset=<id>. Each has a score DB of its own (<id>.db beside
+the file), opened once and kept across reloads. The first request for a
+dataset loads it: entries not yet scored by the current model are
+scored, with the detector (and so the model) every dataset shares, and
+the scored rows go into a LeakStore with its own indexes and aggregates.
+A read-only registry (the API's LEAK_READ_ONLY workers) scores into a
+private copy of the score DB and never writes <id>.db, which the
+writable instance owns.
+
+Loaded datasets are kept in least recently used order. Once their
+estimated memory exceeds the budget, the least recently used ones are
+evicted; a later request loads them again from their score DB, which
+only re-scores entries that changed. Leaks are ingested into a dataset
+through writing(), which serialises them with loads of that dataset, so
+they go into the copy that is loaded and are saved before it is loaded
+again. Hits, loads and evictions are counted for /api/datasets and
+/api/metrics.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import leak_io
+from leak_detector_ml import LeakDetectorML
+from leak_store import LeakStore
+from metrics import DATASET_EVICTIONS, DATASET_LOOKUPS
+from score_db import ScoreDB
+
+# Dataset ids are file names without the extension.
+DATASET_ID = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]*")
+
+DEFAULT_MEMORY_BUDGET = 1 << 30
+
+
+class UnknownDataset(LookupError):
+    """No dataset file with the requested id."""
+
+
+class Dataset:
+    """A loaded dataset: its store and score DB (None if read-only)."""
+
+    def __init__(self, dataset_id: str, path: str, store: LeakStore, score_db: Optional[ScoreDB],
+                 bytes_per_row: float, load_seconds: float):
+        self.id = dataset_id
+        self.path = path
+        self.store = store
+        self.score_db = score_db
+        # Measured once at load (LeakStore.nbytes() walks every row), then
+        # scaled with the row count as leaks are ingested.
+        self.bytes_per_row = bytes_per_row
+        self.load_seconds = load_seconds
+        self.loaded_at = datetime.now().isoformat()
+        self.last_used = time.time()
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.bytes_per_row * len(self.store))
+
+
+class DatasetRegistry:
+    """
+    Lazily loaded datasets under an LRU memory budget.
+
+    Thread-safe. Concurrent first requests for one dataset wait for a
+    single load.
+    """
+
+    def __init__(self, directory: str, detector: Callable[[], LeakDetectorML],
+                 memory_budget: int = DEFAULT_MEMORY_BUDGET, read_only: bool = False):
+        """
+        Args:
+            directory: Where the dataset files (and their score DBs) are
+            detector: Returns the detector to score with (the one the API
+                currently serves)
+            memory_budget: Estimated bytes the loaded datasets may hold;
+                the most recently used one stays loaded even if it alone
+                exceeds it
+            read_only: Never write the score DBs; loads score into an
+                in-memory copy that is dropped once the store is built
+        """
+        self.directory = directory
+        self.detector = detector
+        self.memory_budget = memory_budget
+        self.read_only = read_only
+
+        self._lock = threading.Lock()
+        self._loaded: "OrderedDict[str, Dataset]" = OrderedDict()
+        self._loading: Dict[str, threading.Event] = {}
+        # Bumped by clear(); loads begun before it are not kept.
+        self._generation = 0
+        # Version each dataset's store had reached, so a reloaded store
+        # continues from there and never repeats an ETag.
+        self._versions: Dict[str, int] = {}
+        # Per dataset id, kept across evictions: its score DB, and the lock
+        # loads and writes hold (re-entrant, as writing() may load).
+        self._score_dbs: Dict[str, ScoreDB] = {}
+        self._write_locks: Dict[str, threading.RLock] = {}
+        self._stats = {"hits": 0, "misses": 0, "loads": 0, "load_failures": 0, "evictions": 0,
+                       "load_seconds": 0.0}
+
+    def path(self, dataset_id: str) -> str:
+        """The file of a dataset (UnknownDataset if there is none)."""
+        if DATASET_ID.fullmatch(dataset_id):
+            for ext in leak_io.ENTRY_EXTENSIONS:
+                path = os.path.join(self.directory, dataset_id + ext)
+                if os.path.isfile(path):
+                    return path
+        raise UnknownDataset(dataset_id)
+
+    def ids(self) -> List[str]:
+        """Ids of the datasets in the directory, sorted."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        ids = set()
+        for name in names:
+            stem, ext = os.path.splitext(name)
+            if ext.lower() in leak_io.ENTRY_EXTENSIONS and DATASET_ID.fullmatch(stem):
+                ids.add(stem)
+        return sorted(ids)
+
+    def get(self, dataset_id: str) -> Dataset:
+        """A dataset, loaded first if it is not in memory."""
+        path = self.path(dataset_id)
+        while True:
+            with self._lock:
+                dataset = self._loaded.get(dataset_id)
+                if dataset is not None:
+                    self._loaded.move_to_end(dataset_id)
+                    dataset.last_used = time.time()
+                    self._stats["hits"] += 1
+                    DATASET_LOOKUPS.labels("hit").inc()
+                    return dataset
+                loading = self._loading.get(dataset_id)
+                if loading is None:
+                    loading = self._loading[dataset_id] = threading.Event()
+                    generation = self._generation
+                    self._stats["misses"] += 1
+                    DATASET_LOOKUPS.labels("miss").inc()
+                    break
+            # Another request is loading it.
+            loading.wait()
+
+        try:
+            dataset = self._load(dataset_id, path)
+        except Exception:
+            with self._lock:
+                self._stats["load_failures"] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._loading[dataset_id]
+            loading.set()
+
+        with self._lock:
+            self._stats["loads"] += 1
+            self._stats["load_seconds"] += dataset.load_seconds
+            if generation == self._generation:
+                self._loaded[dataset_id] = dataset
+                self._evict(keep=dataset_id)
+        return dataset
+
+    @contextmanager
+    def writing(self, dataset_id: str) -> Iterator[Dataset]:
+        """
+        The loaded dataset (loaded first if need be), with loads of it held
+        off until the block ends. Ingest into a dataset goes through here.
+        """
+        lock = self._write_lock(dataset_id)
+        while True:
+            # Not holding the lock while loading: get() may wait for a load
+            # by another thread, which needs it.
+            dataset = self.get(dataset_id)
+            with lock:
+                with self._lock:
+                    current = self._loaded.get(dataset_id) is dataset
+                if not current:
+                    continue  # evicted or cleared since; get the new copy
+                try:
+                    yield dataset
+                finally:
+                    with self._lock:
+                        if self._loaded.get(dataset_id) is not dataset:
+                            # Evicted meanwhile: the next load goes on from
+                            # the version the writes reached.
+                            self._versions[dataset_id] = max(self._versions.get(dataset_id, 0),
+                                                             dataset.store.version)
+                return
+
+    def _write_lock(self, dataset_id: str) -> threading.RLock:
+        with self._lock:
+            return self._write_locks.setdefault(dataset_id, threading.RLock())
+
+    def _load(self, dataset_id: str, path: str) -> Dataset:
+        start = time.perf_counter()
+        detector = self.detector()
+        db_path = os.path.splitext(path)[0] + ".db"
+        with self._write_lock(dataset_id):
+            with self._lock:
+                score_db = self._score_dbs.get(dataset_id)
+                if score_db is None and not self.read_only:
+                    score_db = self._score_dbs[dataset_id] = ScoreDB(db_path)
+                version = self._versions.get(dataset_id, 0)
+            db = ScoreDB(db_path, read_only=True) if score_db is None else score_db
+            try:
+                db.sync(detector, leak_io.iter_entries(path))
+                store = LeakStore()
+                store.version = version
+                store.add_results(db.load_results())
+            finally:
+                if db is not score_db:
+                    db.close()
+        print(f"[INFO] Loaded dataset {dataset_id} ({len(store)} rows)")
+        return Dataset(dataset_id, path, store, score_db, bytes_per_row=store.nbytes() / max(len(store), 1),
+                       load_seconds=time.perf_counter() - start)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Drop least recently used datasets until the rest fit the budget (lock held)."""
+        total = sum(d.nbytes for d in self._loaded.values())
+        for dataset_id in list(self._loaded):
+            if total <= self.memory_budget:
+                break
+            if dataset_id != keep:
+                total -= self._drop(dataset_id).nbytes
+                self._stats["evictions"] += 1
+                DATASET_EVICTIONS.inc()
+
+    def _drop(self, dataset_id: str) -> Dataset:
+        dataset = self._loaded.pop(dataset_id)
+        self._versions[dataset_id] = dataset.store.version
+        return dataset
+
+    def trim(self) -> None:
+        """Evict down to the budget again, e.g. after leaks were ingested into a dataset."""
+        with self._lock:
+            self._evict(keep=next(reversed(self._loaded), None))
+
+    def clear(self) -> None:
+        """Unload every dataset (e.g. after a model swap, so they are re-scored)."""
+        with self._lock:
+            for dataset_id in list(self._loaded):
+                self._drop(dataset_id)
+            self._generation += 1
+
+    def close(self) -> None:
+        """Unload every dataset and close their score DBs."""
+        self.clear()
+        with self._lock:
+            score_dbs, self._score_dbs = list(self._score_dbs.values()), {}
+        for score_db in score_dbs:
+            score_db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Lookups, loads and evictions so far, and the loaded datasets' memory."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["load_seconds"] = round(stats["load_seconds"], 3)
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+            stats["loaded"] = len(self._loaded)
+            stats["memory_bytes"] = sum(d.nbytes for d in self._loaded.values())
+            stats["memory_budget"] = self.memory_budget
+            return stats
+
+    def datasets(self) -> List[Dict[str, Any]]:
+        """Every dataset in the directory, with rows and memory of the loaded ones."""
+        with self._lock:
+            loaded = dict(self._loaded)
+        listing = []
+        for dataset_id in self.ids():
+            dataset = loaded.get(dataset_id)
+            info: Dict[str, Any] = {"id": dataset_id, "loaded": dataset is not None}
+            if dataset is not None:
+                info.update(rows=len(dataset.store), memory_bytes=dataset.nbytes,
+                            loaded_at=dataset.loaded_at, load_seconds=round(dataset.load_seconds, 3),
+                            last_used_at=datetime.fromtimestamp(dataset.last_used).isoformat())
+            listing.append(info)
+        return listing
@@ -0,0 +1,39 @@
+"""
+Fast JSON encoding for API responses.
+
+FastJSONProvider replaces Flask's json provider with orjson when it is
+installed (several times faster on the row lists /api/leaks returns, and
+it writes bytes directly instead of a str that is encoded again). The
+output matches jsonify: compact, keys sorted, one trailing newline.
+Without orjson it behaves exactly like Flask's default provider.
+"""
+
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    if orjson is not None:
+        OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+        def dumps(self, obj: Any, **kwargs: Any) -> str:
+            return orjson.dumps(obj, default=self.default, option=self.OPTIONS).decode()
+
+        def loads(self, s: Any, **kwargs: Any) -> Any:
+            return orjson.loads(s)
+
+    def encode(self, obj: Any) -> bytes:
+        """Response body for obj: the bytes jsonify(obj) would send."""
+        if orjson is not None:
+            return orjson.dumps(obj, default=self.default, option=self.OPTIONS | orjson.OPT_APPEND_NEWLINE)
+        return f"{super().dumps(obj, separators=(',', ':'))}\n".encode()
+
+    def response(self, *args: Any, **kwargs: Any) -> Any:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.encode(obj), mimetype=self.mimetype)
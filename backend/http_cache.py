@@ -0,0 +1,88 @@
+"""
+Conditional GET and pre-compressed bodies for the polled JSON endpoints.
+
+The dashboard polls /api/summary and /api/leaks although the data rarely
+changes between polls. Responses carry a strong ETag naming the dataset
+version (LeakStore.version, plus a per-process epoch so a restart never
+reuses one), so a poll that sends it back in If-None-Match gets a 304
+without anything being computed or encoded. Full bodies are encoded once
+per version and kept together with their gzip / brotli variants, each
+compressed the first time a client asks for it.
+"""
+
+import gzip
+import os
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional dependency: gzip only without it
+    brotli = None
+
+# Bodies below this many bytes are sent uncompressed (a TCP segment or so).
+MIN_COMPRESS_SIZE = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Content codings in order of preference.
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Distinguishes ETags of this process from those of earlier runs, whose
+# store versions restarted from the same numbers. Forked workers share it.
+EPOCH = os.urandom(4).hex()
+
+
+def etag(version: int, encoding: Optional[str] = None) -> str:
+    """ETag (unquoted) of a representation of the given store version."""
+    tag = f"{EPOCH}-{version}"
+    return f"{tag}-{encoding}" if encoding else tag
+
+
+def matching_etag(if_none_match: Iterable[str], version: int) -> Optional[str]:
+    """
+    The tag of an If-None-Match header (unquoted tags) that names the
+    current version in any of its encodings, if there is one.
+    """
+    current = {etag(version, encoding) for encoding in (None, *ENCODINGS)}
+    for tag in if_none_match:
+        if tag in current:
+            return tag
+        if tag == "*":
+            return etag(version)
+    return None
+
+
+def choose_encoding(accept_encodings: Any) -> Optional[str]:
+    """Preferred coding the client accepts (werkzeug Accept), or None."""
+    return accept_encodings.best_match(ENCODINGS)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        # mtime=0: the same body always compresses to the same bytes.
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported content coding: {encoding}")
+
+
+class EncodedBody:
+    """An encoded response body, its headers, and its compressed variants."""
+
+    def __init__(self, body: bytes, headers: Optional[Dict[str, str]] = None):
+        self.body = body
+        self.headers = headers or {}
+        self._variants: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def get(self, encoding: Optional[str]) -> Tuple[Optional[str], bytes]:
+        """(coding actually applied, bytes) for a client accepting encoding."""
+        if encoding is None or len(self.body) < MIN_COMPRESS_SIZE:
+            return None, self.body
+        with self._lock:
+            variant = self._variants.get(encoding)
+            if variant is None:
+                variant = self._variants[encoding] = compress(self.body, encoding)
+        return encoding, variant
@@ -0,0 +1,161 @@
+"""
+Cost-aware detection cascade: the rule engine in front of the ML model.
+
+Every entry is scored by the compiled rule patterns first, which costs one
+keyword pass over clean text (see PatternMatcher) against a TF-IDF
+transform plus the classifier for the model. Entries whose rule score is
+clearly low (below clear_below) or clearly high (leak_from or more) are
+resolved there, with the rule score as their risk score; only the
+ambiguous ones in between go to the model.
+
+With keywords_only the first stage is just the patterns' keyword
+prefilter: one search per entry, clearing entries that contain no keyword
+of any pattern (those the rules would score 0) and sending all others to
+the model. It resolves fewer entries but costs a fraction of full rule
+scoring.
+
+The number of entries resolved at each stage is counted, so the ML
+inference saved can be weighed against the accuracy given up
+(benchmark.py cascade measures both).
+"""
+
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from leak_detector import LeakDetector
+from metrics import CASCADE_RESOLVED
+from score_cache import DEFAULT_CACHE_SIZE, text_hash
+
+# Stages an entry can be resolved at: cleared or flagged by the first
+# stage, or scored by the model.
+CASCADE_STAGES = ("clear", "leak", "ml")
+
+# Rule scores below this are resolved as clear. The lightest pattern
+# weighs 20, so by default only entries without any pattern hit are.
+DEFAULT_CLEAR_BELOW = 20
+
+# Rule scores from this up are resolved as leaks (100 is the cap, reached
+# by several strong patterns together).
+DEFAULT_LEAK_FROM = 100
+
+
+class DetectionCascade:
+    """
+    Rule-engine first stage deciding which entries the ML model scores.
+
+    Thread-safe: the rule detector's cache and the counters are locked.
+    """
+
+    def __init__(self, clear_below: int = DEFAULT_CLEAR_BELOW, leak_from: int = DEFAULT_LEAK_FROM,
+                 keywords_only: bool = False,
+                 risk_patterns: Optional[Dict[str, Dict[str, Any]]] = None,
+                 cache_size: int = DEFAULT_CACHE_SIZE):
+        """
+        Args:
+            clear_below: Rule scores below this skip the model as clear
+                (0 disables)
+            leak_from: Rule scores of at least this skip the model as
+                leaks (above 100 disables)
+            keywords_only: First stage is the keyword prefilter alone
+                (the thresholds are then not used)
+            risk_patterns: Rule patterns to use instead of
+                LeakDetector.RISK_PATTERNS
+            cache_size: Rule scores memoised by entry text hash
+        """
+        if not 0 <= clear_below <= leak_from:
+            raise ValueError(f"Expected 0 <= clear_below <= leak_from, got {clear_below} and {leak_from}")
+        self.clear_below = clear_below
+        self.leak_from = leak_from
+        self.keywords_only = keywords_only
+        self.rules = LeakDetector(cache_size=cache_size)
+        if risk_patterns is not None:
+            self.rules.RISK_PATTERNS = {name: dict(info) for name, info in risk_patterns.items()}
+
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(CASCADE_STAGES, 0)
+
+    @property
+    def version(self) -> str:
+        """Digest of the thresholds and rule patterns (anything that changes resolved scores)."""
+        self.rules._get_matcher()
+        settings = "keywords" if self.keywords_only else f"{self.clear_below}:{self.leak_from}"
+        return text_hash(settings, self.rules._pattern_version)[:16]
+
+    def config(self) -> Dict[str, Any]:
+        """Constructor arguments rebuilding this cascade, e.g. in a worker process."""
+        return {
+            "clear_below": self.clear_below,
+            "leak_from": self.leak_from,
+            "keywords_only": self.keywords_only,
+            "risk_patterns": self.rules.RISK_PATTERNS,
+        }
+
+    def split(self, entries: Sequence[Dict[str, Any]]) -> Tuple[np.ndarray, List[int]]:
+        """
+        Run the first stage over entries.
+
+        Returns:
+            (probabilities, ambiguous): rule score / 100 for the entries
+            resolved here, and the positions of those the model must score
+            (their probabilities are NaN until filled in)
+        """
+        if self.keywords_only:
+            return self._split_keywords(entries)
+
+        probas = np.full(len(entries), np.nan)
+        ambiguous = []
+        clear = leak = 0
+        for i, entry in enumerate(entries):
+            score, _, detected_patterns = self.rules._score_entry(entry)
+            self.rules._record_scan(detected_patterns)
+            if score < self.clear_below:
+                clear += 1
+            elif score >= self.leak_from:
+                leak += 1
+            else:
+                ambiguous.append(i)
+                continue
+            probas[i] = score / 100
+
+        self._count(clear=clear, leak=leak, ml=len(ambiguous))
+        return probas, ambiguous
+
+    def _split_keywords(self, entries: Sequence[Dict[str, Any]]) -> Tuple[np.ndarray, List[int]]:
+        matcher = self.rules._get_matcher()
+        ambiguous = [i for i, entry in enumerate(entries) if matcher.may_match(self.rules._entry_text(entry))]
+        probas = np.zeros(len(entries))
+        probas[ambiguous] = np.nan
+        self._count(clear=len(entries) - len(ambiguous), ml=len(ambiguous))
+        return probas, ambiguous
+
+    def score(self, entries: Sequence[Dict[str, Any]],
+              predict: Callable[[List[Dict[str, Any]]], List[float]]) -> List[float]:
+        """Leak probability per entry; predict(entries) scores those the rules leave open."""
+        probas, ambiguous = self.split(entries)
+        if ambiguous:
+            probas[ambiguous] = predict([entries[i] for i in ambiguous])
+        return probas.tolist()
+
+    def _count(self, **resolved: int) -> None:
+        with self._lock:
+            for stage, n in resolved.items():
+                self._counts[stage] += n
+        for stage, n in resolved.items():
+            if n:
+                CASCADE_RESOLVED.labels(stage).inc(n)
+
+    def stats(self) -> Dict[str, Any]:
+        """Thresholds, and entries resolved per stage (counts and fractions)."""
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        return {
+            "clear_below": self.clear_below,
+            "leak_from": self.leak_from,
+            "keywords_only": self.keywords_only,
+            "entries": total,
+            "resolved": counts,
+            "fractions": {stage: round(n / total, 4) if total else 0.0 for stage, n in counts.items()},
+        }
@@ -0,0 +1,249 @@
+"""
+Near-duplicate clustering of leak entries with MinHash and LSH.
+
+The same breach is reposted across forums, paste sites and markets with
+small edits, which exact text hashes (the score caches) do not catch.
+ClusterIndex gives every entry a MinHash signature over the word
+shingles of its text and files it under an LSH banding index: a new
+entry only meets the clusters it shares a band with, so assignment costs
+a few table lookups instead of a comparison with every stored entry.
+
+Clustering is incremental and greedy: an entry joins the cluster whose
+representative (its first entry) it is most similar to, if the estimated
+Jaccard similarity reaches the threshold, and founds a new cluster
+otherwise. Only representatives are indexed. Entries without any text
+to compare each get a cluster of their own.
+"""
+
+import zlib
+from array import array
+from itertools import repeat
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from leak_detector_ml import LeakDetectorML
+
+# Where and when a copy was posted differs between reposts of one breach,
+# so these fields are left out of the text that is compared.
+REPOST_FIELDS = ("id", "source", "leaked_date")
+
+# Words per shingle.
+SHINGLE_SIZE = 3
+
+# MinHash signature length, as LSH bands x rows per band. 32 bands of 4
+# make pairs at Jaccard 0.6 candidates with ~99% probability (0.5: ~87%),
+# and pairs below 0.3 rarely (<25%).
+BANDS = 32
+BAND_ROWS = 4
+NUM_PERM = BANDS * BAND_ROWS
+
+# Estimated Jaccard similarity at which an entry joins a cluster.
+DEFAULT_THRESHOLD = 0.5
+
+# Texts hashed per vectorised step (bounds the shingles x NUM_PERM matrix).
+SIGNATURE_CHUNK_SIZE = 1024
+
+# LSH keys collected in a dict before they are merged into the sorted
+# arrays (or a quarter of those, if more).
+MERGE_SIZE = 1 << 16
+
+# Permutations h(x) = (a * x + b) mod 2**32 (a odd) of the shingle
+# hashes, and multipliers mixing word hashes into shingle hashes (_MIX) and
+# a band's rows plus its number into one LSH key (_BAND_MIX, _BAND_SALT).
+# Fixed seeds, so signatures are the same in every process.
+_rng = np.random.default_rng(0x5EED)
+_A = _rng.integers(1, 2 ** 32, (NUM_PERM, 1), dtype=np.uint32) | np.uint32(1)
+_B = _rng.integers(0, 2 ** 32, (NUM_PERM, 1), dtype=np.uint32)
+_MIX = _rng.integers(1, 2 ** 63, SHINGLE_SIZE, dtype=np.uint64) | np.uint64(1)
+_BAND_MIX = _rng.integers(1, 2 ** 63, (BANDS, BAND_ROWS), dtype=np.uint64) | np.uint64(1)
+_BAND_SALT = _rng.integers(0, 2 ** 63, BANDS, dtype=np.uint64)
+
+
+def cluster_text(entry: Dict[str, Any]) -> str:
+    """Text an entry is compared by: _entry_to_text() without REPOST_FIELDS."""
+    return LeakDetectorML._entry_to_text({k: v for k, v in entry.items() if k not in REPOST_FIELDS})
+
+
+def _shingle_hashes(texts: Sequence[str]) -> Tuple[np.ndarray, List[int]]:
+    """
+    32-bit hashes of the word shingles of texts, concatenated, and the
+    offset of each text's first one. A text shorter than a shingle is one
+    shingle (an empty one too).
+    """
+    # Each word is hashed once; shingles combine SHINGLE_SIZE word hashes.
+    # Texts are separated by SHINGLE_SIZE - 1 zero words, so a shorter
+    # text's single shingle is padded with zeros; an empty text counts as
+    # one zero word, so its shingle never reaches into the next text.
+    pad = [0] * (SHINGLE_SIZE - 1)
+    words: List[int] = []
+    firsts, counts = [], []
+    for text in texts:
+        firsts.append(len(words))
+        hashes = list(map(zlib.crc32, text.encode("utf-8").split())) or [0]
+        counts.append(max(1, len(hashes) - SHINGLE_SIZE + 1))
+        words.extend(hashes)
+        words.extend(pad)
+    w = np.array(words, dtype=np.uint64)
+
+    counts_arr = np.array(counts, dtype=np.int64)
+    offsets = np.cumsum(counts_arr) - counts_arr
+    starts = np.repeat(np.array(firsts, dtype=np.int64) - offsets, counts_arr) + np.arange(counts_arr.sum())
+    shingles = np.zeros(len(starts), dtype=np.uint64)
+    for k in range(SHINGLE_SIZE):
+        shingles += w[starts + k] * _MIX[k]
+    # The high half depends on every bit of every word hash.
+    return (shingles >> np.uint64(32)).astype(np.uint32), offsets.tolist()
+
+
+def signatures(texts: Sequence[str]) -> np.ndarray:
+    """MinHash signatures of texts, shape (len(texts), NUM_PERM), uint32."""
+    out = np.empty((len(texts), NUM_PERM), dtype=np.uint32)
+    for start in range(0, len(texts), SIGNATURE_CHUNK_SIZE):
+        chunk = texts[start:start + SIGNATURE_CHUNK_SIZE]
+        shingles, offsets = _shingle_hashes(chunk)
+        # One row per permutation keeps each text's shingles contiguous for
+        # reduceat; uint32 arithmetic wraps, which is the "mod 2**32".
+        permuted = _A * shingles
+        permuted += _B
+        out[start:start + len(chunk)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+    return out
+
+
+def band_keys(sigs: np.ndarray) -> np.ndarray:
+    """LSH key of each band of each signature, shape (len(sigs), BANDS), uint64."""
+    bands = sigs.reshape(len(sigs), BANDS, BAND_ROWS).astype(np.uint64)
+    return (bands * _BAND_MIX).sum(axis=2, dtype=np.uint64) ^ _BAND_SALT
+
+
+class ClusterIndex:
+    """
+    Cluster of every row (by position), with an LSH index over the
+    representatives' signatures.
+
+    Not thread-safe; LeakStore serialises access.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        # Cluster id per row position; clusters are numbered in order of creation.
+        self.cluster_of = array("q")
+        # Position of each cluster's representative, and its number of rows.
+        self.representatives = array("q")
+        self.sizes = array("q")
+        # Representatives' signatures, high 16 bits of each minimum: half the
+        # memory, and unequal minima agree by chance only once in 65536.
+        self._signatures = np.empty((0, NUM_PERM), dtype=np.uint16)
+        # LSH table: band key (see band_keys()) -> the latest cluster whose
+        # representative has it. Representatives sharing a band are similar
+        # already, and still meet new entries through their other bands.
+        # Keys are kept sorted in arrays (12 bytes each, where a dict entry
+        # costs ~100), with those added since the last merge in a dict.
+        self._keys = np.empty(0, dtype=np.uint64)
+        self._key_clusters = np.empty(0, dtype=np.int32)
+        self._recent: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.representatives)
+
+    def add(self, texts: Sequence[str]) -> None:
+        """Assign the next len(texts) row positions to clusters."""
+        sigs, keys, indexed = self._prepare(texts)
+        first = len(self.cluster_of)
+        if len(self) + len(texts) > len(self._signatures):
+            grown = np.empty((max(len(self) + len(texts), 2 * len(self._signatures), 1024), NUM_PERM),
+                             dtype=np.uint16)
+            grown[:len(self)] = self._signatures[:len(self)]
+            self._signatures = grown
+
+        for i, sig in enumerate(sigs):
+            blank = not texts[i].strip()
+            cluster = None if blank else self._best_match(sig, keys[i], indexed[i])
+            if cluster is None:
+                cluster = len(self)
+                self._signatures[cluster] = sig
+                self.representatives.append(first + i)
+                self.sizes.append(0)
+                if not blank:
+                    self._recent.update(zip(keys[i], repeat(cluster)))
+            self.sizes[cluster] += 1
+            self.cluster_of.append(cluster)
+
+        if len(self._recent) >= max(MERGE_SIZE, len(self._keys) // 4):
+            self._merge()
+
+    def match(self, texts: Sequence[str]) -> List[Optional[int]]:
+        """Cluster each text would join (None for a new one), without adding it."""
+        sigs, keys, indexed = self._prepare(texts)
+        return [self._best_match(sig, keys[i], indexed[i]) if texts[i].strip() else None
+                for i, sig in enumerate(sigs)]
+
+    def _prepare(self, texts: Sequence[str]) -> Tuple[np.ndarray, List[List[int]], List[List[int]]]:
+        """16-bit signatures, band keys, and the merged table's cluster per key (-1: none)."""
+        sigs = signatures(texts)
+        keys = band_keys(sigs)
+        indexed = np.full(keys.size, -1, dtype=np.int64)
+        if len(self._keys):
+            # Searching in key order walks the table once.
+            flat = keys.ravel()
+            order = np.argsort(flat)
+            at = np.searchsorted(self._keys, flat[order]).clip(max=len(self._keys) - 1)
+            hit = self._keys[at] == flat[order]
+            indexed[order[hit]] = self._key_clusters[at[hit]]
+        indexed = indexed.reshape(keys.shape)
+        return (sigs >> np.uint32(16)).astype(np.uint16), keys.tolist(), indexed.tolist()
+
+    def _best_match(self, sig: np.ndarray, keys: List[int], indexed: List[int]) -> Optional[int]:
+        candidates = set(indexed)
+        candidates.update(map(self._recent.get, keys))
+        candidates.discard(-1)
+        candidates.discard(None)
+        if not candidates:
+            return None
+        ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarity = np.count_nonzero(self._signatures[ids] == sig, axis=1) / NUM_PERM
+        best = int(np.argmax(similarity))
+        return int(ids[best]) if similarity[best] >= self.threshold else None
+
+    def _merge(self) -> None:
+        """Move the recent keys into the sorted arrays (recent ones win)."""
+        keys = np.fromiter(self._recent, dtype=np.uint64, count=len(self._recent))
+        clusters = np.fromiter(self._recent.values(), dtype=np.int32, count=len(self._recent))
+        order = np.argsort(keys)
+        keys, clusters = keys[order], clusters[order]
+        at = np.searchsorted(self._keys, keys)
+        known = at < len(self._keys)
+        known[known] = self._keys[at[known]] == keys[known]
+        self._key_clusters[at[known]] = clusters[known]
+        new = ~known
+        self._keys = np.insert(self._keys, at[new], keys[new])
+        self._key_clusters = np.insert(self._key_clusters, at[new], clusters[new])
+        self._recent = {}
+
+    def rollback(self, rows: int, clusters: int) -> None:
+        """
+        Forget the rows from position rows on and the clusters from id
+        clusters on (the sizes before an add()). Table keys the dropped
+        clusters took over from older ones are not restored, which only
+        costs those older clusters some recall.
+        """
+        for cluster in self.cluster_of[rows:]:
+            if cluster < clusters:
+                self.sizes[cluster] -= 1
+        del self.cluster_of[rows:]
+        del self.representatives[clusters:]
+        del self.sizes[clusters:]
+        self._recent = {key: c for key, c in self._recent.items() if c < clusters}
+        kept = self._key_clusters < clusters
+        if not kept.all():
+            self._keys, self._key_clusters = self._keys[kept], self._key_clusters[kept]
+
+    def nbytes(self) -> int:
+        """Approximate memory held (a dict entry counted as ~100 bytes)."""
+        arrays = (self.cluster_of, self.representatives, self.sizes)
+        return (sum(len(a) * a.itemsize for a in arrays) + self._signatures.nbytes
+                + self._keys.nbytes + self._key_clusters.nbytes + 100 * len(self._recent))
+
+    def members(self, cluster: int) -> np.ndarray:
+        """Ascending row positions of a cluster."""
+        return np.flatnonzero(np.frombuffer(self.cluster_of, dtype=np.int64) == cluster)
@@ -7,9 +7,197 @@ from simulated dark web datasets.
 import csv
 import json
 import re
-from typing import List, Dict, Any
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Pattern
 from datetime import datetime
 
+import leak_io
+from metrics import ENTRIES_LOADED, ENTRIES_SCANNED, PATTERN_HITS, STAGE_SECONDS
+from score_cache import DEFAULT_CACHE_SIZE, ScoreCache, text_hash
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+
+_REPEAT_OPS = tuple(
+    getattr(sre_constants, name)
+    for name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT')
+    if hasattr(sre_constants, name)
+)
+
+
+def _leading_literal(items) -> str:
+    """Return the literal characters a parsed regex sequence starts with."""
+    chars = []
+    for op, av in items:
+        if op is not sre_constants.LITERAL:
+            break
+        chars.append(chr(av))
+    return ''.join(chars)
+
+
+def _required_literals(items) -> Optional[List[str]]:
+    """
+    Find keywords that every match of a parsed regex sequence must contain.
+
+    Args:
+        items: Parsed regex (output of sre_parse.parse) or a sub-sequence
+
+    Returns:
+        List of literals such that any match contains at least one of them,
+        or None if no such set could be derived. When several sets are
+        possible, the one whose shortest literal is longest is chosen.
+    """
+    best = None
+    run = []
+
+    def consider(candidates):
+        nonlocal best
+        if not candidates or not all(candidates):
+            return
+        if best is None or min(map(len, candidates)) > min(map(len, best)):
+            best = candidates
+
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            run.append(chr(av))
+            continue
+
+        prefix = ''.join(run)
+        run = []
+        consider([prefix])
+
+        if op is sre_constants.SUBPATTERN:
+            consider(_required_literals(av[-1]))
+        elif op is sre_constants.BRANCH:
+            alternatives = [_required_literals(alt) for alt in av[1]]
+            if all(alt is not None for alt in alternatives):
+                consider([lit for alt in alternatives for lit in alt])
+            if prefix:
+                # sre_parse factors common prefixes out of alternations
+                # ("password|pwd" -> "p" + ("assword"|"wd")); glue them back.
+                consider([prefix + _leading_literal(alt) for alt in av[1]])
+        elif op in _REPEAT_OPS and av[0] >= 1:
+            consider(_required_literals(av[2]))
+
+    consider([''.join(run)])
+    return best
+
+
+class PatternMatcher:
+    """
+    Reports which of a set of named regex patterns occur in a text.
+
+    Every pattern is reduced to keywords that any of its matches must
+    contain, and all keywords are combined into one alternation. A scan
+    walks the text once with that alternation and only evaluates the full
+    regex of categories whose keywords were seen, so clean text costs a
+    single pass regardless of how many patterns are registered. Patterns
+    without an extractable keyword are always evaluated.
+    """
+
+    def __init__(self, patterns: Dict[str, str], flags: int = re.IGNORECASE):
+        """
+        Compile the matcher.
+
+        Args:
+            patterns: Mapping of category name to regex source
+            flags: Flags used for the full regexes
+        """
+        self.names = list(patterns)
+        self._regexes = [re.compile(patterns[name], flags) for name in self.names]
+        self._always = 0
+        self._keyword_owners: Dict[str, int] = {}
+
+        for index, name in enumerate(self.names):
+            literals = _required_literals(sre_parse.parse(patterns[name], flags))
+            if literals is None:
+                self._always |= 1 << index
+                continue
+            for literal in literals:
+                literal = literal.lower()
+                self._keyword_owners[literal] = self._keyword_owners.get(literal, 0) | 1 << index
+
+        self._keyword_mask = ((1 << len(self.names)) - 1) & ~self._always
+        self._keyword_regexes: Dict[int, Pattern] = {}
+
+    def _keyword_regex(self, mask: int) -> Pattern:
+        """Return the keyword alternation for the categories in mask."""
+        regex = self._keyword_regexes.get(mask)
+        if regex is None:
+            keywords = sorted(
+                (kw for kw, owners in self._keyword_owners.items() if owners & mask),
+                key=len,
+                reverse=True,
+            )
+            regex = re.compile('|'.join(map(re.escape, keywords)))
+            self._keyword_regexes[mask] = regex
+        return regex
+
+    def may_match(self, text: str) -> bool:
+        """
+        Whether any pattern could match a text: False only if none of
+        their keywords occurs in it. One search, no full regex.
+
+        Args:
+            text: Lowercased text to scan
+        """
+        if self._always:
+            return True
+        return bool(self._keyword_mask) and self._keyword_regex(self._keyword_mask).search(text) is not None
+
+    def match(self, text: str) -> List[str]:
+        """
+        Find the categories that match a text.
+
+        Args:
+            text: Lowercased text to scan
+
+        Returns:
+            Matching category names, in pattern definition order
+        """
+        candidates = self._always
+        remaining = self._keyword_mask
+        pos = 0
+
+        # Each hit removes its categories' keywords from the alternation, so
+        # the text is walked once and a hit is only reported once per category.
+        while remaining:
+            found = self._keyword_regex(remaining).search(text, pos)
+            if found is None:
+                break
+            owners = self._keyword_owners[found.group()] & remaining
+            candidates |= owners
+            remaining &= ~owners
+            pos = found.start()
+
+        return [
+            name
+            for index, name in enumerate(self.names)
+            if candidates >> index & 1 and self._regexes[index].search(text)
+        ]
+
+
+# Detector used by process-pool workers, built once per worker by _init_worker.
+_worker_detector = None
+
+
+def _init_worker(risk_patterns: Dict[str, Dict[str, Any]]) -> None:
+    """Build the worker's detector (and its compiled matcher) once per process."""
+    global _worker_detector
+    _worker_detector = LeakDetector()
+    _worker_detector.RISK_PATTERNS = risk_patterns
+    _worker_detector._get_matcher()
+
+
+def _score_chunk(entries: List[Dict[str, Any]]) -> List[tuple]:
+    """Score a chunk of entries in a worker process."""
+    return [_worker_detector._score_entry(entry) for entry in entries]
+
 
 class LeakDetector:
     """Main class for detecting and analyzing data leaks."""
@@ -33,10 +221,67 @@ class LeakDetector:
         'high': (75, 100)
     }
     
-    def __init__(self):
-        """Initialize the leak detector."""
+    # Below this many entries scan_all(workers=N) stays serial: pool startup
+    # and pickling cost more than the scan itself.
+    PARALLEL_THRESHOLD = 5000
+    
+    # Entries sent to a worker per task
+    PARALLEL_CHUNK_SIZE = 1000
+    
+    def __init__(self, cache_size: int = DEFAULT_CACHE_SIZE):
+        """
+        Initialize the leak detector.
+        
+        Args:
+            cache_size: Scores memoised by entry text hash (0 disables)
+        """
         self.leaks = []
         self.scan_results = []
+        # Per-instance copy so add_pattern/remove_pattern don't leak across detectors
+        self.RISK_PATTERNS = {name: dict(info) for name, info in self.RISK_PATTERNS.items()}
+        self._matcher = None
+        self._matcher_key = None
+        self._pattern_version = None
+        self.cache = ScoreCache(cache_size) if cache_size else None
+    
+    def add_pattern(self, name: str, pattern: str, weight: int) -> None:
+        """
+        Register (or replace) a risk pattern.
+        
+        Args:
+            name: Pattern category name reported in detected_patterns
+            pattern: Regular expression, matched case-insensitively
+            weight: Risk score added when the pattern matches
+        """
+        self.RISK_PATTERNS[name] = {'weight': weight, 'pattern': pattern}
+        self._matcher = None
+    
+    def remove_pattern(self, name: str) -> None:
+        """
+        Remove a risk pattern.
+        
+        Args:
+            name: Pattern category name
+        """
+        del self.RISK_PATTERNS[name]
+        self._matcher = None
+    
+    def _get_matcher(self) -> PatternMatcher:
+        """
+        Return the compiled matcher, rebuilding it if RISK_PATTERNS changed.
+        
+        Returns:
+            PatternMatcher for the current pattern set
+        """
+        key = tuple(
+            (name, info['pattern'], info['weight']) for name, info in self.RISK_PATTERNS.items()
+        )
+        if self._matcher is None or key != self._matcher_key:
+            self._matcher = PatternMatcher({name: pattern for name, pattern, _ in key})
+            self._matcher_key = key
+            # Namespaces cached scores, so any pattern or weight change invalidates them
+            self._pattern_version = text_hash(repr(key))
+        return self._matcher
     
     def load_csv(self, filepath: str) -> List[Dict[str, Any]]:
         """
@@ -50,10 +295,11 @@ class LeakDetector:
         """
         data = []
         try:
-            with open(filepath, 'r', encoding='utf-8') as file:
+            with STAGE_SECONDS.labels('load').time(), open(filepath, 'r', encoding='utf-8') as file:
                 reader = csv.DictReader(file)
                 for row in reader:
                     data.append(row)
+            ENTRIES_LOADED.labels('csv').inc(len(data))
             self.leaks = data
             return data
         except FileNotFoundError:
@@ -72,9 +318,10 @@ class LeakDetector:
             List of dictionaries containing the data
         """
         try:
-            with open(filepath, 'r', encoding='utf-8') as file:
+            with STAGE_SECONDS.labels('load').time(), open(filepath, 'r', encoding='utf-8') as file:
                 data = json.load(file)
             self.leaks = data if isinstance(data, list) else [data]
+            ENTRIES_LOADED.labels('json').inc(len(self.leaks))
             return self.leaks
         except FileNotFoundError:
             raise FileNotFoundError(f"File not found: {filepath}")
@@ -83,6 +330,42 @@ class LeakDetector:
         except Exception as e:
             raise Exception(f"Error loading JSON: {str(e)}")
     
+    def iter_csv(self, filepath: str) -> Iterator[Dict[str, Any]]:
+        """
+        Stream rows from a CSV file without loading it into self.leaks.
+        
+        Args:
+            filepath: Path to the CSV file
+            
+        Returns:
+            Iterator over entry dictionaries
+        """
+        return leak_io.iter_csv(filepath)
+    
+    def iter_json(self, filepath: str) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the items of a JSON array file without loading it into self.leaks.
+        
+        Args:
+            filepath: Path to the JSON file
+            
+        Returns:
+            Iterator over entry dictionaries
+        """
+        return leak_io.iter_json(filepath)
+    
+    def iter_ndjson(self, filepath: str) -> Iterator[Dict[str, Any]]:
+        """
+        Stream entries from a newline-delimited JSON file.
+        
+        Args:
+            filepath: Path to the NDJSON file
+            
+        Returns:
+            Iterator over entry dictionaries
+        """
+        return leak_io.iter_ndjson(filepath)
+    
     def scan_entry(self, entry: Dict[str, Any]) -> Dict[str, Any]:
         """
         Scan a single entry for potential data leaks.
@@ -93,17 +376,52 @@ class LeakDetector:
         Returns:
             Dictionary with scan results including risk score and level
         """
-        risk_score = 0
-        detected_patterns = []
+        risk_score, risk_level, detected_patterns = self._score_entry(entry)
+        self._record_scan(detected_patterns)
+        
+        return {
+            'entry': entry,
+            'risk_score': risk_score,
+            'risk_level': risk_level,
+            'detected_patterns': detected_patterns,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    @staticmethod
+    def _record_scan(detected_patterns: List[str]) -> None:
+        """Count one scanned entry and its pattern hits."""
+        ENTRIES_SCANNED.labels('rules').inc()
+        for name in detected_patterns:
+            PATTERN_HITS.labels(name).inc()
+    
+    @staticmethod
+    def _entry_text(entry: Dict[str, Any]) -> str:
+        """Lowercased text of all entry values, as the patterns are matched against."""
+        return ' '.join(str(value).lower() for value in entry.values())
+    
+    def _score_entry(self, entry: Dict[str, Any]) -> tuple:
+        """
+        Compute the risk score of a single entry.
+        
+        Args:
+            entry: Dictionary containing the entry data
+            
+        Returns:
+            Tuple of (risk_score, risk_level, detected_patterns)
+        """
+        entry_text = self._entry_text(entry)
         
-        # Convert all values to string for scanning
-        entry_text = ' '.join(str(value).lower() for value in entry.values())
+        matcher = self._get_matcher()
+        if self.cache is not None:
+            key = text_hash(entry_text, self._pattern_version)
+            cached = self.cache.get(key)
+            if cached is not None:
+                risk_score, risk_level, detected_patterns = cached
+                return risk_score, risk_level, list(detected_patterns)
         
-        # Check each pattern
-        for pattern_name, pattern_info in self.RISK_PATTERNS.items():
-            if re.search(pattern_info['pattern'], entry_text, re.IGNORECASE):
-                risk_score += pattern_info['weight']
-                detected_patterns.append(pattern_name)
+        # Check all patterns in one pass
+        detected_patterns = matcher.match(entry_text)
+        risk_score = sum(self.RISK_PATTERNS[name]['weight'] for name in detected_patterns)
         
         # Cap risk score at 100
         risk_score = min(risk_score, 100)
@@ -111,13 +429,10 @@ class LeakDetector:
         # Determine risk level
         risk_level = self._calculate_risk_level(risk_score)
         
-        return {
-            'entry': entry,
-            'risk_score': risk_score,
-            'risk_level': risk_level,
-            'detected_patterns': detected_patterns,
-            'timestamp': datetime.now().isoformat()
-        }
+        if self.cache is not None:
+            self.cache.put(key, [risk_score, risk_level, list(detected_patterns)])
+        
+        return risk_score, risk_level, detected_patterns
     
     def _calculate_risk_level(self, score: int) -> str:
         """
@@ -134,23 +449,70 @@ class LeakDetector:
                 return level
         return 'high'  # Default to high if score >= 75
     
-    def scan_all(self) -> List[Dict[str, Any]]:
+    def scan_all(self, workers: int = 1) -> List[Dict[str, Any]]:
         """
         Scan all loaded entries for potential data leaks.
         
+        Args:
+            workers: Number of worker processes. With more than one worker,
+                entries are scored in chunks on a process pool (results keep
+                input order); inputs below PARALLEL_THRESHOLD stay serial.
+        
         Returns:
             List of scan results
         """
         if not self.leaks:
             raise ValueError("No data loaded. Please load data first.")
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1, got {workers}")
+        
+        if workers == 1 or len(self.leaks) < self.PARALLEL_THRESHOLD:
+            self.scan_results = []
+            with STAGE_SECONDS.labels('match').time():
+                for entry in self.leaks:
+                    result = self.scan_entry(entry)
+                    self.scan_results.append(result)
+            return self.scan_results
+        
+        size = self.PARALLEL_CHUNK_SIZE
+        chunks = [self.leaks[i:i + size] for i in range(0, len(self.leaks), size)]
         
+        # Patterns are handed to each worker once; tasks carry only entries
+        # and return only scores, so each entry is not pickled back.
         self.scan_results = []
-        for entry in self.leaks:
-            result = self.scan_entry(entry)
-            self.scan_results.append(result)
+        with STAGE_SECONDS.labels('match').time(), \
+                ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                    initargs=(self.RISK_PATTERNS,)) as pool:
+            for chunk, scores in zip(chunks, pool.map(_score_chunk, chunks)):
+                timestamp = datetime.now().isoformat()
+                for entry, (risk_score, risk_level, detected_patterns) in zip(chunk, scores):
+                    self._record_scan(detected_patterns)
+                    self.scan_results.append({
+                        'entry': entry,
+                        'risk_score': risk_score,
+                        'risk_level': risk_level,
+                        'detected_patterns': detected_patterns,
+                        'timestamp': timestamp
+                    })
         
         return self.scan_results
     
+    def scan_stream(self, entries: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily scan entries from any iterable, e.g. iter_csv().
+        
+        Results are yielded one at a time and not kept in self.scan_results,
+        so memory stays bounded regardless of the input size.
+        
+        Args:
+            entries: Iterable of entry dictionaries
+            
+        Returns:
+            Iterator over scan results
+        """
+        for entry in entries:
+            yield self.scan_entry(entry)
+    
     def generate_summary(self) -> Dict[str, Any]:
         """
         Generate a summary of the scan results.
@@ -199,43 +561,60 @@ class LeakDetector:
         
         return [result for result in self.scan_results if result['risk_level'] == 'high']
     
-    def export_results(self, filepath: str, format: str = 'json') -> None:
+    def export_results(self, filepath: str, format: str = 'json',
+                       results: Optional[Iterable[Dict[str, Any]]] = None,
+                       compress: bool = False) -> None:
         """
-        Export scan results to a file.
+        Export scan results to a file, streaming one chunk of rows at a time.
         
         Args:
             filepath: Path to save the results
-            format: Output format ('json' or 'csv')
+            format: Output format ('json', 'ndjson' or 'csv')
+            results: Results to export instead of self.scan_results, e.g.
+                scan_stream() output, so nothing has to be held in memory
+            compress: Gzip the output
         """
-        if not self.scan_results:
-            raise ValueError("No scan results available. Please run scan_all() first.")
+        if results is None:
+            if not self.scan_results:
+                raise ValueError("No scan results available. Please run scan_all() first.")
+            results = self.scan_results
+        
+        if format not in leak_io.EXPORT_FORMATS:
+            raise ValueError(f"Unsupported format: {format}. Use 'json', 'ndjson' or 'csv'.")
         
-        if format == 'json':
-            with open(filepath, 'w', encoding='utf-8') as file:
-                json.dump(self.scan_results, file, indent=2)
-        elif format == 'csv':
-            with open(filepath, 'w', encoding='utf-8', newline='') as file:
-                if self.scan_results:
-                    fieldnames = ['risk_score', 'risk_level', 'detected_patterns', 'timestamp']
-                    # Add entry fields
-                    if 'entry' in self.scan_results[0]:
-                        fieldnames.extend(self.scan_results[0]['entry'].keys())
-                    
-                    writer = csv.DictWriter(file, fieldnames=fieldnames)
-                    writer.writeheader()
-                    
-                    for result in self.scan_results:
-                        row = {
-                            'risk_score': result['risk_score'],
-                            'risk_level': result['risk_level'],
-                            'detected_patterns': ', '.join(result['detected_patterns']),
-                            'timestamp': result['timestamp']
-                        }
-                        row.update(result['entry'])
-                        writer.writerow(row)
+        if format != 'csv':
+            chunks = leak_io.iter_export_chunks(results, format)
         else:
-            raise ValueError(f"Unsupported format: {format}. Use 'json' or 'csv'.")
-
+            results = iter(results)
+            first = next(results, None)
+            fieldnames = ['risk_score', 'risk_level', 'detected_patterns', 'timestamp']
+            # Add entry fields
+            if first is not None and 'entry' in first:
+                fieldnames.extend(first['entry'].keys())
+            rows = (self._flatten_result(r) for r in chain([first] if first is not None else [], results))
+            chunks = leak_io.iter_csv_chunks(rows, fieldnames)
+        
+        leak_io.write_chunks(filepath, chunks, compress=compress)
+    
+    @staticmethod
+    def _flatten_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Flatten a scan result into a CSV row.
+        
+        Args:
+            result: Scan result from scan_entry()
+            
+        Returns:
+            Row with the score columns followed by the entry fields
+        """
+        row = {
+            'risk_score': result['risk_score'],
+            'risk_level': result['risk_level'],
+            'detected_patterns': ', '.join(result['detected_patterns']),
+            'timestamp': result['timestamp']
+        }
+        row.update(result['entry'])
+        return row
 
 def main():
     """Example usage of the LeakDetector."""
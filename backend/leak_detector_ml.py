@@ -1,23 +1,87 @@
 import csv
 import json
-from typing import List, Dict, Any, Optional
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from datetime import datetime
 
-import joblib
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.pipeline import Pipeline
+import numpy as np
+
+import leak_io
+from compiled_model import CompiledLeakModel, file_digest
+from leak_cascade import DetectionCascade
+from leak_results import LEAK_THRESHOLD, PREDICTIONS, RISK_LEVELS, ScanResults, risk_level
+from metrics import ENTRIES_LOADED, ENTRIES_SCANNED, STAGE_SECONDS
+from score_cache import DEFAULT_CACHE_SIZE, ScoreCache, text_hash
+
+
+# Rows per predict_proba call in batched scans. Large enough to amortise
+# sklearn's per-call input validation, small enough to keep the sparse
+# TF-IDF matrix for one chunk cheap to hold.
+DEFAULT_BATCH_SIZE = 2048
+
+# Below this many entries scan_all(workers=N) stays serial: forking the pool
+# and shipping entries costs more than batched inference on one core.
+PARALLEL_THRESHOLD = 20000
+
+# Labelled rows per partial_fit call in streaming training. Bounds training
+# memory to one chunk of texts and its sparse feature matrix.
+DEFAULT_TRAIN_CHUNK_SIZE = 50_000
+
+# Width of the hashed feature space used by streaming training (2**20
+# buckets keeps collisions rare for word unigrams + bigrams; the
+# classifier's weights are 8 MB).
+HASH_FEATURES = 2 ** 20
+
+# Model used by process-pool workers, installed once per worker by _init_worker.
+_worker_model = None
+
+
+def _init_worker(model: Any) -> None:
+    global _worker_model
+    _worker_model = model
+
+
+def _predict_chunk(entries: List[Dict[str, Any]]) -> List[float]:
+    return _predict_texts([LeakDetectorML._entry_to_text(e, label_field="label") for e in entries])
+
+
+def _predict_texts(texts: List[str]) -> List[float]:
+    if not texts:
+        return []
+    return _worker_model.predict_proba(texts)[:, 1].tolist()
 
 
 class LeakDetectorML:
-    def __init__(self, model_path: str = "../models/leak_model.pkl"):
+    def __init__(self, model_path: str = "../models/leak_model.pkl",
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 cache_size: int = DEFAULT_CACHE_SIZE,
+                 cascade: Optional[DetectionCascade] = None):
         self.leaks: List[Dict[str, Any]] = []
-        self.scan_results: List[Dict[str, Any]] = []
+        self.scan_results = ScanResults()
         self.model_path = model_path
-        self.model: Optional[Pipeline] = None
+        self.batch_size = batch_size
+        # sklearn Pipeline, or a CompiledLeakModel when model_path is a
+        # compiled model directory (loads without importing sklearn).
+        self.model: Optional[Any] = None
+        # Digest of the model file; tags persisted scores with the model that produced them.
+        self.model_version: Optional[str] = None
+        # Memoised probabilities keyed by hash of (model_version, entry text); 0 disables.
+        self.cache: Optional[ScoreCache] = ScoreCache(cache_size) if cache_size else None
+        # Rule-engine first stage (see leak_cascade.py); only the entries it
+        # leaves open reach the model. None scores everything with the model.
+        self.cascade = cascade
 
         try:
-            self.model = joblib.load(self.model_path)
+            if os.path.isdir(self.model_path):
+                self.model = CompiledLeakModel(self.model_path)
+                self.model_version = self.model.version
+            else:
+                import joblib
+
+                self.model = joblib.load(self.model_path)
+                self.model_version = self._file_digest(self.model_path)
             print(f"[INFO] Loaded trained model from {self.model_path}")
         except Exception:
             print("[INFO] No trained model found yet. Train the model first.")
@@ -26,21 +90,45 @@ class LeakDetectorML:
 
     def load_csv(self, filepath: str) -> List[Dict[str, Any]]:
         data: List[Dict[str, Any]] = []
-        with open(filepath, "r", encoding="utf-8") as f:
+        with STAGE_SECONDS.labels("load").time(), open(filepath, "r", encoding="utf-8") as f:
             reader = csv.DictReader(f)
             for row in reader:
                 data.append(row)
+        ENTRIES_LOADED.labels("csv").inc(len(data))
         self.leaks = data
         return data
 
     def load_json(self, filepath: str) -> List[Dict[str, Any]]:
-        with open(filepath, "r", encoding="utf-8") as f:
+        with STAGE_SECONDS.labels("load").time(), open(filepath, "r", encoding="utf-8") as f:
             data = json.load(f)
         self.leaks = data if isinstance(data, list) else [data]
+        ENTRIES_LOADED.labels("json").inc(len(self.leaks))
         return self.leaks
 
+    # Streaming readers: yield entries one at a time without touching self.leaks.
+
+    def iter_csv(self, filepath: str) -> Iterator[Dict[str, Any]]:
+        return leak_io.iter_csv(filepath)
+
+    def iter_json(self, filepath: str) -> Iterator[Dict[str, Any]]:
+        return leak_io.iter_json(filepath)
+
+    def iter_ndjson(self, filepath: str) -> Iterator[Dict[str, Any]]:
+        return leak_io.iter_ndjson(filepath)
+
     # ------------------- HELPERS -------------------
 
+    @property
+    def score_version(self) -> Optional[str]:
+        """Version persisted scores are tagged with: the model's, plus the cascade's if any."""
+        if self.model_version is None or self.cascade is None:
+            return self.model_version
+        return f"{self.model_version}+cascade-{self.cascade.version}"
+
+    @staticmethod
+    def _file_digest(path: str) -> str:
+        return file_digest(path)
+
     @staticmethod
     def _entry_to_text(entry: Dict[str, Any], label_field: str = "label") -> str:
         parts = []
@@ -53,6 +141,11 @@ class LeakDetectorML:
     # ------------------- TRAINING -------------------
 
     def train_model_from_csv(self, filepath: str, label_field: str = "label") -> None:
+        import joblib
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.pipeline import Pipeline
+
         print(f"[INFO] Loading training data from {filepath} ...")
         training_data = self.load_csv(filepath)
 
@@ -82,42 +175,276 @@ class LeakDetectorML:
 
         self.model = pipeline
         joblib.dump(self.model, self.model_path)
+        self.model_version = self._file_digest(self.model_path)
+        print(f"[INFO] Model saved to {self.model_path}")
+
+    def train_model_streaming(self, filepath: str, label_field: str = "label",
+                              chunk_size: int = DEFAULT_TRAIN_CHUNK_SIZE, update: bool = True) -> int:
+        """
+        Train (or keep training) a model on a labelled file in fixed memory.
+
+        Rows are read a chunk at a time and fed to partial_fit, so the file
+        is never held in memory and training data seen earlier is not
+        revisited. Features come from a HashingVectorizer, which needs no
+        vocabulary and therefore no pass over the data before training.
+
+        Args:
+            filepath: Labelled .csv, .json, .ndjson or .jsonl file
+            label_field: Column holding the 0/1 label
+            chunk_size: Rows per partial_fit call
+            update: Continue from the loaded streaming model (a new one is
+                started if no model is loaded); False always starts a new one
+
+        Returns:
+            Number of rows trained on
+
+        Raises:
+            ValueError: If update is set and the loaded model is not a
+                streaming model (e.g. a TF-IDF pipeline)
+        """
+        import joblib
+
+        if update and self.model is not None and not self._is_streaming_model(self.model):
+            raise ValueError("loaded model cannot be updated incrementally; pass update=False")
+        pipeline = self.model if update else None
+        if pipeline is None:
+            from sklearn.feature_extraction.text import HashingVectorizer
+            from sklearn.linear_model import SGDClassifier
+            from sklearn.pipeline import Pipeline
+
+            pipeline = Pipeline(
+                steps=[
+                    ("hash", HashingVectorizer(
+                        n_features=HASH_FEATURES,
+                        ngram_range=(1, 2),
+                        stop_words="english",
+                        alternate_sign=False,
+                    )),
+                    ("clf", SGDClassifier(loss="log_loss", alpha=1e-5)),
+                ]
+            )
+            print("[INFO] Starting a new streaming model ...")
+        else:
+            print(f"[INFO] Updating streaming model from {self.model_path} ...")
+
+        vectorizer, clf = pipeline.named_steps["hash"], pipeline.named_steps["clf"]
+        rows = leak_io.iter_entries(filepath)
+        trained = 0
+        print(f"[INFO] Training on {filepath} in chunks of {chunk_size} ...")
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            labels: List[int] = []
+            texts: List[str] = []
+            for row in chunk:
+                if label_field not in row:
+                    raise ValueError(f"Missing label field '{label_field}' in row: {row}")
+                labels.append(int(row[label_field]))
+                texts.append(self._entry_to_text(row, label_field=label_field))
+            clf.partial_fit(vectorizer.transform(texts), labels, classes=[0, 1])
+            trained += len(chunk)
+        if not trained:
+            raise ValueError(f"No training rows in {filepath}")
+        print(f"[INFO] Training completed on {trained} rows.")
+
+        self.model = pipeline
+        joblib.dump(self.model, self.model_path)
+        self.model_version = self._file_digest(self.model_path)
         print(f"[INFO] Model saved to {self.model_path}")
+        return trained
+
+    @staticmethod
+    def _is_streaming_model(model: Any) -> bool:
+        return hasattr(model, "named_steps") and "hash" in model.named_steps
 
     # ------------------- INFERENCE -------------------
 
+    def _build_result(self, entry: Dict[str, Any], proba: float, timestamp: str) -> Dict[str, Any]:
+        proba = float(proba)
+        return {
+            "entry": entry,
+            "leak_probability": proba,
+            "prediction": PREDICTIONS[proba >= LEAK_THRESHOLD],
+            "risk_level": risk_level(proba),
+            "timestamp": timestamp,
+        }
+
     def scan_entry(self, entry: Dict[str, Any]) -> Dict[str, Any]:
         if self.model is None:
             raise ValueError("No trained model loaded. Train or load a model first.")
 
-        text = self._entry_to_text(entry, label_field="label")
-        proba = self.model.predict_proba([text])[0][1]
-        prediction = "leak" if proba >= 0.5 else "safe"
+        proba = self._score_entries([entry])[0]
+        return self._build_result(entry, proba, datetime.now().isoformat())
 
-        if proba < 0.3:
-            risk_level = "low"
-        elif proba < 0.7:
-            risk_level = "moderate"
+    def _predict_proba(self, texts: List[str]) -> List[float]:
+        """Model probabilities, timing vectorisation and classification apart."""
+        model = self.model
+        if isinstance(model, CompiledLeakModel):
+            vectorize, classify = model.transform, model.predict_proba_transformed
+        elif hasattr(model, "steps"):
+            vectorize, classify = model[:-1].transform, model[-1].predict_proba
         else:
-            risk_level = "high"
+            vectorize, classify = (lambda x: x), model.predict_proba
 
-        return {
-            "entry": entry,
-            "leak_probability": float(proba),
-            "prediction": prediction,
-            "risk_level": risk_level,
-            "timestamp": datetime.now().isoformat(),
-        }
+        with STAGE_SECONDS.labels("vectorize").time():
+            vectors = vectorize(texts)
+        with STAGE_SECONDS.labels("predict").time():
+            return classify(vectors)[:, 1].tolist()
+
+    def _predict(self, texts: List[str]) -> List[float]:
+        """
+        Leak probabilities for texts, served from the cache where possible.
+
+        Each distinct uncached text is scored once, in a single
+        predict_proba call for the whole list.
+        """
+        if self.cache is None or self.model_version is None:
+            return self._predict_proba(texts)
+
+        keys, known, missing = self._cache_lookup(texts)
+        if missing:
+            self._cache_fill(known, missing, self._predict_proba([texts[i] for i in missing.values()]))
+        return [known[k] for k in keys]
+
+    def _cache_lookup(self, texts: List[str]) -> Tuple[List[Any], Dict[Any, float], Dict[Any, int]]:
+        """
+        (keys, known, missing) for texts: each text's cache key, the cached
+        probabilities by key, and the first position of each key still to
+        score. Without a cache, each position is its own key.
+        """
+        if self.cache is None or self.model_version is None:
+            keys = list(range(len(texts)))
+            return keys, {}, dict(zip(keys, keys))
+
+        keys = [text_hash(t, self.model_version) for t in texts]
+        known = self.cache.get_many(keys)
+        missing: Dict[Any, int] = {}
+        for i, key in enumerate(keys):
+            if key not in known and key not in missing:
+                missing[key] = i
+        return keys, known, missing
+
+    def _cache_fill(self, known: Dict[Any, float], missing: Dict[Any, int], probas: List[float]) -> None:
+        """Add the probabilities scored for missing to known, and to the cache."""
+        cached = self.cache is not None and self.model_version is not None
+        for key, proba in zip(missing, probas):
+            if cached:
+                self.cache.put(key, proba)
+            known[key] = proba
+
+    def scan_batch(self, entries: Iterable[Dict[str, Any]]) -> ScanResults:
+        """
+        Score a batch of entries with a single predict_proba call.
+
+        Produces the same results as calling scan_entry() on each entry,
+        but runs the TF-IDF transform and the classifier once for the whole
+        batch instead of once per row, and only on texts not already cached.
+        """
+        if self.model is None:
+            raise ValueError("No trained model loaded. Train or load a model first.")
 
-    def scan_all(self) -> List[Dict[str, Any]]:
+        results = ScanResults()
+        self._scan_into(results, list(entries))
+        return results
+
+    def _scan_into(self, results: ScanResults, entries: List[Dict[str, Any]]) -> None:
+        if entries:
+            results.append_batch(entries, self._score_entries(entries), datetime.now().isoformat())
+
+    def _score_entries(self, entries: List[Dict[str, Any]]) -> List[float]:
+        """Leak probabilities, from the cascade's rule stage where it resolves them."""
+        if self.cascade is None:
+            return self._model_probas(entries)
+        return self.cascade.score(entries, self._model_probas)
+
+    def _model_probas(self, entries: List[Dict[str, Any]]) -> List[float]:
+        with STAGE_SECONDS.labels("text").time():
+            texts = [self._entry_to_text(e, label_field="label") for e in entries]
+        probas = self._predict(texts)
+        ENTRIES_SCANNED.labels("ml").inc(len(entries))
+        return probas
+
+    def scan_all(self, batch_size: Optional[int] = None, workers: int = 1) -> ScanResults:
+        """
+        Score every loaded entry, batch_size rows per predict_proba call.
+
+        With workers > 1 the batches are scored on a process pool. The model
+        is handed to each worker once at startup (inherited for free under
+        fork), tasks carry only the distinct texts the score cache does not
+        hold and return only probabilities, and results keep input order.
+        Inputs below PARALLEL_THRESHOLD stay serial. With a cascade, its rule
+        stage runs here and only the entries it leaves open are scored.
+
+        Results are collected in a columnar ScanResults (see leak_results).
+        """
         if not self.leaks:
             raise ValueError("No data loaded. Please load data first.")
         if self.model is None:
             raise ValueError("No trained model loaded. Train or load a model first.")
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1, got {workers}")
+        size = self.batch_size if batch_size is None else batch_size
+        if size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {size}")
+
+        chunks = [self.leaks[start:start + size] for start in range(0, len(self.leaks), size)]
+        results = ScanResults()
+
+        if workers == 1 or len(self.leaks) < PARALLEL_THRESHOLD:
+            for chunk in chunks:
+                self._scan_into(results, chunk)
+        else:
+            if self.cascade is None:
+                staged = [(None, chunk) for chunk in chunks]
+            else:
+                staged = []
+                for chunk in chunks:
+                    probas, ambiguous = self.cascade.split(chunk)
+                    staged.append((probas, [chunk[i] for i in ambiguous]))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(self.model,)) as pool:
+                lookups = []
+                for _, todo in staged:
+                    texts = [self._entry_to_text(e, label_field="label") for e in todo]
+                    keys, known, missing = self._cache_lookup(texts)
+                    future = pool.submit(_predict_texts, [texts[i] for i in missing.values()])
+                    lookups.append((keys, known, missing, future))
+                for chunk, (probas, todo), (keys, known, missing, future) in zip(chunks, staged, lookups):
+                    self._cache_fill(known, missing, future.result())
+                    predicted = [known[k] for k in keys]
+                    if probas is not None:
+                        probas[np.isnan(probas)] = predicted
+                        predicted = probas
+                    results.append_batch(chunk, predicted, datetime.now().isoformat())
+                    ENTRIES_SCANNED.labels("ml").inc(len(todo))
 
-        self.scan_results = [self.scan_entry(e) for e in self.leaks]
+        self.scan_results = results
         return self.scan_results
 
+    def scan_stream(self, entries: Iterable[Dict[str, Any]],
+                    batch_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily score entries from any iterable, e.g. iter_json().
+
+        Entries are pulled batch_size at a time and scored with scan_batch();
+        nothing is kept in self.leaks or self.scan_results, so memory is
+        bounded by one batch regardless of the input size.
+        """
+        if self.model is None:
+            raise ValueError("No trained model loaded. Train or load a model first.")
+
+        size = self.batch_size if batch_size is None else batch_size
+        if size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {size}")
+
+        it = iter(entries)
+        while True:
+            batch = list(islice(it, size))
+            if not batch:
+                return
+            yield from self.scan_batch(batch)
+
     # ------------------- SUMMARY -------------------
 
     def generate_summary(self) -> Dict[str, Any]:
@@ -125,14 +452,9 @@ class LeakDetectorML:
             raise ValueError("No scan results available. Please run scan_all() first.")
 
         total = len(self.scan_results)
-        dist = {"low": 0, "moderate": 0, "high": 0}
-        total_proba = 0.0
-
-        for r in self.scan_results:
-            dist[r["risk_level"]] += 1
-            total_proba += r["leak_probability"]
-
-        avg = total_proba / total if total > 0 else 0.0
+        counts = np.bincount(self.scan_results.column("risk_level"), minlength=len(RISK_LEVELS))
+        dist = dict(zip(RISK_LEVELS, counts.tolist()))
+        avg = float(self.scan_results.column("leak_probability").mean())
 
         return {
             "total_entries": total,
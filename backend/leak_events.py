@@ -0,0 +1,95 @@
+"""
+Server-sent events fan-out for newly scored leaks.
+
+Every event is encoded once when it is published and kept in a bounded
+ring buffer shared by all subscribers, so one scoring event costs the same
+whether one or a thousand dashboards are connected, and a slow or
+disconnected client can never make the server buffer more than the ring.
+"""
+
+import json
+import threading
+from collections import deque
+from itertools import islice
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+# Events kept for replay (Last-Event-ID) and for clients that fall behind.
+DEFAULT_BACKLOG = 1000
+
+# Seconds between keep-alive comments on an idle stream.
+HEARTBEAT_INTERVAL = 15.0
+
+
+def encode_event(event_id: Optional[int], data: Any, event: str = "leak") -> bytes:
+    payload = json.dumps(data, separators=(",", ":"))
+    id_line = "" if event_id is None else f"id: {event_id}\n"
+    return f"{id_line}event: {event}\ndata: {payload}\n\n".encode()
+
+
+class EventBroadcaster:
+    """
+    Ring buffer of pre-encoded SSE events with blocking subscribers.
+
+    Event ids are the store row positions of the leaks they carry, so
+    they increase monotonically and survive reconnects.
+    """
+
+    def __init__(self, backlog: int = DEFAULT_BACKLOG, last_id: int = -1):
+        """
+        Args:
+            backlog: Number of most recent events kept for replay
+            last_id: Id of the last item that already exists (and will not
+                be published), so new events continue from last_id + 1
+        """
+        self._events: Deque[Tuple[int, bytes]] = deque(maxlen=backlog)
+        self._cond = threading.Condition()
+        self.last_id = last_id
+
+    def publish(self, first_id: int, rows: List[Dict[str, Any]]) -> None:
+        """Encode rows (ids first_id, first_id + 1, ...) and wake subscribers."""
+        encoded = [(i, encode_event(i, row)) for i, row in enumerate(rows, first_id)]
+        if not encoded:
+            return
+        with self._cond:
+            self._events.extend(encoded)
+            self.last_id = encoded[-1][0]
+            self._cond.notify_all()
+
+    def _events_after(self, last_id: int) -> Tuple[List[bytes], int]:
+        """Return (events with id > last_id, number of them no longer buffered)."""
+        if not self._events or self._events[-1][0] <= last_id:
+            return [], 0
+        oldest = self._events[0][0]
+        dropped = max(0, oldest - last_id - 1)
+        skip = max(0, last_id + 1 - oldest)
+        return [body for _, body in islice(self._events, skip, None)], dropped
+
+    def stream(self, last_id: Optional[int] = None,
+               heartbeat: float = HEARTBEAT_INTERVAL) -> Iterator[bytes]:
+        """
+        Yield SSE frames for events after last_id, blocking for new ones.
+
+        A new client (last_id None) only receives events published after it
+        connects. A client resuming from an id that has already left the
+        ring gets an "overflow" event with the number of missed leaks and
+        should refetch /api/leaks.
+        """
+        with self._cond:
+            cursor = self.last_id if last_id is None else last_id
+
+        yield b"retry: 3000\n\n"
+        while True:
+            with self._cond:
+                events, dropped = self._events_after(cursor)
+                if not events:
+                    self._cond.wait(heartbeat)
+                    events, dropped = self._events_after(cursor)
+                if events:
+                    cursor = self.last_id
+
+            if dropped:
+                yield encode_event(None, {"missed": dropped}, event="overflow")
+            if events:
+                yield b"".join(events)
+            else:
+                yield b": keep-alive\n\n"
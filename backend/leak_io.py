@@ -0,0 +1,322 @@
+"""
+Streaming readers and writers for leak datasets.
+
+Every reader is a generator that yields one entry dict at a time, and
+every writer turns an iterable of rows into a stream of encoded chunks,
+so a dump of any size can be scanned or exported with memory bounded by
+one chunk rather than by the file.
+"""
+
+import csv
+import io
+import json
+import os
+import re
+import zlib
+from contextlib import nullcontext
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+
+# Characters read from disk per refill when streaming a JSON array.
+JSON_CHUNK_SIZE = 1 << 16
+
+# Rows encoded per chunk by the streaming writers.
+EXPORT_CHUNK_ROWS = 1000
+
+EXPORT_FORMATS = ("csv", "ndjson", "json")
+
+# File extensions iter_entries() reads.
+ENTRY_EXTENSIONS = (".csv", ".json", ".ndjson", ".jsonl")
+
+_WHITESPACE = " \t\n\r"
+# What may follow an array item.
+_ITEM_END = _WHITESPACE + ",]"
+_DELIMITER = re.compile(r"[ \t\n\r,\]]")
+
+
+def iter_csv(filepath: str, file: Optional[TextIO] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield rows of a CSV file as dictionaries.
+
+    Args:
+        filepath: Path to the CSV file
+        file: The file, already open (see iter_entries())
+    """
+    with _open(filepath, file, newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def iter_ndjson(filepath: str, file: Optional[TextIO] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield entries of a newline-delimited JSON file (one object per line).
+
+    Args:
+        filepath: Path to the NDJSON file; blank lines are skipped
+        file: The file, already open (see iter_entries())
+    """
+    with _open(filepath, file) as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {line_no} of {filepath}: {e}") from e
+
+
+def iter_json(filepath: str, chunk_size: int = JSON_CHUNK_SIZE,
+              file: Optional[TextIO] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the items of a top-level JSON array without loading the whole file.
+
+    A file holding a single JSON object yields that object, matching
+    load_json().
+
+    Args:
+        filepath: Path to the JSON file
+        chunk_size: Characters to read per refill
+        file: The file, already open (see iter_entries())
+    """
+    decoder = json.JSONDecoder()
+
+    with _open(filepath, file) as f:
+        buf = f.read(chunk_size)
+        eof = not buf
+        pos = _skip_whitespace(buf, 0)
+        while pos == len(buf) and not eof:
+            buf = f.read(chunk_size)
+            eof = not buf
+            pos = _skip_whitespace(buf, 0)
+
+        if eof and pos == len(buf) or buf[pos] != "[":
+            # Not an array; an empty file fails here as in load_json().
+            yield decoder.decode(buf[pos:] + f.read())
+            return
+        pos += 1
+        expect_item = True
+        after_comma = False
+
+        while True:
+            pos = _skip_whitespace(buf, pos)
+            if pos >= len(buf):
+                if eof:
+                    raise ValueError(f"Unterminated JSON array in {filepath}")
+                # Drop consumed input before refilling; grow reads so one
+                # huge item is not re-parsed once per chunk.
+                buf = buf[pos:]
+                pos = 0
+                chunk = f.read(max(chunk_size, len(buf)))
+                eof = not chunk
+                buf += chunk
+                continue
+
+            char = buf[pos]
+            if char == "]" and not after_comma:
+                return
+            if expect_item == (char in ",]"):
+                raise ValueError(f"Malformed JSON array at offset {pos} in {filepath}")
+            if char == ",":
+                pos += 1
+                expect_item = after_comma = True
+                continue
+
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                end = None
+            # An item not followed by a delimiter within the buffer may be
+            # truncated (a number cut after "." or "e" parses as a shorter
+            # one), so only trust it once more input is read.
+            truncated = end is None or (
+                not eof
+                and (end == len(buf) or buf[end] not in _ITEM_END)
+                and _DELIMITER.search(buf, end) is None
+            )
+            if truncated:
+                if eof:
+                    raise ValueError(f"Invalid JSON item at offset {pos} in {filepath}")
+                chunk = f.read(max(chunk_size, len(buf)))
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+
+            yield item
+            pos = end
+            expect_item = after_comma = False
+
+
+def iter_entries(filepath: str, file: Optional[TextIO] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield entries from a CSV, JSON or NDJSON file, chosen by extension.
+
+    Args:
+        filepath: Path ending in .csv, .json, .ndjson or .jsonl
+        file: filepath already opened as text with newline="", e.g. to
+            follow the read position (file.buffer.tell()); the caller
+            closes it
+    """
+    ext = os.path.splitext(filepath)[1].lower()
+    if ext == ".csv":
+        return iter_csv(filepath, file)
+    if ext == ".json":
+        return iter_json(filepath, file=file)
+    if ext in (".ndjson", ".jsonl"):
+        return iter_ndjson(filepath, file)
+    raise ValueError(f"Unsupported file type: {filepath}. Use .csv, .json, .ndjson or .jsonl.")
+
+
+# ------------------- WRITERS -------------------
+
+def iter_csv_chunks(rows: Iterable[Dict[str, Any]], fieldnames: Optional[List[str]] = None,
+                    chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[str]:
+    """
+    Encode rows as CSV, chunk_rows rows per yielded string.
+
+    The header is yielded on its own first so a consumer (e.g. an HTTP
+    response) can start sending immediately. List values are joined with
+    ", "; keys missing from fieldnames are ignored.
+
+    Args:
+        rows: Iterable of row dictionaries
+        fieldnames: Column order; defaults to the keys of the first row
+        chunk_rows: Rows per chunk
+    """
+    rows = iter(rows)
+    if fieldnames is None:
+        first = next(rows, None)
+        if first is None:
+            return
+        fieldnames = list(first)
+        rows = chain([first], rows)
+
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=fieldnames, extrasaction="ignore", restval="")
+    writer.writeheader()
+    yield _drain(buf)
+
+    for count, row in enumerate(rows, 1):
+        writer.writerow({k: _csv_value(v) for k, v in row.items()})
+        if count % chunk_rows == 0:
+            yield _drain(buf)
+
+    tail = _drain(buf)
+    if tail:
+        yield tail
+
+
+def iter_ndjson_chunks(rows: Iterable[Dict[str, Any]],
+                       chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[str]:
+    """
+    Encode rows as newline-delimited JSON, chunk_rows rows per yielded string.
+
+    Args:
+        rows: Iterable of JSON-serialisable row dictionaries
+        chunk_rows: Rows per chunk
+    """
+    lines: List[str] = []
+    for row in rows:
+        lines.append(json.dumps(row))
+        if len(lines) == chunk_rows:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def iter_json_chunks(rows: Iterable[Dict[str, Any]],
+                     chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[str]:
+    """
+    Encode rows as a JSON array (one item per line), chunk by chunk.
+
+    Args:
+        rows: Iterable of JSON-serialisable row dictionaries
+        chunk_rows: Rows per chunk
+    """
+    yield "["
+    sep = "\n"
+    for chunk in iter_ndjson_chunks(rows, chunk_rows):
+        yield sep + chunk[:-1].replace("\n", ",\n")
+        sep = ",\n"
+    yield "\n]\n"
+
+
+def iter_export_chunks(rows: Iterable[Dict[str, Any]], format: str = "csv",
+                       fieldnames: Optional[List[str]] = None,
+                       chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[str]:
+    """
+    Encode rows in one of EXPORT_FORMATS.
+
+    Args:
+        rows: Iterable of row dictionaries
+        format: 'csv', 'ndjson' or 'json'
+        fieldnames: CSV column order (ignored for JSON formats)
+        chunk_rows: Rows per chunk
+    """
+    if format == "csv":
+        return iter_csv_chunks(rows, fieldnames, chunk_rows)
+    if format == "ndjson":
+        return iter_ndjson_chunks(rows, chunk_rows)
+    if format == "json":
+        return iter_json_chunks(rows, chunk_rows)
+    raise ValueError(f"Unsupported format: {format}. Use 'csv', 'ndjson' or 'json'.")
+
+
+def gzip_chunks(chunks: Iterable[str], level: int = 6) -> Iterator[bytes]:
+    """
+    Gzip a stream of text chunks, yielding compressed bytes per chunk.
+
+    Each chunk is sync-flushed so output keeps pace with input (the first
+    bytes go out with the first chunk) at a small cost in ratio.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 -> gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8")) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def write_chunks(filepath: str, chunks: Iterable[str], compress: bool = False) -> None:
+    """
+    Write a stream of text chunks to disk, optionally gzip-compressed.
+
+    Args:
+        filepath: Destination path
+        chunks: Encoded text chunks, e.g. from iter_export_chunks()
+        compress: Gzip the output
+    """
+    if compress:
+        with open(filepath, "wb") as f:
+            for data in gzip_chunks(chunks):
+                f.write(data)
+    else:
+        with open(filepath, "w", encoding="utf-8", newline="") as f:
+            for chunk in chunks:
+                f.write(chunk)
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return ", ".join(map(str, value))
+    return value
+
+
+def _drain(buf: io.StringIO) -> str:
+    text = buf.getvalue()
+    buf.seek(0)
+    buf.truncate()
+    return text
+
+
+def _open(filepath: str, file: Optional[TextIO], newline: Optional[str] = None):
+    """file if one was passed, else filepath opened for reading."""
+    if file is not None:
+        return nullcontext(file)
+    return open(filepath, "r", encoding="utf-8", newline=newline)
+
+
+def _skip_whitespace(buf: str, pos: int) -> int:
+    while pos < len(buf) and buf[pos] in _WHITESPACE:
+        pos += 1
+    return pos
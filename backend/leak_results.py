@@ -0,0 +1,461 @@
+"""
+Columnar container for ML scan results.
+
+A scan result used to be a dict per entry (entry dict, probability, two
+repeated label strings and a timestamp string), copied again into a
+dashboard row dict per entry. ScanResults keeps the same information as
+NumPy columns instead:
+
+- leak_probability (float64), risk_score / risk_level / prediction (int8)
+- source, severity and leaked_date as codes into tables of distinct
+  values, so each distinct string is held once
+- leaked_day (int32): leaked_date as days since 1970-01-01, parsed once
+  per distinct value (NO_DATE when missing, not an ISO date, or outside
+  LEAKED_DAYS)
+- id, description and content as object columns
+- one timestamp per scored batch, and one key tuple per distinct entry
+  layout, so entries can be rebuilt exactly (keys outside the known
+  fields are kept in a sparse side table)
+
+Result dicts and dashboard rows are materialised on demand, and
+to_dataframe() wraps the columns without copying them.
+"""
+
+import re
+import sys
+from bisect import bisect_right
+from datetime import date, datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+RISK_LEVELS = ("low", "moderate", "high")
+# Probabilities at which the risk level steps up to moderate / high.
+RISK_THRESHOLDS = (0.3, 0.7)
+
+PREDICTIONS = ("safe", "leak")
+LEAK_THRESHOLD = 0.5
+
+# Entry fields stored as columns, with the value a dashboard row shows when
+# the entry lacks the key.
+ENTRY_DEFAULTS: Dict[str, Any] = {
+    "id": None,
+    "source": "unknown",
+    "description": "",
+    "content": "",
+    "leaked_date": None,
+    "severity": "unknown",
+}
+
+# Entry fields stored as codes into a table of distinct values.
+CATEGORICAL_FIELDS = ("source", "severity", "leaked_date")
+OBJECT_FIELDS = ("id", "description", "content")
+
+# leaked_day of rows whose leaked_date is missing or not a date.
+NO_DATE = np.iinfo(np.int32).min
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# YYYY-M-D prefix of a date string fromisoformat() rejects.
+_LOOSE_DATE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})(?!\d)")
+
+# Plausible leaked_date day numbers; a date outside them (year 1 or 9999,
+# say) is a placeholder or a typo, and is not put on the timeline.
+LEAKED_DAYS = range(date(1900, 1, 1).toordinal() - _EPOCH_ORDINAL,
+                    date(2200, 1, 1).toordinal() - _EPOCH_ORDINAL)
+
+# Result dicts converted per call when extending from an iterable.
+EXTEND_CHUNK_SIZE = 10_000
+
+
+def risk_level(proba: float) -> str:
+    return RISK_LEVELS[bisect_right(RISK_THRESHOLDS, proba)]
+
+
+def day_number(value: Any) -> int:
+    """
+    Days since 1970-01-01 of an ISO date or datetime (string or object);
+    NO_DATE for anything else. Strings may leave month and day unpadded
+    ("2024-1-5") and may carry any time suffix.
+    """
+    if isinstance(value, str):
+        text = value.strip()
+        try:
+            value = datetime.fromisoformat(text)
+        except ValueError:
+            match = _LOOSE_DATE.match(text)
+            if match is None:
+                return NO_DATE
+            try:
+                value = date(*map(int, match.groups()))
+            except ValueError:
+                return NO_DATE
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.toordinal() - _EPOCH_ORDINAL
+    return NO_DATE
+
+
+def leaked_day(value: Any) -> int:
+    """day_number() of a leaked_date, NO_DATE if outside LEAKED_DAYS."""
+    day = day_number(value)
+    return day if day in LEAKED_DAYS else NO_DATE
+
+
+def day_date(day: int) -> date:
+    """Inverse of day_number()."""
+    return date.fromordinal(day + _EPOCH_ORDINAL)
+
+
+def _codes_dtype(n_values: int) -> np.dtype:
+    # Same widths pandas picks for Categorical codes, so to_dataframe()
+    # can hand the code arrays over without converting them.
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_values < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+class Interner:
+    """Distinct values in first-seen order; None is code -1."""
+
+    __slots__ = ("values", "_codes")
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self._codes: Dict[Any, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def code(self, value: Any) -> int:
+        if value is None:
+            return -1
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def truncate(self, n_values: int) -> None:
+        """Forget the values from code n_values on."""
+        for value in self.values[n_values:]:
+            del self._codes[value]
+        del self.values[n_values:]
+
+    def remap(self, other: "Interner") -> np.ndarray:
+        """Array translating other's codes to codes of self (index -1 maps to -1)."""
+        return np.array([self.code(v) for v in other.values] + [-1], dtype=np.int64)
+
+
+class ScanResults:
+    """
+    Append-only, column-oriented sequence of ML scan results.
+
+    Indexing and iteration yield the same result dicts LeakDetectorML used
+    to return. Not thread-safe; LeakStore serialises access.
+    """
+
+    def __init__(self):
+        self._size = 0
+        self._capacity = 0
+        self._data: Dict[str, np.ndarray] = {
+            "leak_probability": np.empty(0, dtype=np.float64),
+            "risk_score": np.empty(0, dtype=np.int8),
+            "risk_level": np.empty(0, dtype=np.int8),
+            "prediction": np.empty(0, dtype=np.int8),
+            "timestamp": np.empty(0, dtype=np.int32),
+            "layout": np.empty(0, dtype=np.int32),
+            "leaked_day": np.empty(0, dtype=np.int32),
+        }
+        for field in CATEGORICAL_FIELDS:
+            self._data[field] = np.empty(0, dtype=_codes_dtype(0))
+        for field in OBJECT_FIELDS:
+            self._data[field] = np.empty(0, dtype=object)
+
+        self._values: Dict[str, Interner] = {field: Interner() for field in CATEGORICAL_FIELDS}
+        # leaked_day() of each distinct leaked_date, by code.
+        self._days: List[int] = []
+        self._timestamps = Interner()
+        # Key tuple per distinct entry layout, plus the keys outside
+        # ENTRY_DEFAULTS for each layout.
+        self._layouts = Interner()
+        self._layout_extras: List[Tuple[str, ...]] = []
+        self._extras: Dict[int, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, pos: int) -> Dict[str, Any]:
+        if pos < 0:
+            pos += self._size
+        if not 0 <= pos < self._size:
+            raise IndexError("scan result index out of range")
+        return self.results_at([pos])[0]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        size = self._size
+        for start in range(0, size, EXTEND_CHUNK_SIZE):
+            yield from self.results_at(range(start, min(start + EXTEND_CHUNK_SIZE, size)))
+
+    # ------------------- APPENDING -------------------
+
+    def append_batch(self, entries: Sequence[Dict[str, Any]], probabilities: Iterable[float],
+                     timestamp: str) -> None:
+        """Append entries scored together at timestamp."""
+        code = self._timestamps.code(timestamp)
+        self._append(entries, probabilities, np.full(len(entries), code, dtype=np.int32))
+
+    def append_rows(self, entries: Sequence[Dict[str, Any]], probabilities: Iterable[float],
+                    timestamps: Iterable[str]) -> None:
+        """Append entries with one scan timestamp each."""
+        codes = np.array([self._timestamps.code(t) for t in timestamps], dtype=np.int32)
+        self._append(entries, probabilities, codes)
+
+    def extend(self, results: Union["ScanResults", Iterable[Dict[str, Any]]]) -> None:
+        """Append another ScanResults, or result dicts as built by LeakDetectorML."""
+        if isinstance(results, ScanResults):
+            self._extend_columns(results)
+            return
+
+        it = iter(results)
+        while True:
+            chunk = list(islice(it, EXTEND_CHUNK_SIZE))
+            if not chunk:
+                return
+            self.append_rows(
+                [r["entry"] for r in chunk],
+                [r["leak_probability"] for r in chunk],
+                [r["timestamp"] for r in chunk],
+            )
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._size + extra
+        if needed <= self._capacity:
+            return
+        capacity = max(needed, 2 * self._capacity, 1024)
+        for name, array in self._data.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            self._data[name] = grown
+        self._capacity = capacity
+
+    def _store(self, name: str, values: Any) -> None:
+        self._data[name][self._size:self._size + len(values)] = values
+
+    def _fit_codes(self) -> None:
+        for field in CATEGORICAL_FIELDS:
+            dtype = _codes_dtype(len(self._values[field]))
+            if self._data[field].dtype != dtype:
+                self._data[field] = self._data[field].astype(dtype)
+
+    def _leaked_days(self, codes: np.ndarray) -> np.ndarray:
+        """leaked_day for leaked_date codes, parsing values not seen before."""
+        dates = self._values["leaked_date"].values
+        self._days.extend(leaked_day(v) for v in dates[len(self._days):])
+        return np.array(self._days + [NO_DATE], dtype=np.int32)[codes]
+
+    def _append(self, entries: Sequence[Dict[str, Any]], probabilities: Iterable[float],
+                timestamps: np.ndarray) -> None:
+        n = len(entries)
+        if not n:
+            return
+        probas = np.asarray(probabilities, dtype=np.float64)
+
+        layouts = []
+        for i, entry in enumerate(entries):
+            layout = self._layouts.code(tuple(entry))
+            if layout == len(self._layout_extras):
+                self._layout_extras.append(tuple(k for k in entry if k not in ENTRY_DEFAULTS))
+            layouts.append(layout)
+            extra_keys = self._layout_extras[layout]
+            if extra_keys:
+                self._extras[self._size + i] = {k: entry[k] for k in extra_keys}
+
+        # fromiter keeps list / dict values as single objects.
+        objects = {
+            field: np.fromiter((e.get(field, ENTRY_DEFAULTS[field]) for e in entries), dtype=object, count=n)
+            for field in OBJECT_FIELDS
+        }
+        codes = {
+            field: np.fromiter(
+                (self._values[field].code(e.get(field, ENTRY_DEFAULTS[field])) for e in entries),
+                dtype=np.int64, count=n,
+            )
+            for field in CATEGORICAL_FIELDS
+        }
+
+        self._reserve(n)
+        self._fit_codes()
+        self._store("leak_probability", probas)
+        self._store("risk_score", np.rint(probas * 100))
+        self._store("risk_level", np.searchsorted(RISK_THRESHOLDS, probas, side="right"))
+        self._store("prediction", probas >= LEAK_THRESHOLD)
+        self._store("timestamp", timestamps)
+        self._store("layout", layouts)
+        self._store("leaked_day", self._leaked_days(codes["leaked_date"]))
+        for field in CATEGORICAL_FIELDS:
+            self._store(field, codes[field])
+        for field in OBJECT_FIELDS:
+            self._store(field, objects[field])
+        self._size += n
+
+    def _extend_columns(self, other: "ScanResults") -> None:
+        n = len(other)
+        if not n:
+            return
+        first = self._size
+        remapped = {
+            field: self._values[field].remap(other._values[field])[other.column(field)]
+            for field in CATEGORICAL_FIELDS
+        }
+        timestamps = self._timestamps.remap(other._timestamps)[other.column("timestamp")]
+        layout_map = self._layouts.remap(other._layouts)
+        while len(self._layout_extras) < len(self._layouts):
+            keys = self._layouts.values[len(self._layout_extras)]
+            self._layout_extras.append(tuple(k for k in keys if k not in ENTRY_DEFAULTS))
+
+        self._reserve(n)
+        self._fit_codes()
+        for name in ("leak_probability", "risk_score", "risk_level", "prediction", *OBJECT_FIELDS):
+            self._store(name, other.column(name))
+        self._store("leaked_day", self._leaked_days(remapped["leaked_date"]))
+        for field in CATEGORICAL_FIELDS:
+            self._store(field, remapped[field])
+        self._store("timestamp", timestamps)
+        self._store("layout", layout_map[other.column("layout")])
+        for pos, extra in other._extras.items():
+            self._extras[first + pos] = extra
+        self._size += n
+
+    def mark(self) -> Tuple[int, ...]:
+        """The current size and interned value counts, to rollback() to."""
+        return (self._size, len(self._timestamps), len(self._layouts),
+                *(len(self._values[field]) for field in CATEGORICAL_FIELDS))
+
+    def rollback(self, mark: Tuple[int, ...]) -> None:
+        """Drop the rows and interned values appended since mark()."""
+        size, n_timestamps, n_layouts, *n_values = mark
+        self._size = size
+        for pos in [pos for pos in self._extras if pos >= size]:
+            del self._extras[pos]
+        self._timestamps.truncate(n_timestamps)
+        self._layouts.truncate(n_layouts)
+        del self._layout_extras[n_layouts:]
+        for field, n in zip(CATEGORICAL_FIELDS, n_values):
+            self._values[field].truncate(n)
+        del self._days[len(self._values["leaked_date"]):]
+
+    # ------------------- READING -------------------
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only view of a column (codes for categorical fields)."""
+        view = self._data[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def categories(self, field: str) -> List[Any]:
+        """Distinct values of a coded column, indexed by code."""
+        if field == "risk_level":
+            return list(RISK_LEVELS)
+        if field == "prediction":
+            return list(PREDICTIONS)
+        return self._values[field].values
+
+    def _decode(self, field: str, idx: np.ndarray) -> List[Any]:
+        lookup = self.categories(field) + [None]
+        return [lookup[c] for c in self._data[field][idx].tolist()]
+
+    def _fields_at(self, idx: np.ndarray) -> Dict[str, List[Any]]:
+        fields = {field: self._data[field][idx].tolist() for field in OBJECT_FIELDS}
+        for field in CATEGORICAL_FIELDS:
+            fields[field] = self._decode(field, idx)
+        return fields
+
+    @staticmethod
+    def _index(positions: Iterable[int]) -> np.ndarray:
+        if isinstance(positions, range):
+            return np.arange(positions.start, positions.stop, positions.step, dtype=np.int64)
+        return np.fromiter(positions, dtype=np.int64)
+
+    def rows_at(self, positions: Iterable[int]) -> List[Dict[str, Any]]:
+        """
+        Dashboard rows for positions.
+
+        leak_probability (0–1) becomes risk_score (0–100), and the
+        prediction ('leak'/'safe') is put in patterns, which the old
+        rule-based engine filled with detected pattern names.
+        """
+        idx = self._index(positions)
+        f = self._fields_at(idx)
+        scores = self._data["risk_score"][idx].tolist()
+        levels = [RISK_LEVELS[c] for c in self._data["risk_level"][idx].tolist()]
+        predictions = [PREDICTIONS[c] for c in self._data["prediction"][idx].tolist()]
+        return [
+            {
+                "id": f["id"][i],
+                "source": f["source"][i],
+                "description": f["description"][i],
+                "content": f["content"][i],
+                "leaked_date": f["leaked_date"][i],
+                "severity": f["severity"][i],
+                "risk_score": scores[i],
+                "risk_level": levels[i],
+                "patterns": [predictions[i]],
+            }
+            for i in range(len(idx))
+        ]
+
+    def results_at(self, positions: Iterable[int]) -> List[Dict[str, Any]]:
+        """Result dicts (same shape as LeakDetectorML.scan_entry()) for positions."""
+        idx = self._index(positions)
+        f = self._fields_at(idx)
+        probas = self._data["leak_probability"][idx].tolist()
+        levels = self._data["risk_level"][idx].tolist()
+        predictions = self._data["prediction"][idx].tolist()
+        timestamps = [self._timestamps.values[c] for c in self._data["timestamp"][idx].tolist()]
+        layouts = self._data["layout"][idx].tolist()
+
+        results = []
+        for i, pos in enumerate(idx.tolist()):
+            extra = self._extras.get(pos, {})
+            entry = {
+                key: f[key][i] if key in ENTRY_DEFAULTS else extra[key]
+                for key in self._layouts.values[layouts[i]]
+            }
+            results.append({
+                "entry": entry,
+                "leak_probability": probas[i],
+                "prediction": PREDICTIONS[predictions[i]],
+                "risk_level": RISK_LEVELS[levels[i]],
+                "timestamp": timestamps[i],
+            })
+        return results
+
+    def nbytes(self) -> int:
+        """Approximate memory held: column buffers plus the object columns' values."""
+        total = sum(array.nbytes for array in self._data.values())
+        for field in OBJECT_FIELDS:
+            total += sum(map(sys.getsizeof, self._data[field][:self._size].tolist()))
+        return total
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        DataFrame over the columns, sharing their memory.
+
+        source, severity, leaked_date, risk_level and prediction are
+        Categoricals (leaked_date categories are in first-seen order).
+        """
+        data: Dict[str, Any] = {}
+        for name in ("id", "source", "description", "content", "leaked_date", "severity",
+                     "risk_score", "risk_level", "prediction", "leak_probability"):
+            column = self.column(name)
+            if name in OBJECT_FIELDS:
+                data[name] = pd.Series(column, dtype=object, copy=False)
+            elif name in CATEGORICAL_FIELDS or name in ("risk_level", "prediction"):
+                categories = pd.Index(self.categories(name), dtype=object)
+                data[name] = pd.Categorical.from_codes(column, categories=categories, validate=False)
+            else:
+                data[name] = column
+        return pd.DataFrame(data, copy=False)
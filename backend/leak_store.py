@@ -0,0 +1,667 @@
+"""
+In-memory store of scored leaks for the dashboard API.
+
+Holds LeakDetectorML results in a columnar ScanResults together with
+posting list indexes and running aggregates, so ingesting a batch costs
+O(batch), the aggregate endpoints read counters kept per value and per
+source instead of passing over the rows, and a filtered page of
+/api/leaks only touches the rows it returns (plus those rejected by
+secondary filters). Dashboard row dicts are only built for the rows a
+response contains. Timeline counts are kept per time bucket
+(see leak_timeline.py) and near-duplicate clusters per row (see
+leak_clusters.py), both updated on ingest as well.
+"""
+
+import heapq
+import threading
+from array import array
+from collections import OrderedDict
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from leak_clusters import ClusterIndex, cluster_text
+from leak_results import EXTEND_CHUNK_SIZE, NO_DATE, ScanResults, day_date, day_number
+from leak_timeline import TIMELINE_FIELDS, TimelineIndex
+from metrics import ENTRIES_INGESTED, RESPONSE_CACHE, STAGE_SECONDS
+
+
+COLUMNS = [
+    "id",
+    "source",
+    "description",
+    "content",
+    "leaked_date",
+    "severity",
+    "risk_score",
+    "risk_level",
+    "patterns",
+]
+
+# Fields with an equality index (value -> ascending row positions).
+INDEXED_FIELDS = ("source", "risk_level", "severity")
+
+# Fields /api/leaks can sort by; "id" means ingest order.
+SORT_FIELDS = ("id", "leaked_date", "risk_score")
+
+# risk_score values are their own codes.
+_SCORES = range(101)
+
+# Views kept by cached(); least recently used ones are dropped first.
+CACHED_VIEWS = 128
+
+
+def _extend_postings(postings: Dict[Any, "array[int]"], codes: np.ndarray,
+                     values: Sequence[Any], first: int) -> List[Any]:
+    """
+    Append position first + i to the posting list of values[codes[i]]
+    (code -1 is None). Returns the values that got a new posting list.
+    """
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order].astype(np.int64)
+    positions = order.astype(np.int64) + first
+    bounds = (np.flatnonzero(sorted_codes[1:] != sorted_codes[:-1]) + 1).tolist()
+
+    created = []
+    for start, end in zip([0] + bounds, bounds + [len(order)]):
+        code = int(sorted_codes[start])
+        value = values[code] if code >= 0 else None
+        plist = postings.get(value)
+        if plist is None:
+            plist = postings[value] = array("q")
+            created.append(value)
+        plist.frombytes(positions[start:end].tobytes())
+    return created
+
+
+def _parse_day(name: str, value: Optional[str]) -> Optional[int]:
+    """day_number() of a date_from / date_to argument (None if absent)."""
+    if value is None:
+        return None
+    day = day_number(value)
+    if day == NO_DATE:
+        raise ValueError(f"'{name}' must be an ISO date (YYYY-MM-DD)")
+    return day
+
+
+def _day_range(date_from: Optional[str], date_to: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Inclusive leaked_day bounds of a date range, None if it is open on both ends."""
+    if date_from is None and date_to is None:
+        return None
+    first, last = _parse_day("date_from", date_from), _parse_day("date_to", date_to)
+    return (NO_DATE + 1 if first is None else first, np.iinfo(np.int32).max if last is None else last)
+
+
+class _SourceTotals:
+    """Rows, risk_score sum, rows with an id and latest leaked_day per source code."""
+
+    __slots__ = ("rows", "score_sums", "with_id", "latest")
+
+    def __init__(self):
+        self.rows = np.zeros(0, dtype=np.int64)
+        self.score_sums = np.zeros(0, dtype=np.int64)
+        self.with_id = np.zeros(0, dtype=np.int64)
+        self.latest = np.full(0, NO_DATE, dtype=np.int32)
+
+    def add(self, results: ScanResults, first: int) -> None:
+        codes = results.column("source")[first:]
+        present = codes >= 0
+        codes = codes[present].astype(np.int64)
+        if not len(codes):
+            return
+        n_sources = len(results.categories("source"))
+        if n_sources > len(self.rows):
+            grow = max(n_sources, 2 * len(self.rows)) - len(self.rows)
+            self.rows, self.score_sums, self.with_id = (
+                np.concatenate([a, np.zeros(grow, dtype=np.int64)])
+                for a in (self.rows, self.score_sums, self.with_id)
+            )
+            self.latest = np.concatenate([self.latest, np.full(grow, NO_DATE, dtype=np.int32)])
+
+        # Per distinct source in the batch, so the cost follows the batch.
+        touched, batch_codes = np.unique(codes, return_inverse=True)
+        self.rows[touched] += np.bincount(batch_codes)
+        self.score_sums[touched] += np.bincount(
+            batch_codes, weights=results.column("risk_score")[first:][present]
+        ).astype(np.int64)
+        self.with_id[touched] += np.bincount(
+            batch_codes, weights=np.not_equal(results.column("id")[first:][present], None)
+        ).astype(np.int64)
+        np.maximum.at(self.latest, codes, results.column("leaked_day")[first:][present])
+
+
+class LeakStore:
+    """
+    Scored leaks in a columnar ScanResults plus posting list indexes.
+
+    Aggregates follow the pandas semantics the endpoints used before:
+    None values are skipped by the counters, and per-source total_leaks
+    counts rows with an id.
+    """
+
+    def __init__(self, clusters: bool = True):
+        """
+        Args:
+            clusters: Group near-duplicate rows on ingest (see ClusterIndex)
+        """
+        self.results = ScanResults()
+        # Re-entrant so cached() can call the aggregate views while holding it.
+        self._lock = threading.RLock()
+
+        # Bumped on every change; cached views are valid for one version.
+        self.version = 0
+        self._cache: "OrderedDict[str, Tuple[int, Any]]" = OrderedDict()
+
+        # Called as listener(first_position, rows) after each ingest.
+        self._listeners: List[Callable[[int, List[Dict[str, Any]]], None]] = []
+
+        # Posting lists: value -> ascending row positions. Rows are only ever
+        # appended, so every list stays sorted without re-sorting.
+        self._index: Dict[str, Dict[Any, "array[int]"]] = {f: {} for f in INDEXED_FIELDS}
+        # Keyed by leaked_day (None: no parseable leaked_date), so dates
+        # in any format, or not strings at all, compare as days.
+        self._by_date: Dict[Optional[int], "array[int]"] = {}
+        self._dates: List[int] = []  # sorted distinct leaked_day values
+        self._by_score: Dict[int, "array[int]"] = {}
+        self._timeline = TimelineIndex()
+        self._clusters: Optional[ClusterIndex] = ClusterIndex() if clusters else None
+
+        # Aggregates of summary() and domains() (counts per value are the
+        # posting list lengths), updated per ingested batch.
+        self._score_sum = 0
+        self._sources = _SourceTotals()
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def add_results(self, results: Union[ScanResults, Iterable[Dict[str, Any]]]) -> range:
+        """
+        Append scan results (a ScanResults or result dicts) and index them.
+
+        All or nothing: if appending or clustering fails, the rows are
+        rolled back before the error propagates. Returns the positions of
+        the added rows.
+        """
+        with self._lock, STAGE_SECONDS.labels("ingest").time():
+            first = len(self.results)
+            mark = self.results.mark()
+            clusters = len(self._clusters) if self._clusters is not None else 0
+            try:
+                self.results.extend(results)
+                added = range(first, len(self.results))
+                if added:
+                    self._index_rows(first)
+            except BaseException:
+                if self._clusters is not None:
+                    self._clusters.rollback(first, clusters)
+                self.results.rollback(mark)
+                raise
+            if added:
+                self.version += 1
+                ENTRIES_INGESTED.inc(len(added))
+                # Still under the lock so listeners see batches in position order.
+                if self._listeners:
+                    rows = self.results.rows_at(added)
+                    for listener in self._listeners:
+                        listener(first, rows)
+            return added
+
+    def replace(self, other: "LeakStore") -> None:
+        """
+        Take over other's rows and indexes in one step.
+
+        Used to swap in a copy re-scored by a new model: readers see either
+        the old rows or the new ones, never a mix. Listeners, and positions
+        (hence event ids and cursors), are kept; cached views are dropped
+        by the version bump. So are the clusters, as the entries at each
+        position are the same (other can be built with clusters=False).
+        """
+        with self._lock, other._lock:
+            self.results = other.results
+            self._index = other._index
+            self._by_date = other._by_date
+            self._dates = other._dates
+            self._by_score = other._by_score
+            self._timeline = other._timeline
+            self._score_sum = other._score_sum
+            self._sources = other._sources
+            self.version += 1
+
+    def add_listener(self, listener: Callable[[int, List[Dict[str, Any]]], None]) -> None:
+        """Register a callback invoked with (first_position, rows) after each ingest."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def cached(self, key: str, build: Callable[[], Any]) -> Any:
+        """
+        Return build() as of the current version, computing it at most once.
+
+        Used by the API to keep encoded response bodies until the next
+        ingest. At most CACHED_VIEWS keys are kept.
+        """
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is not None and hit[0] == self.version:
+                self._cache.move_to_end(key)
+                RESPONSE_CACHE.labels("hit").inc()
+                return hit[1]
+            RESPONSE_CACHE.labels("miss").inc()
+            value = build()
+            self._cache[key] = (self.version, value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > CACHED_VIEWS:
+                self._cache.popitem(last=False)
+            return value
+
+    def _index_rows(self, first: int) -> None:
+        results = self.results
+        # Clustering goes first: it is the only step that runs per-entry
+        # code, and add_results() can roll it back. The index updates after
+        # it are vectorised over columns that were already appended.
+        if self._clusters is not None:
+            for start in range(first, len(results), EXTEND_CHUNK_SIZE):
+                chunk = results.results_at(range(start, min(start + EXTEND_CHUNK_SIZE, len(results))))
+                self._clusters.add([cluster_text(r["entry"]) for r in chunk])
+
+        for field in INDEXED_FIELDS:
+            _extend_postings(self._index[field], results.column(field)[first:],
+                             results.categories(field), first)
+
+        days, day_codes = np.unique(results.column("leaked_day")[first:], return_inverse=True)
+        created = _extend_postings(self._by_date, day_codes,
+                                   [None if d == NO_DATE else d for d in days.tolist()], first)
+        for day in created:
+            if day is not None:
+                insort(self._dates, day)
+
+        _extend_postings(self._by_score, results.column("risk_score")[first:], _SCORES, first)
+        self._timeline.add(results, first)
+
+        self._score_sum += int(results.column("risk_score")[first:].sum(dtype=np.int64))
+        self._sources.add(results, first)
+
+    # ------------------------------------------------------------
+    # Rows
+    # ------------------------------------------------------------
+
+    def get_rows(self, positions: Iterable[int]) -> List[Dict[str, Any]]:
+        """Dashboard rows (COLUMNS) at positions."""
+        with self._lock:
+            return self.results.rows_at(positions)
+
+    def get_results(self, positions: Iterable[int]) -> List[Dict[str, Any]]:
+        """Raw ML result dicts at positions."""
+        with self._lock:
+            return self.results.results_at(positions)
+
+    def iter_rows(self, stop: int, chunk_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Yield rows 0..stop-1, materialising chunk_size rows at a time."""
+        for start in range(0, stop, chunk_size):
+            yield from self.get_rows(range(start, min(start + chunk_size, stop)))
+
+    # ------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------
+
+    def query(
+        self,
+        filters: Optional[Dict[str, List[Any]]] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        sort: str = "id",
+        descending: bool = False,
+        after: Optional[int] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        dedup: bool = False,
+    ) -> Tuple[List[Dict[str, Any]], Optional[int], Optional[int]]:
+        """
+        Return one page of rows matching the filters.
+
+        filters maps an INDEXED_FIELDS name to accepted values; date_from /
+        date_to (ISO dates) bound leaked_date inclusively, compared as days
+        (leaked_day) like sort=leaked_date; dedup keeps only the
+        representative row of each near-duplicate cluster, and adds
+        cluster_id and cluster_size to the rows. Rows come back ordered by
+        sort (rows without that value last), resuming after the row
+        position `after` when paging by cursor.
+
+        Returns (rows, next_cursor, total). next_cursor is the position to
+        pass as `after` for the next page (None on the last page). total is
+        only reported when it can be read off the indexes (no filters, a
+        single equality filter, a date range or dedup alone), otherwise None.
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Unsupported sort field: {sort}")
+        if dedup and self._clusters is None:
+            raise ValueError("Near-duplicate clustering is disabled")
+        filters = {f: list(v) for f, v in (filters or {}).items() if v}
+        for field in filters:
+            if field not in INDEXED_FIELDS:
+                raise ValueError(f"Unsupported filter field: {field}")
+
+        days = _day_range(date_from, date_to)
+
+        with self._lock:
+            if after is not None and not 0 <= after < len(self.results):
+                raise ValueError(f"Invalid cursor: {after}")
+
+            positions = self._ordered_positions(filters, days, sort, descending, after, dedup)
+            predicate = self._predicate(filters, days, dedup)
+
+            page: List[int] = []
+            skipped = 0
+            for pos in positions:
+                if not predicate(pos):
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                page.append(pos)
+                # One extra row tells us whether a next page exists.
+                if limit is not None and len(page) > limit:
+                    break
+
+            next_cursor = None
+            if limit is not None and len(page) > limit:
+                page = page[:limit]
+                next_cursor = page[-1] if page else None
+
+            rows = self.results.rows_at(page)
+            if dedup:
+                for row, pos in zip(rows, page):
+                    cluster = self._clusters.cluster_of[pos]
+                    row["cluster_id"] = cluster
+                    row["cluster_size"] = self._clusters.sizes[cluster]
+            return rows, next_cursor, self._indexed_total(filters, days, dedup)
+
+    def _postings(self, field: str, values: List[Any]) -> List[List[int]]:
+        index = self._index[field]
+        return [index[v] for v in values if v in index]
+
+    def _date_keys(self, days: Optional[Tuple[int, int]]) -> List[Optional[int]]:
+        if days is None:
+            return self._dates + ([None] if None in self._by_date else [])
+        return self._dates[bisect_left(self._dates, days[0]):bisect_right(self._dates, days[1])]
+
+    def _indexed_total(self, filters, days, dedup) -> Optional[int]:
+        has_dates = days is not None
+        if dedup:
+            return len(self._clusters) if not filters and not has_dates else None
+        if not filters and not has_dates:
+            return len(self.results)
+        if len(filters) == 1 and not has_dates:
+            (field, values), = filters.items()
+            return sum(map(len, self._postings(field, list(set(values)))))
+        if not filters:
+            return sum(len(self._by_date[d]) for d in self._date_keys(days))
+        return None
+
+    def _predicate(self, filters, days, dedup) -> Callable[[int], bool]:
+        # Every filter becomes a set of accepted codes of a coded column.
+        checks = []
+        for field, values in filters.items():
+            wanted = set(values)
+            codes = {c for c, v in enumerate(self.results.categories(field)) if v in wanted}
+            if None in wanted:
+                codes.add(-1)
+            checks.append((self.results.column(field), codes))
+        if days is not None:
+            # NO_DATE is below any bound, so undated rows never match.
+            leaked_days = self.results.column("leaked_day")
+            first_day, last_day = days
+            in_range = lambda pos: first_day <= leaked_days[pos] <= last_day
+        else:
+            in_range = None
+        cluster_of, representatives = (
+            (self._clusters.cluster_of, self._clusters.representatives) if dedup else (None, None)
+        )
+
+        def matches(pos: int) -> bool:
+            for column, codes in checks:
+                if column[pos] not in codes:
+                    return False
+            if in_range is not None and not in_range(pos):
+                return False
+            return cluster_of is None or representatives[cluster_of[pos]] == pos
+
+        return matches
+
+    def _sort_key(self, sort: str) -> Callable[[int], Any]:
+        if sort == "risk_score":
+            scores = self.results.column("risk_score")
+            return lambda pos: int(scores[pos])
+        days = self.results.column("leaked_day")
+        return lambda pos: int(days[pos]) if days[pos] != NO_DATE else None
+
+    def _ordered_positions(self, filters, days, sort, descending, after, dedup) -> Iterator[int]:
+        """
+        Candidate row positions in output order, starting after `after`.
+
+        The candidates are a superset of the matches (the caller applies
+        the full predicate), drawn from the cheapest index available:
+        - ingest order: the smallest posting list, the date buckets in
+          range, or the cluster representatives, merged in position order;
+        - leaked_date / risk_score: a walk over that field's buckets, unless
+          an equality filter narrows things down, in which case its
+          postings are collected and sorted directly.
+        """
+        if sort == "id":
+            lists = [self._postings(f, list(set(v))) for f, v in filters.items()]
+            if days is not None:
+                lists.append([self._by_date[d] for d in self._date_keys(days)])
+            if dedup:
+                lists.append([self._clusters.representatives])
+            if not lists:
+                if descending:
+                    start = len(self.results) - 1 if after is None else after - 1
+                    return iter(range(start, -1, -1))
+                return iter(range(0 if after is None else after + 1, len(self.results)))
+            driver = min(lists, key=lambda ls: sum(map(len, ls)))
+            return self._merge(driver, descending, after)
+
+        key = self._sort_key(sort)
+        if filters:
+            smallest = min(
+                (self._postings(f, list(set(v))) for f, v in filters.items()),
+                key=lambda ls: sum(map(len, ls)),
+            )
+            candidates = [p for plist in smallest for p in plist]
+            present = [p for p in candidates if key(p) is not None]
+            missing = [p for p in candidates if key(p) is None]
+            present.sort(key=lambda p: (key(p), p), reverse=descending)
+            missing.sort(reverse=descending)
+            ordered = present + missing
+            if after is not None:
+                ordered = ordered[ordered.index(after) + 1:] if after in set(ordered) else []
+            return iter(ordered)
+
+        if sort == "leaked_date":
+            keys = self._date_keys(days)
+            buckets = self._by_date
+        else:
+            keys = sorted(self._by_score)
+            buckets = self._by_score
+        return self._walk_buckets(keys, buckets, descending, after, key)
+
+    @staticmethod
+    def _merge(lists: List[List[int]], descending: bool, after: Optional[int]) -> Iterator[int]:
+        if descending:
+            cut = [pl[:bisect_left(pl, after)] if after is not None else pl for pl in lists]
+            return heapq.merge(*(reversed(pl) for pl in cut), reverse=True)
+        if after is not None:
+            return heapq.merge(*(pl[bisect_right(pl, after):] for pl in lists))
+        return heapq.merge(*lists)
+
+    @staticmethod
+    def _walk_buckets(keys, buckets, descending, after, key) -> Iterator[int]:
+        present = [k for k in keys if k is not None]
+        order = (present[::-1] if descending else present) + [k for k in keys if k is None]
+
+        start = 0
+        after_key = key(after) if after is not None else None
+        if after is not None:
+            if after_key not in order:
+                return
+            start = order.index(after_key)
+
+        for i in range(start, len(order)):
+            plist = buckets[order[i]]
+            if descending:
+                end = bisect_left(plist, after) if i == start and after is not None else len(plist)
+                yield from reversed(plist[:end])
+            else:
+                begin = bisect_right(plist, after) if i == start and after is not None else 0
+                yield from plist[begin:]
+
+    # ------------------------------------------------------------
+    # Aggregate views
+    # ------------------------------------------------------------
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            total = len(self.results)
+            if not total:
+                return {
+                    "total_leaks": 0,
+                    "high_risk": 0,
+                    "avg_risk_score": 0,
+                    "active_sources": 0,
+                    "risk_level_distribution": {},
+                    "severity_distribution": {},
+                }
+
+            risk_levels = self.risk_distribution()
+            return {
+                "total_leaks": total,
+                "high_risk": risk_levels.get("high", 0),
+                "avg_risk_score": round(self._score_sum / total, 1),
+                "active_sources": len(self._counts("source")),
+                "risk_level_distribution": risk_levels,
+                "severity_distribution": self._counts("severity"),
+            }
+
+    def _counts(self, field: str) -> Dict[Any, int]:
+        """Rows per non-null value of an indexed field: its posting list lengths."""
+        return {v: len(plist) for v, plist in self._index[field].items() if v is not None}
+
+    def risk_distribution(self) -> Dict[str, int]:
+        with self._lock:
+            return self._counts("risk_level")
+
+    def domains(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            sources = self.results.categories("source")
+            totals = self._sources
+            # Latest parsed leaked_date per source (NO_DATE sorts first).
+            return [
+                {
+                    "source": sources[i],
+                    "avg_risk_score": int(totals.score_sums[i]) / int(totals.rows[i]),
+                    "total_leaks": int(totals.with_id[i]),
+                    "last_seen": day_date(int(totals.latest[i])).isoformat()
+                    if totals.latest[i] != NO_DATE else None,
+                }
+                for i in sorted(range(len(sources)), key=sources.__getitem__)
+                if totals.rows[i]
+            ]
+
+    def timeline(self, granularity: str = "day", fields: Sequence[str] = TIMELINE_FIELDS,
+                 date_from: Optional[str] = None, date_to: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Rows per day / week / month, broken down by fields, read off the
+        bucket counts.
+
+        date_from / date_to (ISO dates) bound leaked_date inclusively.
+        Rows without a plausible leaked_date (see LEAKED_DAYS) are counted
+        in "undated".
+        """
+        bounds = [_parse_day(name, value) for name, value in (("date_from", date_from), ("date_to", date_to))]
+
+        with self._lock:
+            return {
+                "granularity": granularity,
+                "buckets": self._timeline.query(self.results, granularity, fields, *bounds),
+                "undated": self._timeline.undated,
+            }
+
+    def clusters(self, min_size: int = 1, offset: int = 0,
+                 limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Near-duplicate clusters of at least min_size rows, largest first
+        (then oldest first).
+
+        Returns (page, total): each cluster's id, size and representative
+        row, and the number of clusters matching min_size.
+        """
+        with self._lock:
+            index = self._require_clusters()
+            sizes = np.frombuffer(index.sizes, dtype=np.int64)
+            ids = np.flatnonzero(sizes >= min_size)
+            ids = ids[np.argsort(-sizes[ids], kind="stable")]
+            page = ids[offset:None if limit is None else offset + limit].tolist()
+            rows = self.results.rows_at(index.representatives[c] for c in page)
+            return [
+                {"cluster_id": c, "size": index.sizes[c], "representative": row}
+                for c, row in zip(page, rows)
+            ], len(ids)
+
+    def cluster(self, cluster_id: int, offset: int = 0, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        A cluster's size and a page of its rows in ingest order, starting
+        with the representative (KeyError if unknown).
+        """
+        with self._lock:
+            index = self._require_clusters()
+            if not 0 <= cluster_id < len(index):
+                raise KeyError(cluster_id)
+            members = index.members(cluster_id)[offset:None if limit is None else offset + limit]
+            return {
+                "cluster_id": cluster_id,
+                "size": index.sizes[cluster_id],
+                "rows": self.results.rows_at(members.tolist()),
+            }
+
+    def duplicate_scores(self, entries: Sequence[Dict[str, Any]]) -> List[Optional[float]]:
+        """
+        For each entry, the leak probability of the cluster representative
+        it is a near-duplicate of, or None if it would start a new cluster.
+        """
+        with self._lock:
+            index = self._require_clusters()
+            probas = self.results.column("leak_probability")
+            return [
+                None if c is None else float(probas[index.representatives[c]])
+                for c in index.match([cluster_text(e) for e in entries])
+            ]
+
+    def cluster_count(self) -> int:
+        with self._lock:
+            return len(self._clusters) if self._clusters is not None else 0
+
+    def _require_clusters(self) -> ClusterIndex:
+        if self._clusters is None:
+            raise ValueError("Near-duplicate clustering is disabled")
+        return self._clusters
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the rows and their indexes (O(rows))."""
+        with self._lock:
+            postings = [*self._by_date.values(), *self._by_score.values()]
+            for index in self._index.values():
+                postings.extend(index.values())
+            total = self.results.nbytes() + sum(len(p) * p.itemsize for p in postings)
+            if self._clusters is not None:
+                total += self._clusters.nbytes()
+            return total
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Snapshot of all results as a DataFrame sharing the store's columns.
+
+        See ScanResults.to_dataframe() for the columns.
+        """
+        with self._lock:
+            return self.results.to_dataframe()
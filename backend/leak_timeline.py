@@ -0,0 +1,192 @@
+"""
+Pre-bucketed leak counts over time for the timeline endpoint.
+
+TimelineIndex keeps, for each granularity (day, ISO week, calendar month)
+and each breakdown field (source, severity, risk_level), row counts per
+(bucket, value) pair that occurs, in sorted arrays. Ingest adds the new
+rows' counts to them, so a timeline over years of data reads a few
+thousand counters instead of every row, and memory follows the pairs
+present rather than the date span times the number of values. Ranges that cut a week or month short are completed from the
+day buckets, so counts are exact for any date range.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from leak_results import NO_DATE, ScanResults, day_date
+
+GRANULARITIES = ("day", "week", "month")
+
+# Fields a timeline is broken down by.
+TIMELINE_FIELDS = ("source", "severity", "risk_level")
+
+
+def bucket_keys(days: np.ndarray, granularity: str) -> np.ndarray:
+    """Bucket of each day number: the day, the ISO week or the month since 1970."""
+    days = days.astype(np.int64)
+    if granularity == "day":
+        return days
+    if granularity == "week":
+        # 1970-01-01 was a Thursday; weeks start on Monday 1969-12-29.
+        return (days + 3) // 7
+    if granularity == "month":
+        return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    raise ValueError(f"Unsupported granularity: {granularity}")
+
+
+def bucket_start(key: int, granularity: str) -> int:
+    """First day number of a bucket."""
+    if granularity == "day":
+        return key
+    if granularity == "week":
+        return key * 7 - 3
+    return int(np.datetime64(key, "M").astype("datetime64[D]").astype(np.int64))
+
+
+class _Counts:
+    """
+    Row counts per (bucket key, value code + 1), for the pairs that occur.
+
+    Each pair is one int64, key << 32 | column, so the sorted pairs are
+    grouped by bucket and a range of buckets is one slice.
+    """
+
+    __slots__ = ("pairs", "counts")
+
+    def __init__(self):
+        self.pairs = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    def add(self, keys: np.ndarray, columns: np.ndarray) -> None:
+        pairs, counts = np.unique(keys << 32 | columns, return_counts=True)
+        at = np.searchsorted(self.pairs, pairs)
+        known = at < len(self.pairs)
+        known[known] = self.pairs[at[known]] == pairs[known]
+        self.counts[at[known]] += counts[known]
+        if not known.all():
+            new = ~known
+            self.pairs = np.insert(self.pairs, at[new], pairs[new])
+            self.counts = np.insert(self.counts, at[new], counts[new])
+
+    def _slice(self, lo: int, hi: int) -> slice:
+        start, stop = np.searchsorted(self.pairs, [lo << 32, (hi + 1) << 32])
+        return slice(int(start), int(stop))
+
+    def keys(self, lo: int, hi: int) -> np.ndarray:
+        """Keys of the non-empty buckets lo..hi (inclusive), ascending."""
+        return np.unique(self.pairs[self._slice(lo, hi)] >> 32)
+
+    def rows(self, keys: np.ndarray, width: int) -> np.ndarray:
+        """Counts of the buckets keys (ascending, from keys()), one row each."""
+        out = np.zeros((len(keys), width), dtype=np.int64)
+        if len(keys):
+            span = self._slice(int(keys[0]), int(keys[-1]))
+            pairs = self.pairs[span]
+            rows = np.searchsorted(keys, pairs >> 32)
+            out[rows, pairs & 0xFFFFFFFF] = self.counts[span]
+        return out
+
+    def total(self, lo: int, hi: int, width: int) -> np.ndarray:
+        """Counts of buckets lo..hi (inclusive) added up."""
+        span = self._slice(lo, hi)
+        return np.bincount(self.pairs[span] & 0xFFFFFFFF, weights=self.counts[span],
+                           minlength=width).astype(np.int64)
+
+    def extent(self) -> Optional[range]:
+        """Keys of the first and last non-empty bucket (as a range), if any."""
+        if not len(self.pairs):
+            return None
+        return range(int(self.pairs[0] >> 32), int(self.pairs[-1] >> 32) + 1)
+
+
+class TimelineIndex:
+    """
+    Counts of rows per time bucket and breakdown value.
+
+    Not thread-safe; LeakStore serialises access.
+    """
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[str, _Counts]] = {
+            g: {f: _Counts() for f in TIMELINE_FIELDS} for g in GRANULARITIES
+        }
+        # Rows whose leaked_date is missing or not a date.
+        self.undated = 0
+
+    def add(self, results: ScanResults, first: int) -> None:
+        """Count rows first.. of results."""
+        days = results.column("leaked_day")[first:]
+        dated = days != NO_DATE
+        self.undated += int(len(days) - np.count_nonzero(dated))
+        days = days[dated]
+        if not len(days):
+            return
+        columns = {
+            f: results.column(f)[first:][dated].astype(np.int64) + 1 for f in TIMELINE_FIELDS
+        }
+        for granularity, counts in self._counts.items():
+            keys = bucket_keys(days, granularity)
+            for field in TIMELINE_FIELDS:
+                counts[field].add(keys, columns[field])
+
+    def query(self, results: ScanResults, granularity: str, fields: Sequence[str],
+              day_from: Optional[int], day_to: Optional[int]) -> List[Dict[str, Any]]:
+        """
+        Non-empty buckets between day_from and day_to (inclusive, open
+        when None), oldest first.
+
+        Each bucket has its first day as "start" (ISO date), the number of
+        rows as "total", and per field a {value: rows} breakdown (rows
+        without the value are only in the total).
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unsupported granularity: {granularity}")
+        for field in fields:
+            if field not in TIMELINE_FIELDS:
+                raise ValueError(f"Unsupported timeline field: {field}")
+
+        days = self._counts["day"]["risk_level"].extent()
+        if days is None:
+            return []
+        day_from = days.start if day_from is None else max(day_from, days.start)
+        day_to = days.stop - 1 if day_to is None else min(day_to, days.stop - 1)
+        if day_from > day_to:
+            return []
+
+        lo, hi = (int(k) for k in bucket_keys(np.array([day_from, day_to]), granularity))
+        # Every dated row is counted under each field (rows without the
+        # value in column 0), so all fields have the same buckets.
+        keys = self._counts[granularity]["risk_level"].keys(lo, hi)
+        if not len(keys):
+            return []
+        # risk_level is never missing, so its rows add up to the totals.
+        breakdown = {}
+        for field in {*fields, "risk_level"}:
+            width = len(results.categories(field)) + 1
+            rows = self._counts[granularity][field].rows(keys, width)
+            if granularity != "day":
+                # Edge buckets the range only partly covers, from the days.
+                day_counts = self._counts["day"][field]
+                if keys[0] == lo and bucket_start(lo, granularity) < day_from:
+                    end = min(bucket_start(lo + 1, granularity) - 1, day_to)
+                    rows[0] = day_counts.total(day_from, end, width)
+                if keys[-1] == hi and bucket_start(hi + 1, granularity) - 1 > day_to and hi > lo:
+                    start = bucket_start(hi, granularity)
+                    rows[-1] = day_counts.total(start, day_to, width)
+            breakdown[field] = rows
+
+        totals = breakdown["risk_level"].sum(axis=1)
+        buckets = []
+        for i in np.flatnonzero(totals).tolist():
+            bucket = {
+                "start": day_date(bucket_start(int(keys[i]), granularity)).isoformat(),
+                "total": int(totals[i]),
+            }
+            for field in fields:
+                values = results.categories(field)
+                bucket[field] = {
+                    values[c - 1]: n for c, n in enumerate(breakdown[field][i].tolist()) if c and n
+                }
+            buckets.append(bucket)
+        return buckets
@@ -0,0 +1,322 @@
+"""
+In-process metrics with Prometheus text exposition, and a sampling profiler.
+
+Counters and histograms are cheap enough to leave on: an observation is a
+bisect and two additions under a per-series lock, and the hot paths record
+once per batch or request rather than once per row. Values that already
+live elsewhere (cache stats, store size) are read by collectors only when
+/api/metrics is scraped.
+
+The names follow prometheus_client (Counter, Histogram, .labels(),
+.time()), so switching to it later is mechanical.
+"""
+
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as _Tally
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Upper bounds in seconds; covers sub-millisecond stages up to slow scans.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# A metric family: (name, type, help, [(sample name, labels, value), ...]).
+Family = Tuple[str, str, str, List[Tuple[str, Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Registry:
+    """Metrics and collectors rendered by /api/metrics, in registration order."""
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+        self._collectors: List[Callable[[], Iterable[Family]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: Any) -> None:
+        with self._lock:
+            self._metrics.append(metric)
+
+    def register_collector(self, collect: Callable[[], Iterable[Family]]) -> None:
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            metrics, collectors = list(self._metrics), list(self._collectors)
+        families = [m.collect() for m in metrics]
+        for collect in collectors:
+            families.extend(collect())
+        for name, kind, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional[Registry] = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        if registry is not None:
+            registry.register(self)
+
+    def labels(self, *values: Any) -> Any:
+        """The series for these label values (created on first use)."""
+        child = self._children.get(values)
+        if child is None:
+            key = tuple(str(v) for v in values)
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def collect(self) -> Family:
+        samples = []
+        for key, child in list(self._children.items()):
+            samples.extend(child.samples(self.name, dict(zip(self.labelnames, key))))
+        return self.name, self.kind, self.documentation, samples
+
+
+class _CounterChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def samples(self, name, labels):
+        return [(name, labels, self._value)]
+
+
+class Counter(_Metric):
+    """Monotonic count; name should end in _total."""
+
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self._children[()].inc(amount)
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child: "_HistogramChild"):
+        self._child = child
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._child.observe(time.perf_counter() - self._start)
+
+
+class _HistogramChild:
+    __slots__ = ("_upper", "_counts", "_sum", "_lock")
+
+    def __init__(self, upper: Tuple[float, ...]):
+        self._upper = upper
+        self._counts = [0] * (len(upper) + 1)  # last slot: above every bound
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect_left(self._upper, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    def time(self) -> _Timer:
+        """Context manager observing the duration of its block."""
+        return _Timer(self)
+
+    def samples(self, name, labels):
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        out = []
+        cumulative = 0
+        for bound, count in zip(self._upper + (float("inf"),), counts):
+            cumulative += count
+            out.append((f"{name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+        out.append((f"{name}_sum", labels, total))
+        out.append((f"{name}_count", labels, cumulative))
+        return out
+
+
+class Histogram(_Metric):
+    """Distribution of observations (e.g. latencies in seconds)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional[Registry] = REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    def time(self) -> _Timer:
+        return self._children[()].time()
+
+
+# ------------------------------------------------------------
+# Sampling profiler
+# ------------------------------------------------------------
+
+class SamplingProfiler:
+    """
+    Background thread that samples the Python stacks of all other threads.
+
+    Stacks are tallied in folded form ("outer;inner;leaf count" per line),
+    which flamegraph.pl and speedscope read directly. Costs nothing while
+    stopped; while running, one sample of every thread per interval.
+    """
+
+    def __init__(self):
+        self.interval = 0.01
+        self.samples = 0
+        self._stacks: _Tally = _Tally()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float = 0.01) -> None:
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, got {interval}")
+        self.interval = interval
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+            self._thread = None
+
+    def folded(self, reset: bool = False) -> str:
+        """Tallied stacks, most frequent first."""
+        with self._lock:
+            stacks = self._stacks.most_common()
+            if reset:
+                self._stacks.clear()
+                self.samples = 0
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            stacks = []
+            for ident, frame in frames.items():
+                if ident == me:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}")
+                    frame = frame.f_back
+                stacks.append(";".join(reversed(names)))
+            with self._lock:
+                self._stacks.update(stacks)
+                self.samples += 1
+
+
+PROFILER = SamplingProfiler()
+
+
+# ------------------------------------------------------------
+# Application metrics
+# ------------------------------------------------------------
+
+STAGE_SECONDS = Histogram(
+    "leak_stage_seconds",
+    "Time spent per pipeline stage (load, text, vectorize, predict, match, ingest, aggregate, serialize)",
+    ["stage"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "leak_http_request_seconds",
+    "API request latency until the response is returned (streamed bodies not included)",
+    ["method", "endpoint", "status"],
+)
+ENTRIES_LOADED = Counter("leak_entries_loaded_total", "Entries read by load_csv / load_json", ["format"])
+ENTRIES_SCANNED = Counter("leak_entries_scanned_total", "Entries scored", ["detector"])
+ENTRIES_INGESTED = Counter("leak_entries_ingested_total", "Rows added to the API store")
+PATTERN_HITS = Counter("leak_pattern_hits_total", "Entries matched per rule-engine risk pattern", ["pattern"])
+RESPONSE_CACHE = Counter("leak_response_cache_total", "Cached response lookups (hit, miss, not_modified)", ["result"])
+CASCADE_RESOLVED = Counter(
+    "leak_cascade_entries_total", "Entries resolved per detection cascade stage (clear, leak, ml)", ["stage"]
+)
+DATASET_LOOKUPS = Counter("leak_dataset_lookups_total", "Dataset registry lookups (hit, miss)", ["result"])
+DATASET_EVICTIONS = Counter("leak_dataset_evictions_total", "Datasets evicted from memory by the registry")
+
+
+def cache_family(caches: Dict[str, Any]) -> Iterable[Family]:
+    """Collector families for ScoreCache instances, keyed by detector name."""
+    stats = {name: cache.stats() for name, cache in caches.items() if cache is not None}
+    for field, kind, documentation in (
+        ("hits", "counter", "Score cache hits"),
+        ("misses", "counter", "Score cache misses"),
+        ("hit_rate", "gauge", "Score cache hits / lookups"),
+        ("size", "gauge", "Entries in the score cache"),
+    ):
+        suffix = "_total" if kind == "counter" else ""
+        name = f"leak_score_cache_{field}{suffix}"
+        yield name, kind, documentation, [(name, {"detector": d}, s[field]) for d, s in stats.items()]
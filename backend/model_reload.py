@@ -0,0 +1,238 @@
+"""
+Zero-downtime model hot-swap.
+
+ModelReloader loads a new model in a background thread and re-scores
+every row of the API store into a staged copy, a chunk at a time, while
+the store keeps serving the old scores. The model runs in a worker
+process, so scoring does not compete with request threads for the GIL.
+Once the staged copy has caught up it is swapped in with
+LeakStore.replace() and the new detector takes over ingest, so requests
+never wait on a rescan and never see a mix of old and new scores.
+
+A reload is started by POST /api/model/reload or, with watch(), when the
+model files on disk change.
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from leak_cascade import DetectionCascade
+from leak_detector_ml import DEFAULT_BATCH_SIZE, LeakDetectorML, _init_worker, _predict_chunk
+from leak_results import ScanResults
+from leak_store import LeakStore
+from metrics import ENTRIES_SCANNED
+from score_db import ScoreDB
+
+# Seconds between checks of the model files by watch().
+DEFAULT_WATCH_INTERVAL = 5.0
+
+# Score DB, score version and detection cascade of the re-scoring worker process.
+_worker_db: Optional[ScoreDB] = None
+_worker_version: Optional[str] = None
+_worker_cascade: Optional[DetectionCascade] = None
+
+
+def _init_rescore_worker(model: Any, db_path: Optional[str], score_version: str,
+                         cascade_config: Optional[Dict[str, Any]] = None) -> None:
+    global _worker_db, _worker_version, _worker_cascade
+    _init_worker(model)
+    _worker_db = ScoreDB(db_path) if db_path else None
+    _worker_version = score_version
+    _worker_cascade = DetectionCascade(**cascade_config) if cascade_config else None
+
+
+def _rescore_chunk(entries: List[Dict[str, Any]], timestamp: str) -> List[float]:
+    """Probabilities for entries, persisted to the score DB from the worker."""
+    if _worker_cascade is None:
+        probas = _predict_chunk(entries)
+    else:
+        probas = _worker_cascade.score(entries, _predict_chunk)
+    if _worker_db is not None:
+        _worker_db.save(
+            ({"entry": e, "leak_probability": p, "timestamp": timestamp} for e, p in zip(entries, probas)),
+            _worker_version,
+        )
+    return probas
+
+
+def _file_signature(paths: List[str]) -> Tuple:
+    """(path, mtime_ns) of every file under paths; missing paths are skipped."""
+    signature = []
+    for path in paths:
+        try:
+            files = [os.path.join(path, name) for name in sorted(os.listdir(path))]
+        except (FileNotFoundError, NotADirectoryError):
+            files = [path]
+        for file in files:
+            try:
+                signature.append((file, os.stat(file).st_mtime_ns))
+            except FileNotFoundError:  # absent, or removed while listing
+                continue
+    return tuple(signature)
+
+
+class ModelReloader:
+    """
+    Background re-scoring of a LeakStore with a newly loaded model.
+
+    Only one reload runs at a time. Ingest must hold ingest_lock around
+    scoring and adding rows, so the final catch-up (rows ingested during
+    the run) and the swap see a quiet store.
+    """
+
+    def __init__(self, store: LeakStore, load_detector: Callable[[], LeakDetectorML],
+                 on_swap: Callable[[LeakDetectorML], None], ingest_lock: threading.Lock,
+                 score_db: Optional[Any] = None, chunk_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Args:
+            store: Store to re-score and swap in place
+            load_detector: Builds a detector with the model to deploy
+            on_swap: Called with the new detector right after the swap
+                (still under ingest_lock)
+            ingest_lock: Lock the ingest path holds while scoring and adding
+            score_db: ScoreDB to persist the new scores to, if any (written
+                from the worker process through its own connection)
+            chunk_size: Rows re-scored per step
+        """
+        self.store = store
+        self.load_detector = load_detector
+        self.on_swap = on_swap
+        self.ingest_lock = ingest_lock
+        self.score_db = score_db
+        self.chunk_size = chunk_size
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._status: Dict[str, Any] = {"state": "idle"}
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watch = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def status(self) -> Dict[str, Any]:
+        """
+        state (idle, loading, rescoring, done, unchanged, failed), model
+        versions, rows_done / rows_total, timestamps and any error.
+        """
+        with self._lock:
+            status = dict(self._status)
+        total = status.get("rows_total")
+        if total is not None:
+            status["progress"] = round(status["rows_done"] / total, 4) if total else 1.0
+        return status
+
+    def start(self, current_version: Optional[str] = None) -> bool:
+        """
+        Start a reload unless one is already running.
+
+        Args:
+            current_version: Version being served; a reload that loads the
+                same version finishes as "unchanged" without re-scoring
+
+        Returns:
+            True if a reload was started
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self._status = {
+                "state": "loading",
+                "previous_version": current_version,
+                "started_at": datetime.now().isoformat(),
+            }
+            self._thread = threading.Thread(target=self._run, args=(current_version,),
+                                            name="model-reload", daemon=True)
+            self._thread.start()
+        return True
+
+    def _update(self, **fields: Any) -> None:
+        with self._lock:
+            self._status.update(fields)
+
+    def _run(self, current_version: Optional[str]) -> None:
+        try:
+            detector = self.load_detector()
+            if detector.model is None or detector.model_version is None:
+                raise ValueError(f"Could not load model from {detector.model_path}")
+            self._update(model_path=detector.model_path, model_version=detector.model_version)
+            if detector.model_version == current_version:
+                self._update(state="unchanged", finished_at=datetime.now().isoformat())
+                return
+
+            # Clusters stay with the store: the entries do not change.
+            staged = LeakStore(clusters=False)
+            self._update(state="rescoring", rows_done=0, rows_total=len(self.store))
+            # spawn, not fork: the server process has threads (and locks) of its own.
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_rescore_worker,
+                                     initargs=(detector.model, self.score_db and self.score_db.path,
+                                               detector.score_version,
+                                               detector.cascade and detector.cascade.config())) as pool:
+                # Re-score while ingest continues; the tail that arrives
+                # meanwhile is picked up below, under the ingest lock.
+                while len(self.store) - len(staged) > self.chunk_size:
+                    self._rescore(pool, staged, len(staged) + self.chunk_size)
+
+                with self.ingest_lock:
+                    self._rescore(pool, staged, len(self.store))
+                    self.store.replace(staged)
+                    self.on_swap(detector)
+            self._update(state="done", finished_at=datetime.now().isoformat())
+            print(f"[INFO] Swapped in model {detector.model_version} ({len(staged)} rows re-scored)")
+        except Exception as e:
+            self._update(state="failed", error=str(e), finished_at=datetime.now().isoformat())
+            print(f"[ERROR] Model reload failed: {e}")
+
+    def _rescore(self, pool: ProcessPoolExecutor, staged: LeakStore, stop: int) -> None:
+        start = len(staged)
+        if stop <= start:
+            return
+        entries = [r["entry"] for r in self.store.get_results(range(start, stop))]
+        timestamp = datetime.now().isoformat()
+        results = ScanResults()
+        results.append_batch(entries, pool.submit(_rescore_chunk, entries, timestamp).result(), timestamp)
+        ENTRIES_SCANNED.labels("ml").inc(len(entries))
+        staged.add_results(results)
+        self._update(rows_done=stop, rows_total=len(self.store))
+
+    # ------------------- FILE WATCH -------------------
+
+    def watch(self, paths: List[str], current_version: Callable[[], Optional[str]],
+              interval: float = DEFAULT_WATCH_INTERVAL) -> None:
+        """
+        Start a reload whenever the files under paths change.
+
+        A change only triggers once the files have stayed the same for one
+        interval, so a model that is still being written is not loaded.
+        """
+        if self._watcher is not None:
+            return
+
+        def run():
+            last = _file_signature(paths)
+            pending = None
+            while not self._stop_watch.wait(interval):
+                current = _file_signature(paths)
+                if current == last:
+                    pending = None
+                elif current != pending:
+                    pending = current
+                elif self.start(current_version()):
+                    last, pending = current, None
+
+        self._watcher = threading.Thread(target=run, name="model-watch", daemon=True)
+        self._watcher.start()
+
+    def stop_watch(self) -> None:
+        watcher = self._watcher
+        if watcher is not None:
+            self._stop_watch.set()
+            watcher.join()
+            self._watcher = None
+            self._stop_watch.clear()
@@ -0,0 +1,400 @@
+"""
+Background scan jobs: queued, prioritised scans of dump files.
+
+A job scans a file, or every .csv / .json / .ndjson / .jsonl file under a
+directory (by name, a folder's files before its subfolders), through the
+API's ingest path, so the rows are scored, persisted and served exactly
+like POSTed leaks - without blocking a request or startup on a large
+dump.
+
+A bounded pool of worker threads runs the jobs one batch at a time.
+After each batch a worker goes back to the queue and takes the
+highest-priority job waiting (the oldest of those on a tie), so an
+urgent small job submitted during a multi-hour backfill starts within a
+batch instead of after the backfill. Scoring itself is serialised with
+ingest (see api.py), so more workers mostly overlap file parsing.
+
+Every batch is ingested before the job's checkpoint (file, and entries
+read from it) is written to SQLite. A job interrupted by a restart
+resumes from its checkpoint, reading past the entries it had done
+without scoring them again. A batch ingested just before the interruption
+is ingested again: the score DB upserts it, but the store can hold it
+twice until the next restart.
+"""
+
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from itertools import islice
+from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple
+
+import leak_io
+from leak_detector_ml import DEFAULT_BATCH_SIZE
+
+# Priorities, most urgent first.
+JOB_PRIORITIES = ("high", "normal", "low")
+
+# A job is queued until a worker first takes it, then running until it ends.
+JOB_STATES = ("queued", "running", "done", "failed", "cancelled")
+FINISHED_STATES = ("done", "failed", "cancelled")
+
+DEFAULT_WORKERS = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scan_jobs (
+    id            INTEGER PRIMARY KEY,
+    path          TEXT NOT NULL,
+    priority      TEXT NOT NULL,
+    state         TEXT NOT NULL,
+    files_json    TEXT NOT NULL,
+    file_index    INTEGER NOT NULL,
+    file_entries  INTEGER NOT NULL,
+    file_bytes    INTEGER NOT NULL,
+    entries_done  INTEGER NOT NULL,
+    busy_seconds  REAL NOT NULL,
+    submitted_at  TEXT NOT NULL,
+    started_at    TEXT,
+    finished_at   TEXT,
+    error         TEXT
+)
+"""
+
+_COLUMNS = (
+    "id", "path", "priority", "state", "files_json", "file_index", "file_entries", "file_bytes",
+    "entries_done", "busy_seconds", "submitted_at", "started_at", "finished_at", "error",
+)
+
+
+def scan_files(path: str) -> List[Tuple[str, int]]:
+    """
+    (path, size in bytes) of the files a job on path reads: path itself,
+    or the readable files under a directory, by name and a folder's files
+    before its subfolders.
+
+    Raises:
+        ValueError: path does not exist, or holds no file iter_entries() reads
+    """
+    if os.path.isdir(path):
+        files = []
+        for folder, subfolders, names in os.walk(path):
+            subfolders.sort()
+            files.extend(
+                os.path.join(folder, name) for name in sorted(names)
+                if os.path.splitext(name)[1].lower() in leak_io.ENTRY_EXTENSIONS
+            )
+        if not files:
+            raise ValueError(f"No {', '.join(leak_io.ENTRY_EXTENSIONS)} files under {path}")
+    elif os.path.isfile(path):
+        if os.path.splitext(path)[1].lower() not in leak_io.ENTRY_EXTENSIONS:
+            raise ValueError(f"Unsupported file type: {path}. Use {', '.join(leak_io.ENTRY_EXTENSIONS)}.")
+        files = [path]
+    else:
+        raise ValueError(f"No such file or directory: {path}")
+    return [(file, os.path.getsize(file)) for file in files]
+
+
+class ScanJob:
+    """A job's settings and checkpoint, and the file it is reading."""
+
+    def __init__(self, id: int, path: str, priority: str, files: List[Tuple[str, int]],
+                 submitted_at: str, state: str = "queued", file_index: int = 0, file_entries: int = 0,
+                 file_bytes: int = 0, entries_done: int = 0, busy_seconds: float = 0.0,
+                 started_at: Optional[str] = None, finished_at: Optional[str] = None,
+                 error: Optional[str] = None):
+        self.id = id
+        self.path = path
+        self.priority = priority
+        self.files = files
+        self.submitted_at = submitted_at
+        self.state = state
+        # Checkpoint: next file to read, entries read from it so far, and
+        # the bytes those took.
+        self.file_index = file_index
+        self.file_entries = file_entries
+        self.file_bytes = file_bytes
+        self.entries_done = entries_done
+        # Time spent reading and ingesting (not waiting in the queue).
+        self.busy_seconds = busy_seconds
+        self.started_at = started_at
+        self.finished_at = finished_at
+        self.error = error
+
+        # Set while a worker holds the job, and by cancel() meanwhile.
+        self.active = False
+        self.cancel_requested = False
+        self._file: Optional[TextIO] = None
+        self._entries = None
+
+    @classmethod
+    def from_row(cls, row: Tuple) -> "ScanJob":
+        fields = dict(zip(_COLUMNS, row))
+        fields["files"] = [tuple(f) for f in json.loads(fields.pop("files_json"))]
+        return cls(**fields)
+
+    def row(self) -> Tuple:
+        fields = {name: getattr(self, name) for name in _COLUMNS if name != "files_json"}
+        fields["files_json"] = json.dumps(self.files)
+        return tuple(fields[name] for name in _COLUMNS)
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    def status(self) -> Dict[str, Any]:
+        """Settings, state, progress (bytes read / total) and throughput."""
+        bytes_total = sum(size for _, size in self.files)
+        bytes_done = sum(size for _, size in self.files[:self.file_index]) + self.file_bytes
+        if self.state == "done":
+            bytes_done = bytes_total
+        reading = not self.finished and self.file_index < len(self.files)
+        return {
+            "id": self.id,
+            "path": self.path,
+            "priority": self.priority,
+            "state": self.state,
+            "files_total": len(self.files),
+            "files_done": min(self.file_index, len(self.files)),
+            "current_file": self.files[self.file_index][0] if reading else None,
+            "entries_done": self.entries_done,
+            "bytes_done": bytes_done,
+            "bytes_total": bytes_total,
+            "progress": round(bytes_done / bytes_total, 4) if bytes_total else 1.0,
+            "entries_per_second": round(self.entries_done / self.busy_seconds, 1) if self.busy_seconds else None,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+        }
+
+    def read(self, size: int) -> Tuple[List[Dict[str, Any]], int, int, int]:
+        """
+        Up to size entries from the checkpoint on, across files.
+
+        Returns:
+            (entries, file_index, file_entries, file_bytes): the entries,
+            and the checkpoint once they are ingested
+        """
+        index, read, position = self.file_index, self.file_entries, self.file_bytes
+        batch: List[Dict[str, Any]] = []
+        while len(batch) < size and index < len(self.files):
+            if self._entries is None:
+                self._open(index, read)
+            got = list(islice(self._entries, size - len(batch)))
+            batch.extend(got)
+            read += len(got)
+            position = self._file.buffer.tell()
+            if len(batch) < size:  # the file ran out
+                self.close()
+                index, read, position = index + 1, 0, 0
+        return batch, index, read, position
+
+    def _open(self, index: int, skip: int) -> None:
+        path = self.files[index][0]
+        self._file = open(path, "r", encoding="utf-8", newline="")
+        self._entries = leak_io.iter_entries(path, self._file)
+        # Entries done before a restart are parsed again, but not scored.
+        deque(islice(self._entries, skip), maxlen=0)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        self._file = self._entries = None
+
+
+class JobDB:
+    """SQLite persistence of scan jobs and their checkpoints."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def save(self, job: ScanJob) -> None:
+        placeholders = ",".join("?" * len(_COLUMNS))
+        with self._lock, self._conn:
+            self._conn.execute(f"INSERT OR REPLACE INTO scan_jobs ({','.join(_COLUMNS)}) VALUES ({placeholders})",
+                               job.row())
+
+    def load(self) -> List[ScanJob]:
+        """Every job, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {','.join(_COLUMNS)} FROM scan_jobs ORDER BY id").fetchall()
+        return [ScanJob.from_row(row) for row in rows]
+
+
+class ScanJobScheduler:
+    """
+    Priority queue of scan jobs and the worker threads running them.
+
+    Thread-safe. Jobs found unfinished in the database are queued again
+    by start().
+    """
+
+    def __init__(self, ingest: Callable[[List[Dict[str, Any]]], Any], db: JobDB,
+                 root: str = ".", workers: int = DEFAULT_WORKERS, batch_size: int = DEFAULT_BATCH_SIZE):
+        """
+        Args:
+            ingest: Scores and stores a batch of entries
+            db: Where jobs and checkpoints are kept
+            root: Directory job paths are relative to; jobs cannot read
+                outside it
+            workers: Jobs run at the same time
+            batch_size: Entries per batch (and so between checkpoints and
+                priority checks)
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.ingest = ingest
+        self.db = db
+        self.root = os.path.realpath(root)
+        self.workers = workers
+        self.batch_size = batch_size
+
+        self._cond = threading.Condition()
+        self._jobs: Dict[int, ScanJob] = {job.id: job for job in db.load()}
+        # (priority rank, job id) of jobs waiting for a worker.
+        self._queue: List[Tuple[int, int]] = []
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+
+    def start(self) -> None:
+        """Queue unfinished jobs again and start the workers."""
+        with self._cond:
+            if self._threads:
+                return
+            for job in self._jobs.values():
+                if not job.finished:
+                    self._push(job)
+            self._stopping = False
+            self._threads = [
+                threading.Thread(target=self._work, name=f"scan-job-{i}", daemon=True) for i in range(self.workers)
+            ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        """Stop the workers after their current batch; jobs resume on the next start()."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        with self._cond:
+            self._threads = []
+            self._queue = []
+            for job in self._jobs.values():
+                job.close()
+
+    def submit(self, path: str, priority: str = "normal") -> Dict[str, Any]:
+        """Queue a scan of path (relative to root); returns the job's status."""
+        if priority not in JOB_PRIORITIES:
+            raise ValueError(f"Unsupported priority: {priority}. Use {', '.join(JOB_PRIORITIES)}.")
+        resolved = os.path.realpath(os.path.join(self.root, path))
+        if os.path.commonpath([resolved, self.root]) != self.root:
+            raise ValueError(f"Path is outside the scan root: {path}")
+        files = scan_files(resolved)
+
+        with self._cond:
+            job = ScanJob(max(self._jobs, default=0) + 1, path, priority, files, datetime.now().isoformat())
+            self.db.save(job)
+            self._jobs[job.id] = job
+            self._push(job)
+            return job.status()
+
+    def cancel(self, job_id: int) -> bool:
+        """
+        Cancel a job (KeyError if unknown). A job a worker holds stops
+        after its current batch. Returns False if it had already finished.
+        """
+        with self._cond:
+            job = self._jobs[job_id]
+            if job.finished:
+                return False
+            if job.active:
+                job.cancel_requested = True
+            else:
+                self._finish(job, "cancelled")
+            return True
+
+    def status(self, job_id: int) -> Dict[str, Any]:
+        """Status of one job (KeyError if unknown)."""
+        with self._cond:
+            return self._jobs[job_id].status()
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        """Status of every job, newest first."""
+        with self._cond:
+            return [job.status() for job in sorted(self._jobs.values(), key=lambda j: -j.id)]
+
+    def counts(self) -> Dict[str, int]:
+        """Jobs per state."""
+        with self._cond:
+            counts = dict.fromkeys(JOB_STATES, 0)
+            for job in self._jobs.values():
+                counts[job.state] += 1
+            return counts
+
+    def _push(self, job: ScanJob) -> None:
+        heapq.heappush(self._queue, (JOB_PRIORITIES.index(job.priority), job.id))
+        self._cond.notify()
+
+    def _finish(self, job: ScanJob, state: str, error: Optional[str] = None) -> None:
+        job.state = state
+        job.error = error
+        job.finished_at = datetime.now().isoformat()
+        job.close()
+        self.db.save(job)
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                job = None
+                while job is None:
+                    while not self._queue and not self._stopping:
+                        self._cond.wait()
+                    if self._stopping:
+                        return
+                    job = self._jobs[heapq.heappop(self._queue)[1]]
+                    if job.finished:  # cancelled while queued
+                        job = None
+                job.active = True
+                if job.state == "queued":
+                    job.state = "running"
+                    job.started_at = datetime.now().isoformat()
+
+            start = time.perf_counter()
+            try:
+                entries, index, read, position = job.read(self.batch_size)
+                if entries:
+                    self.ingest(entries)
+                error = None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+
+            with self._cond:
+                job.active = False
+                job.busy_seconds += time.perf_counter() - start
+                if error is not None:
+                    self._finish(job, "failed", error)
+                    print(f"[ERROR] Scan job {job.id} failed: {error}")
+                    continue
+                job.file_index, job.file_entries, job.file_bytes = index, read, position
+                job.entries_done += len(entries)
+                if job.cancel_requested:
+                    self._finish(job, "cancelled")
+                elif index >= len(job.files):
+                    self._finish(job, "done")
+                else:
+                    self.db.save(job)
+                    self._push(job)
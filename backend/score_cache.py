@@ -0,0 +1,128 @@
+"""
+Content-hash memoization for leak scores.
+
+Dumps are full of reposts and mirrored pastes. Scores are a pure function
+of the text a detector builds for an entry and of the model / pattern set
+that scores it, so identical text under the same version can reuse a
+previous score instead of being scored again.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Entries kept per detector (a key and a score are ~150 bytes).
+DEFAULT_CACHE_SIZE = 100_000
+
+
+def text_hash(text: str, version: str = "") -> str:
+    """Stable digest of text, namespaced by a model / pattern-set version."""
+    digest = hashlib.blake2b(digest_size=16)
+    if version:
+        digest.update(version.encode("utf-8") + b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ScoreCache:
+    """
+    Size-bounded LRU map of text hash -> score with hit/miss counters.
+
+    Values must be JSON-serialisable if the cache is persisted with save().
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        if maxsize < 1:
+            raise ValueError(f"maxsize must be positive, got {maxsize}")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Look up several keys; returns the cached ones.
+
+        Repeats of a key count as hits: the caller computes it only once.
+        """
+        found: Dict[str, Any] = {}
+        seen = set()
+        with self._lock:
+            for key in keys:
+                if key in seen:
+                    self.hits += 1
+                    continue
+                seen.add(key)
+                value = self._data.get(key)
+                if value is None:
+                    self.misses += 1
+                    continue
+                self._data.move_to_end(key)
+                self.hits += 1
+                found[key] = value
+        return found
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    # ------------------- PERSISTENCE -------------------
+
+    def save(self, path: str) -> None:
+        """Write the cache (least recently used first) to a JSON file."""
+        with self._lock:
+            items = list(self._data.items())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(items, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> int:
+        """
+        Merge entries saved by save() into the cache.
+
+        Returns the number of entries read; a missing file reads nothing.
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                items = json.load(f)
+        except FileNotFoundError:
+            return 0
+        for key, value in items:
+            self.put(key, value)
+        return len(items)
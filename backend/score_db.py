@@ -0,0 +1,191 @@
+"""
+SQLite-backed persistence for ML scan results.
+
+Every scored entry is stored with a hash of the text the model saw and
+the version of the model that scored it, so a restart only has to score
+entries that are new, changed, or were scored by a different model.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.request import pathname2url
+
+from leak_detector_ml import LeakDetectorML
+from leak_results import EXTEND_CHUNK_SIZE, ScanResults
+from score_cache import text_hash
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    entry_key        TEXT PRIMARY KEY,
+    content_hash     TEXT NOT NULL,
+    model_version    TEXT NOT NULL,
+    leak_probability REAL NOT NULL,
+    entry_json       TEXT NOT NULL,
+    scored_at        TEXT NOT NULL
+)
+"""
+
+UPSERT = """
+INSERT INTO scores (entry_key, content_hash, model_version, leak_probability, entry_json, scored_at)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT(entry_key) DO UPDATE SET
+    content_hash = excluded.content_hash,
+    model_version = excluded.model_version,
+    leak_probability = excluded.leak_probability,
+    entry_json = excluded.entry_json,
+    scored_at = excluded.scored_at
+"""
+
+
+def entry_key(entry: Dict[str, Any], digest: str) -> str:
+    """Entries are keyed by id; entries without one by their content hash."""
+    entry_id = entry.get("id")
+    return f"id:{entry_id}" if entry_id is not None else f"hash:{digest}"
+
+
+class ScoreDB:
+    """
+    Persistent store of entries and their ML scores.
+
+    Rows keep their insertion order (rowid), which is also the order
+    load_results() returns them in; re-scoring an entry updates it in place.
+    """
+
+    def __init__(self, path: str, read_only: bool = False):
+        """
+        Args:
+            path: SQLite file (created if missing, unless read_only)
+            read_only: Work on an in-memory copy of the file, so sync()
+                and save() never write to it (e.g. in processes that share
+                it with a writer)
+        """
+        self.path = path
+        if read_only:
+            self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+            if os.path.exists(path):
+                disk = sqlite3.connect(f"file:{pathname2url(os.path.abspath(path))}?mode=ro", uri=True)
+                try:
+                    disk.backup(self._conn)
+                finally:
+                    disk.close()
+        else:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    # ------------------- WRITES -------------------
+
+    def save(self, results: Iterable[Dict[str, Any]], model_version: str) -> None:
+        """Upsert ML scan results scored by model_version."""
+        rows = []
+        for result in results:
+            entry = result["entry"]
+            digest = text_hash(LeakDetectorML._entry_to_text(entry))
+            rows.append((
+                entry_key(entry, digest),
+                digest,
+                model_version,
+                result["leak_probability"],
+                json.dumps(entry, default=str),
+                result["timestamp"],
+            ))
+
+        with self._lock, self._conn:
+            self._conn.executemany(UPSERT, rows)
+
+    def sync(self, detector: LeakDetectorML, entries: Iterable[Dict[str, Any]] = ()) -> int:
+        """
+        Make the database hold current scores for entries and for every
+        row already stored.
+
+        Only entries that are missing, whose text changed, or whose stored
+        score came from another model version (or cascade setting, see
+        LeakDetectorML.score_version) are scored (in batches of
+        detector.batch_size). Returns the number of entries scored.
+        """
+        if detector.model is None or detector.model_version is None:
+            raise ValueError("No trained model loaded. Train or load a model first.")
+        version = detector.score_version
+
+        with self._lock:
+            stored = {
+                key: (digest, row_version)
+                for key, digest, row_version in self._conn.execute(
+                    "SELECT entry_key, content_hash, model_version FROM scores"
+                )
+            }
+
+        pending: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            digest = text_hash(detector._entry_to_text(entry))
+            key = entry_key(entry, digest)
+            if stored.get(key) != (digest, version):
+                pending[key] = entry
+                stored[key] = (digest, version)
+
+        # Rows that are no longer in the input file (e.g. ingested via the
+        # API) but were scored by an older model.
+        for key, (_, row_version) in stored.items():
+            if row_version != version and key not in pending:
+                pending[key] = None
+        stale_keys = [key for key, entry in pending.items() if entry is None]
+        for key, entry in self._load_entries(stale_keys):
+            pending[key] = entry
+
+        batch = detector.batch_size
+        todo = list(pending.values())
+        for start in range(0, len(todo), batch):
+            self.save(detector.scan_batch(todo[start:start + batch]), version)
+        return len(todo)
+
+    # ------------------- READS -------------------
+
+    def _load_entries(self, keys: List[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        # Chunked to stay under SQLite's bound-parameter limit.
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT entry_key, entry_json FROM scores WHERE entry_key IN ({placeholders})",
+                    chunk,
+                ).fetchall()
+            for key, entry_json in rows:
+                yield key, json.loads(entry_json)
+
+    def load_results(self, model_version: Optional[str] = None) -> ScanResults:
+        """
+        Load stored results in insertion order.
+
+        With model_version set, only rows scored by that version are returned.
+        """
+        query = "SELECT entry_json, leak_probability, scored_at FROM scores"
+        params: Tuple = ()
+        if model_version is not None:
+            query += " WHERE model_version = ?"
+            params = (model_version,)
+        query += " ORDER BY rowid"
+
+        results = ScanResults()
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(EXTEND_CHUNK_SIZE)
+                if not rows:
+                    break
+                entries, probas, timestamps = zip(*rows)
+                results.append_rows([json.loads(e) for e in entries], probas, timestamps)
+        return results
@@ -0,0 +1,107 @@
+"""
+Production entry point: the API on a pre-forked pool of worker processes.
+
+    python serve.py --workers 4 --port 8000
+
+The app (model, scores and store) is loaded once in the parent and the
+workers are forked from it, so they share those pages copy-on-write
+instead of each loading and scoring the dataset again. Every worker
+accepts connections from the same listening socket and serves them on
+its own threads (one per connection); a worker that dies is replaced.
+
+With more than one worker each holds its own copy of the store, so they
+run read-only (LEAK_READ_ONLY): POST /api/leaks, model reloads and
+profiler toggles answer 403, datasets are loaded without writing their
+score DBs, and ingest goes to a single-worker instance (the default).
+/api/metrics reports the worker that answers the scrape.
+
+gunicorn, where installed, gives the same layout:
+
+    LEAK_READ_ONLY=1 gunicorn --preload -w 4 --threads 8 -b 0.0.0.0:8000 api:app
+"""
+
+import argparse
+import gc
+import os
+import signal
+import sys
+from typing import Dict
+
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """No per-request access log line (it costs more than a cached response)."""
+
+    def log_request(self, *args, **kwargs) -> None:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes (default 1); more than one makes the API read-only")
+    parser.add_argument("--access-log", action="store_true", help="Log every request")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    if args.workers > 1:
+        os.environ["LEAK_READ_ONLY"] = "1"
+    import api
+
+    handler = WSGIRequestHandler if args.access_log else QuietRequestHandler
+    server = make_server(args.host, args.port, api.app, threaded=True, request_handler=handler)
+    print(f"[INFO] Serving on http://{args.host}:{args.port} with {args.workers} worker(s)")
+    if args.workers == 1:
+        api.start_background()
+        server.serve_forever()
+        return
+
+    # Objects created while loading live as long as the process; moving them
+    # out of the collector's reach keeps GC passes from touching (and so
+    # copying) their pages in every worker.
+    gc.freeze()
+    workers: Dict[int, int] = {}
+    stopping = False
+
+    def spawn(slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        workers[pid] = slot
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for slot in range(args.workers):
+        spawn(slot)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        slot = workers.pop(pid, None)
+        if slot is not None and not stopping:
+            print(f"[WARN] Worker {pid} exited (status {status}); restarting", file=sys.stderr)
+            spawn(slot)
+
+
+if __name__ == "__main__":
+    main()
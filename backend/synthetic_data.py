@@ -0,0 +1,207 @@
+"""
+Seeded synthetic leak data at arbitrary volume.
+
+Produces dark-web style leak entries (the sample_data.json shape) and
+labelled training rows (the models/training_data.csv shape) for
+benchmarks. The same arguments always give the same rows.
+
+    python synthetic_data.py entries 1000000 entries.json --dup-rate 0.2 --words 40 --sources 500
+    python synthetic_data.py training 100000 training.csv
+"""
+
+import argparse
+import os
+import random
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List
+
+import leak_io
+
+ENTRY_FIELDS = ["id", "source", "description", "content", "leaked_date", "severity"]
+TRAINING_FIELDS = ["id", "email", "username", "password", "source", "label"]
+
+SOURCE_KINDS = [
+    "dark_web_forum", "paste_site", "onion_marketplace", "telegram_channel",
+    "irc_channel", "breach_forum", "carding_shop", "hacker_blog",
+]
+
+SEVERITIES = ["critical", "high", "moderate", "low"]
+SEVERITY_WEIGHTS = [15, 30, 35, 20]
+
+DESCRIPTIONS = [
+    "User credentials dump", "Payment info leak", "API token leak",
+    "Corporate credentials breach", "Financial data dump", "Database backup exposed",
+    "Customer records for sale", "Employee directory leak", "VPN config dump",
+    "Forum chatter", "Marketing list repost", "Scraped public profiles",
+]
+
+# Phrases the rule engine and the model react to, and neutral filler.
+LEAK_PHRASES = [
+    "passwords", "password hashes", "credit card numbers", "cc with cvv", "visa", "mastercard",
+    "ssn", "social security numbers", "api keys", "access tokens", "mysql dump", "postgres backup",
+    "mongodb export", "database", "login credentials", "auth cookies",
+]
+FILLER = (
+    "the and for with from this that user users records list full fresh verified dump "
+    "thread reply mirror archive posted selling price btc escrow sample proof update "
+    "accounts data table rows export company employees customers internal leaked batch"
+).split()
+EMAIL_DOMAINS = ["company.com", "corp.local", "gmail.com", "yahoo.com", "outlook.com", "hotmail.com"]
+
+LEAK_SOURCES = [
+    "db_backup_leak", "vpn_config_dump", "dark_forum_dump", "credential_dump_forum",
+    "breached_db_dump", "employee_leak_paste", "keys_dump",
+]
+BENIGN_SOURCES = [
+    "web_signup", "public_forum", "survey_signup", "promo_email_list",
+    "newsletter_optin", "marketing_campaign",
+]
+
+DATE_START = date(2023, 1, 1)
+DATE_DAYS = 3 * 365
+
+# Most recent originals a repost can copy, so memory stays flat at any n.
+REPOST_WINDOW = 10_000
+
+
+def _source_names(kinds: List[str], cardinality: int) -> List[str]:
+    """cardinality names cycling through kinds (kind_001, kind_002, ...)."""
+    if cardinality <= len(kinds):
+        return kinds[:max(1, cardinality)]
+    return [f"{kinds[i % len(kinds)]}_{i // len(kinds) + 1:03d}" for i in range(cardinality)]
+
+
+def generate_entries(n: int, seed: int = 0, dup_rate: float = 0.0, text_words: int = 12,
+                     sources: int = 50) -> Iterator[Dict[str, Any]]:
+    """
+    Yield n synthetic leak entries.
+
+    Args:
+        n: Number of entries
+        seed: Random seed; equal arguments give equal output
+        dup_rate: Fraction of entries that repost one of the last
+            REPOST_WINDOW originals (same text under a new id), as
+            mirrored pastes do
+        text_words: Approximate number of words in each content field
+        sources: Number of distinct source names
+    """
+    if not 0.0 <= dup_rate < 1.0:
+        raise ValueError(f"dup_rate must be in [0, 1), got {dup_rate}")
+    rng = random.Random(seed)
+    names = _source_names(SOURCE_KINDS, sources)
+    # Ring of recent originals for reposts (only filled when there are any).
+    recent: List[Dict[str, Any]] = []
+    originals = 0
+
+    for i in range(n):
+        if recent and rng.random() < dup_rate:
+            entry = dict(rng.choice(recent), id=f"syn_{i:08d}")
+        else:
+            entry = {
+                "id": f"syn_{i:08d}",
+                "source": rng.choice(names),
+                "description": rng.choice(DESCRIPTIONS),
+                "content": _content(rng, text_words),
+                "leaked_date": (DATE_START + timedelta(days=rng.randrange(DATE_DAYS))).isoformat(),
+                "severity": rng.choices(SEVERITIES, SEVERITY_WEIGHTS)[0],
+            }
+            if dup_rate:
+                if len(recent) < REPOST_WINDOW:
+                    recent.append(entry)
+                else:
+                    recent[originals % REPOST_WINDOW] = entry
+            originals += 1
+        yield entry
+
+
+def _content(rng: random.Random, words: int) -> str:
+    parts = []
+    leaky = rng.random() < 0.6
+    while len(parts) < words:
+        roll = rng.random()
+        if leaky and roll < 0.15:
+            parts.append(rng.choice(LEAK_PHRASES))
+        elif leaky and roll < 0.2:
+            parts.append(f"{rng.choice(FILLER)}{rng.randrange(1000)}@{rng.choice(EMAIL_DOMAINS)}")
+        else:
+            parts.append(rng.choice(FILLER))
+    return " ".join(parts)
+
+
+def generate_training_rows(n: int, seed: int = 0, leak_rate: float = 0.4,
+                           sources: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Yield n labelled training rows (label 1 = leaked credentials).
+
+    Args:
+        n: Number of rows
+        seed: Random seed
+        leak_rate: Fraction of rows labelled 1
+        sources: Distinct source names per class (0: the names in
+            models/training_data.csv)
+    """
+    rng = random.Random(seed)
+    leak_sources = _source_names(LEAK_SOURCES, sources or len(LEAK_SOURCES))
+    benign_sources = _source_names(BENIGN_SOURCES, sources or len(BENIGN_SOURCES))
+
+    for i in range(1, n + 1):
+        if rng.random() < leak_rate:
+            yield {
+                "id": i,
+                "email": f"user{i}@{rng.choice(['corp.local', 'company.com'])}",
+                "username": f"int_user_{i}",
+                "password": f"Pass{i % 1000:03d}!",
+                "source": rng.choice(leak_sources),
+                "label": 1,
+            }
+        else:
+            yield {
+                "id": i,
+                "email": f"user{i}@{rng.choice(EMAIL_DOMAINS[2:])}",
+                "username": f"user_{i}",
+                "password": rng.choice(["-", f"User{i % 1000:03d}!"]),
+                "source": rng.choice(benign_sources),
+                "label": 0,
+            }
+
+
+def write_rows(filepath: str, rows: Iterator[Dict[str, Any]], fieldnames: List[str]) -> None:
+    """Write rows as CSV, JSON or NDJSON (by extension, .gz compresses)."""
+    compress = filepath.endswith(".gz")
+    ext = os.path.splitext(filepath[:-3] if compress else filepath)[1].lower().lstrip(".")
+    if ext not in leak_io.EXPORT_FORMATS:
+        raise ValueError(f"Unsupported file extension: {filepath}")
+    chunks = leak_io.iter_export_chunks(rows, ext, fieldnames=fieldnames if ext == "csv" else None)
+    leak_io.write_chunks(filepath, chunks, compress)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="kind", required=True)
+
+    entries = sub.add_parser("entries", help=generate_entries.__doc__.strip().splitlines()[0])
+    entries.add_argument("--dup-rate", type=float, default=0.0)
+    entries.add_argument("--words", type=int, default=12)
+    entries.add_argument("--sources", type=int, default=50)
+
+    training = sub.add_parser("training", help=generate_training_rows.__doc__.strip().splitlines()[0])
+    training.add_argument("--leak-rate", type=float, default=0.4)
+    training.add_argument("--sources", type=int, default=0)
+
+    for p in (entries, training):
+        p.add_argument("rows", type=int)
+        p.add_argument("output", help="File to write (.csv, .json or .ndjson, optionally .gz)")
+        p.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args()
+    if args.kind == "entries":
+        rows = generate_entries(args.rows, args.seed, args.dup_rate, args.words, args.sources)
+        write_rows(args.output, rows, ENTRY_FIELDS)
+    else:
+        rows = generate_training_rows(args.rows, args.seed, args.leak_rate, args.sources)
+        write_rows(args.output, rows, TRAINING_FIELDS)
+    print(f"[INFO] Wrote {args.rows} {args.kind} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
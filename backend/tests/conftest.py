@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pytest
+
+# The backend modules import each other as top-level modules.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def texts():
+    """Training texts of the toy models: two leaks, then two benign ones."""
+    return ["admin password dump", "api key leaked on paste", "weekly team lunch menu", "holiday schedule"]
+
+
+@pytest.fixture
+def train_pipeline(texts):
+    """Fit a TF-IDF + logistic regression pipeline on texts with the given labels."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+
+    def train(labels):
+        pipeline = Pipeline([("tfidf", TfidfVectorizer()), ("clf", LogisticRegression())])
+        return pipeline.fit(texts, labels)
+
+    return train
+
+
+@pytest.fixture(scope="session")
+def api(tmp_path_factory):
+    """The API module, imported with its score and job DBs in a scratch directory."""
+    scratch = tmp_path_factory.mktemp("api")
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with pytest.MonkeyPatch.context() as patch:
+        # The model paths are relative to backend/.
+        patch.chdir(backend)
+        for name in ("LEAK_READ_ONLY", "LEAK_CASCADE", "LEAK_SCORE_CACHE", "LEAK_MODEL_WATCH", "LEAK_DEDUP_SCORING"):
+            patch.delenv(name, raising=False)
+        patch.setenv("LEAK_DATA_PATH", os.path.join(backend, "sample_data.json"))
+        patch.setenv("LEAK_SCORE_DB", str(scratch / "scan_results.db"))
+        patch.setenv("LEAK_JOBS_DB", str(scratch / "scan_jobs.db"))
+        patch.setenv("LEAK_DATASETS_DIR", str(scratch / "datasets"))
+        patch.setenv("LEAK_SCAN_ROOT", str(scratch))
+        import api
+    return api
+
+
+@pytest.fixture
+def client(api):
+    return api.app.test_client()
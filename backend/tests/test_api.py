@@ -0,0 +1,73 @@
+import pytest
+
+from leak_results import day_number
+
+
+def _leaks(n, tag):
+    return [{"id": f"{tag}-{i}", "source": "api-test.example", "severity": "high",
+             "content": f"api key and password for service {tag} {i}", "leaked_date": f"2024-3-{i + 1}"}
+            for i in range(n)]
+
+
+def _pages(client, url, ingest_after_first=None):
+    """Rows of every page of url, following X-Next-Cursor."""
+    rows, cursor = [], None
+    while True:
+        response = client.get(url if cursor is None else f"{url}&cursor={cursor}")
+        assert response.status_code == 200, response.get_json()
+        rows += response.get_json()
+        if ingest_after_first is not None:
+            assert client.post("/api/leaks", json=ingest_after_first).status_code == 201
+            ingest_after_first = None
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return rows
+
+
+def test_cursor_paging_across_an_ingest(client):
+    new = _leaks(3, "cursor-asc")
+    rows = _pages(client, "/api/leaks?limit=2", ingest_after_first=new)
+    # Ascending pages reach the rows ingested meanwhile, each row once.
+    assert rows == client.get("/api/leaks").get_json()
+    assert [r["id"] for r in rows[-3:]] == [e["id"] for e in new]
+
+    newest = client.get("/api/leaks?sort=-id").get_json()
+    rows = _pages(client, "/api/leaks?sort=-id&limit=2", ingest_after_first=_leaks(2, "cursor-desc"))
+    # Descending pages go on past the first page, never back to newer rows.
+    assert rows == newest
+    assert client.get("/api/leaks?cursor=999999").status_code == 400
+
+
+def test_fields_and_exclude_project_the_rows(client, api):
+    client.post("/api/leaks", json=_leaks(2, "projection"))
+    full = client.get("/api/leaks?sort=-id&limit=2").get_json()
+
+    rows = client.get("/api/leaks?sort=-id&limit=2&fields=id,risk_score").get_json()
+    assert rows == [{"id": r["id"], "risk_score": r["risk_score"]} for r in full]
+    rows = client.get("/api/leaks?sort=-id&limit=2&exclude=content,description").get_json()
+    assert rows == [{k: v for k, v in r.items() if k not in ("content", "description")} for r in full]
+    assert set(rows[0]) == set(api.COLUMNS) - {"content", "description"}
+
+    rows = client.get("/api/leaks?sort=-id&limit=2&fields=id&dedup=1").get_json()
+    assert set(rows[0]) == {"id", "cluster_id", "cluster_size"}
+    for query in ("fields=id&exclude=content", "fields=nope", "exclude=id,nope"):
+        assert client.get(f"/api/leaks?{query}").status_code == 400
+
+
+@pytest.mark.parametrize("query, counted", [
+    ("limit=1", lambda r: True),
+    ("limit=1&severity=high", lambda r: r["severity"] == "high"),
+    ("limit=1&date_from=2024-03-02&date_to=2024-3-3",
+     lambda r: day_number("2024-03-02") <= day_number(r["leaked_date"]) <= day_number("2024-03-03")),
+])
+def test_total_count_header(client, query, counted):
+    client.post("/api/leaks", json=_leaks(4, "total"))
+    everything = client.get("/api/leaks").get_json()
+    response = client.get(f"/api/leaks?{query}")
+    assert int(response.headers["X-Total-Count"]) == sum(map(counted, everything))
+    assert len(response.get_json()) == 1
+
+
+def test_total_count_is_omitted_when_it_needs_a_scan(client):
+    response = client.get("/api/leaks?limit=1&severity=high&source=api-test.example")
+    assert response.status_code == 200 and "X-Total-Count" not in response.headers
@@ -0,0 +1,29 @@
+import joblib
+import numpy as np
+import pytest
+
+from compiled_model import CompiledLeakModel, compiled_model_path, export_compiled_model, file_digest
+
+
+@pytest.fixture
+def model_files(tmp_path, train_pipeline):
+    pkl, compiled = str(tmp_path / "model.pkl"), str(tmp_path / "compiled")
+    pipeline = train_pipeline([1, 1, 0, 0])
+    joblib.dump(pipeline, pkl)
+    export_compiled_model(pipeline, compiled, file_digest(pkl))
+    return pkl, compiled
+
+
+def test_export_scores_like_the_pipeline(model_files, texts):
+    pkl, compiled = model_files
+    expected = joblib.load(pkl).predict_proba(texts)
+    np.testing.assert_allclose(CompiledLeakModel(compiled).predict_proba(texts), expected, rtol=1e-12)
+
+
+def test_stale_export_is_not_used(model_files, train_pipeline):
+    pkl, compiled = model_files
+    assert compiled_model_path(pkl, compiled) == compiled
+
+    joblib.dump(train_pipeline([0, 1, 1, 0]), pkl)
+    assert compiled_model_path(pkl, compiled) == pkl
+    assert compiled_model_path(pkl, compiled + "-missing") == pkl
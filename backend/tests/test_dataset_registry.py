@@ -0,0 +1,60 @@
+import json
+
+import joblib
+import pytest
+
+from dataset_registry import DatasetRegistry
+from leak_detector_ml import LeakDetectorML
+
+
+@pytest.fixture
+def registry(tmp_path, train_pipeline):
+    pkl = str(tmp_path / "model.pkl")
+    joblib.dump(train_pipeline([1, 1, 0, 0]), pkl)
+    detector = LeakDetectorML(model_path=pkl, cache_size=0)
+    for name in ("a", "b"):
+        entries = [{"id": f"{name}{i}", "source": name, "content": "admin password dump"} for i in range(3)]
+        (tmp_path / f"{name}.json").write_text(json.dumps(entries), encoding="utf-8")
+    # A budget of one byte keeps only the most recently used dataset.
+    registry = DatasetRegistry(str(tmp_path), lambda: detector, memory_budget=1)
+    yield registry
+    registry.close()
+
+
+def test_score_db_is_kept_across_reloads(registry):
+    first = registry.get("a")
+    registry.get("b")
+    assert registry.stats()["evictions"] == 1
+    again = registry.get("a")
+    assert again is not first and again.score_db is first.score_db
+
+
+def test_rows_written_while_evicted_are_in_the_next_load(registry):
+    detector = registry.detector()
+    with registry.writing("a") as dataset:
+        registry.get("b")  # evicts a
+        results = detector.scan_batch([{"id": "late", "source": "a", "content": "api key"}])
+        dataset.store.add_results(results)
+        dataset.score_db.save(results, detector.score_version)
+
+    reloaded = registry.get("a")
+    assert reloaded is not dataset
+    assert [r["id"] for r in reloaded.store.get_rows(range(len(reloaded.store)))] == ["a0", "a1", "a2", "late"]
+    assert reloaded.store.version > dataset.store.version
+
+
+def test_read_only_loads_never_write_the_score_db(registry, tmp_path):
+    registry.get("a")
+    saved = (tmp_path / "a.db").read_bytes()
+    entries = json.loads((tmp_path / "a.json").read_text(encoding="utf-8"))
+    entries.append({"id": "a3", "source": "a", "content": "credit card numbers"})
+    (tmp_path / "a.json").write_text(json.dumps(entries), encoding="utf-8")
+
+    read_only = DatasetRegistry(str(tmp_path), registry.detector, read_only=True)
+    dataset = read_only.get("a")
+    assert [r["id"] for r in dataset.store.get_rows(range(len(dataset.store)))] == ["a0", "a1", "a2", "a3"]
+    assert dataset.score_db is None
+    assert len(read_only.get("b").store) == 3
+    read_only.close()
+    assert (tmp_path / "a.db").read_bytes() == saved
+    assert not (tmp_path / "b.db").exists()
@@ -0,0 +1,36 @@
+import gzip
+
+LEAK = {"source": "paste.example", "content": "admin password dump for the vpn", "leaked_date": "2024-02-01"}
+
+
+def test_repeated_get_with_the_etag_is_not_modified(client):
+    first = client.get("/api/summary")
+    assert first.status_code == 200 and first.headers["ETag"]
+
+    again = client.get("/api/summary", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304 and again.data == b""
+    assert again.headers["ETag"] == first.headers["ETag"]
+    assert client.get("/api/summary", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_ingest_changes_the_etag(client):
+    before = client.get("/api/leaks?sort=-id&limit=5")
+    assert client.post("/api/leaks", json=[LEAK]).status_code == 201
+
+    after = client.get("/api/leaks?sort=-id&limit=5", headers={"If-None-Match": before.headers["ETag"]})
+    assert after.status_code == 200 and after.headers["ETag"] != before.headers["ETag"]
+    assert after.get_json()[0]["source"] == LEAK["source"]
+
+
+def test_gzip_bodies_are_byte_stable(client):
+    client.post("/api/leaks", json=[dict(LEAK, content=f"{LEAK['content']} {i}") for i in range(20)])
+    identity = client.get("/api/leaks")
+    first = client.get("/api/leaks", headers={"Accept-Encoding": "gzip"})
+    second = client.get("/api/leaks", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["Content-Encoding"] == "gzip" and "Content-Encoding" not in identity.headers
+    assert first.data == second.data and gzip.decompress(first.data) == identity.data
+    assert first.headers["ETag"] == second.headers["ETag"] != identity.headers["ETag"]
+
+    # Revalidating the gzip representation is a 304 as well.
+    revalidated = client.get("/api/leaks", headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["ETag"]})
+    assert revalidated.status_code == 304
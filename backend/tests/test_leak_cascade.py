@@ -0,0 +1,64 @@
+import joblib
+import pytest
+
+from leak_cascade import DetectionCascade
+from leak_detector_ml import LeakDetectorML
+
+CLEAN = {"id": "clean", "content": "weekly team lunch menu"}
+WEAK = {"id": "weak", "content": "forum password thread"}  # password: 30
+STRONG = {"id": "strong", "content": "password dump with credit card numbers and ssn"}  # capped at 100
+
+
+class _Predict:
+    """Stand-in model recording the entries it is asked to score."""
+
+    def __init__(self):
+        self.seen = []
+
+    def __call__(self, entries):
+        self.seen.extend(e["id"] for e in entries)
+        return [0.5] * len(entries)
+
+
+def test_clear_and_leak_entries_skip_the_model():
+    cascade = DetectionCascade()
+    predict = _Predict()
+    assert cascade.score([CLEAN, WEAK, STRONG, WEAK], predict) == [0.0, 0.5, 1.0, 0.5]
+    assert predict.seen == ["weak", "weak"]
+
+    stats = cascade.stats()
+    assert stats["entries"] == 4
+    assert stats["resolved"] == {"clear": 1, "leak": 1, "ml": 2}
+    assert stats["fractions"] == {"clear": 0.25, "leak": 0.25, "ml": 0.5}
+
+
+def test_thresholds_bound_the_model_range():
+    cascade = DetectionCascade(clear_below=31, leak_from=31)
+    predict = _Predict()
+    assert cascade.score([CLEAN, WEAK, STRONG], predict) == [0.0, 0.3, 1.0]
+    assert predict.seen == [] and cascade.stats()["resolved"] == {"clear": 2, "leak": 1, "ml": 0}
+
+    with pytest.raises(ValueError):
+        DetectionCascade(clear_below=50, leak_from=40)
+
+
+def test_keywords_only_clears_entries_without_a_keyword():
+    cascade = DetectionCascade(keywords_only=True)
+    predict = _Predict()
+    assert cascade.score([CLEAN, WEAK, STRONG], predict) == [0.0, 0.5, 0.5]
+    assert predict.seen == ["weak", "strong"]
+    assert cascade.stats()["resolved"] == {"clear": 1, "leak": 0, "ml": 2}
+
+
+def test_detector_tags_cascade_scores_with_their_own_version(tmp_path, train_pipeline):
+    pkl = str(tmp_path / "model.pkl")
+    joblib.dump(train_pipeline([1, 1, 0, 0]), pkl)
+    plain = LeakDetectorML(model_path=pkl, cache_size=0)
+    cascaded = LeakDetectorML(model_path=pkl, cache_size=0, cascade=DetectionCascade())
+    assert cascaded.score_version != plain.score_version
+
+    entries = [CLEAN, WEAK, STRONG]
+    probas = cascaded.scan_batch(entries).column("leak_probability").tolist()
+    assert probas[0] == 0.0 and probas[2] == 1.0
+    assert probas[1] == pytest.approx(plain.scan_batch([WEAK]).column("leak_probability")[0])
+    assert cascaded.cascade.stats()["resolved"] == {"clear": 1, "leak": 1, "ml": 1}
@@ -0,0 +1,54 @@
+import re
+
+from leak_detector import LeakDetector, PatternMatcher
+from synthetic_data import generate_entries
+
+TRICKY = [
+    "PASSWORDS and a passwd, pwds", "p@ssword pass word", "credit   card / creditcard / CCs / ccc",
+    "Social Security numbers and SSN's", "api-key api_keys apikey access tokens accesstoken",
+    "mysqls dbs db-backup postgresql mongodb", "login: auth; credential", "x@y.io bob@company.com",
+    "root@Company.COM.evil.org", "", "amex|visa|mastercards",
+]
+
+
+def _baseline(patterns, text):
+    return [name for name, pattern in patterns.items() if re.search(pattern, text, re.IGNORECASE)]
+
+
+def test_scan_entry_agrees_with_a_search_per_pattern():
+    detector = LeakDetector(cache_size=0)
+    patterns = {name: info["pattern"] for name, info in detector.RISK_PATTERNS.items()}
+    corpus = list(generate_entries(300, seed=5, text_words=20)) + [{"content": t} for t in TRICKY]
+    for entry in corpus:
+        expected = _baseline(patterns, detector._entry_text(entry))
+        result = detector.scan_entry(entry)
+        assert result["detected_patterns"] == expected, entry
+        weights = sum(detector.RISK_PATTERNS[name]["weight"] for name in expected)
+        assert result["risk_score"] == min(weights, 100)
+
+
+def test_patterns_without_keywords_are_always_evaluated():
+    patterns = {"ssn_number": r"\b\d{3}-\d{2}-\d{4}\b", "pin": r"\bpin\s*[:=]\s*\d{4}\b",
+                "hash": r"[a-f0-9]{32}"}
+    matcher = PatternMatcher(patterns)
+    for text in ["ssn 123-45-6789", "pin: 1234 and pin=12", "d41d8cd98f00b204e9800998ecf8427e", "nothing"]:
+        assert matcher.match(text) == _baseline(patterns, text)
+
+
+def test_add_and_remove_pattern_rebuild_the_matcher():
+    detector = LeakDetector()
+    entry = {"content": "btc wallet seed phrase for sale"}
+    before = detector._get_matcher()
+    assert detector.scan_entry(entry)["detected_patterns"] == []
+
+    detector.add_pattern("crypto", r"\b(seed\s*phrase|wallet)\b", 60)
+    matcher = detector._get_matcher()
+    assert matcher is not before and "crypto" in matcher.names
+    result = detector.scan_entry(entry)  # not the cached pre-change score
+    assert result["detected_patterns"] == ["crypto"] and result["risk_score"] == 60
+
+    detector.remove_pattern("crypto")
+    assert "crypto" not in detector._get_matcher().names
+    assert detector.scan_entry(entry)["detected_patterns"] == []
+    # Patterns are per instance.
+    assert "crypto" not in LeakDetector.RISK_PATTERNS
@@ -0,0 +1,49 @@
+import joblib
+import pytest
+
+import leak_detector_ml
+from leak_detector_ml import LeakDetectorML
+
+
+@pytest.fixture
+def detector(tmp_path, train_pipeline):
+    pkl = str(tmp_path / "model.pkl")
+    joblib.dump(train_pipeline([1, 1, 0, 0]), pkl)
+    detector = LeakDetectorML(model_path=pkl)
+    detector.leaks = [{"source": "paste", "content": f"admin password dump {i % 7}"} for i in range(40)]
+    return detector
+
+
+def test_parallel_scan_goes_through_the_score_cache(detector, monkeypatch):
+    monkeypatch.setattr(leak_detector_ml, "PARALLEL_THRESHOLD", 0)
+    parallel = detector.scan_all(batch_size=8, workers=2)
+    assert len(detector.cache) == 7
+
+    serial = LeakDetectorML(model_path=detector.model_path, cache_size=0)
+    serial.leaks = detector.leaks
+    assert list(parallel) == [dict(r, timestamp=p["timestamp"])
+                              for r, p in zip(serial.scan_all(batch_size=8), parallel)]
+
+    hits = detector.cache.stats()["hits"]
+    detector.scan_all(batch_size=8, workers=2)
+    assert detector.cache.stats()["hits"] == hits + 40
+
+
+@pytest.mark.parametrize("batch_size", [0, -1])
+def test_batch_size_must_be_positive(detector, batch_size):
+    with pytest.raises(ValueError, match="batch_size"):
+        detector.scan_all(batch_size=batch_size)
+    with pytest.raises(ValueError, match="batch_size"):
+        next(detector.scan_stream(detector.leaks, batch_size=batch_size))
+
+
+def test_streaming_update_refuses_a_tfidf_model(detector, tmp_path):
+    data = tmp_path / "train.csv"
+    data.write_text("content,label\n" + "".join(f"admin password {i},{i % 2}\n" for i in range(20)))
+    before = open(detector.model_path, "rb").read()
+    with pytest.raises(ValueError, match="update=False"):
+        detector.train_model_streaming(str(data))
+    assert open(detector.model_path, "rb").read() == before
+
+    assert detector.train_model_streaming(str(data), update=False) == 20
+    assert detector.train_model_streaming(str(data)) == 20
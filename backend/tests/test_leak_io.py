@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from leak_io import iter_json
+
+DOCUMENTS = [
+    '[{"id": 1, "source": "a"}, {"id": 2, "tags": ["x", "y"]}]',
+    '[-25000000000.5, 1e-7, 3.25E+2, 0, -1, true, false, null, "a\\\\\\"b"]',
+    '  \n [ 1 ,\t2 ] ',
+    '[]',
+    '-25000000000.5',
+    '{"id": "single"}',
+]
+
+
+def _write(tmp_path, text):
+    path = tmp_path / "leaks.json"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("text", DOCUMENTS)
+def test_every_chunk_boundary_parses_like_load_json(tmp_path, text):
+    path = _write(tmp_path, text)
+    expected = json.loads(text)
+    if not isinstance(expected, list):
+        expected = [expected]
+    for chunk_size in range(1, len(text) + 2):
+        assert list(iter_json(path, chunk_size=chunk_size)) == expected, chunk_size
+
+
+@pytest.mark.parametrize("text", ['[1, 2,]', '[1,,2]', '[,1]', '[1 2]', '[1, 2', '[1.5.]'])
+def test_malformed_arrays_are_rejected(tmp_path, text):
+    path = _write(tmp_path, text)
+    for chunk_size in (1, 3, 64):
+        with pytest.raises(ValueError):
+            list(iter_json(path, chunk_size=chunk_size))
+
+
+def test_empty_file_fails_like_load_json(tmp_path):
+    path = _write(tmp_path, "  \n")
+    with pytest.raises(json.JSONDecodeError) as expected:
+        with open(path, encoding="utf-8") as f:
+            json.load(f)
+    for chunk_size in (1, 64):
+        with pytest.raises(json.JSONDecodeError) as error:
+            list(iter_json(path, chunk_size=chunk_size))
+        assert error.value.msg == expected.value.msg
@@ -0,0 +1,102 @@
+import pytest
+
+from leak_clusters import cluster_text
+from leak_results import ScanResults
+from leak_store import LeakStore
+
+LEAK = {"id": "l{}", "source": "pastebin.com", "content": "admin password hunter2 for the staging database {}"}
+
+
+def _results(entries, probability=0.9):
+    results = ScanResults()
+    results.append_batch(entries, [probability] * len(entries), "2024-01-01T00:00:00")
+    return results
+
+
+def _leak(i):
+    return {k: v.format(i) for k, v in LEAK.items()}
+
+
+def test_entry_without_text_gets_its_own_cluster():
+    store = LeakStore()
+    bare = {"id": "a1", "source": "x"}
+    assert cluster_text(bare) == ""
+    # Between two near-duplicates, so a shingle reaching past the empty
+    # text would change the signature of the one after it.
+    store.add_results(_results([_leak(1), bare, _leak(1)]))
+    store.add_results(_results([bare]))
+
+    index = store._clusters
+    assert index.cluster_of[0] == index.cluster_of[2]
+    assert len({index.cluster_of[1], index.cluster_of[3], index.cluster_of[0]}) == 3
+    assert store.duplicate_scores([bare, _leak(1)]) == [None, pytest.approx(0.9)]
+
+
+def test_failed_ingest_leaves_the_store_unchanged(monkeypatch):
+    store = LeakStore()
+    store.add_results(_results([_leak(i) for i in range(3)]))
+    version, summary, clusters = store.version, store.summary(), store.cluster_count()
+
+    import leak_store
+
+    def broken(entry):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(leak_store, "cluster_text", broken)
+    with pytest.raises(RuntimeError):
+        store.add_results(_results([_leak(7), {"id": "new", "source": "elsewhere.org", "extra": 1}]))
+    monkeypatch.undo()
+
+    assert len(store) == 3 and store.version == version
+    assert store.summary() == summary and store.cluster_count() == clusters
+    assert store.results.categories("source") == ["pastebin.com"]
+
+    store.add_results(_results([{"id": "new", "source": "elsewhere.org"}]))
+    assert [r["id"] for r in store.get_rows(range(len(store)))] == ["l0", "l1", "l2", "new"]
+    assert store.query(filters={"source": ["elsewhere.org"]})[2] == 1
+
+
+def test_aggregates_follow_each_batch():
+    entries = [{"id": None if i % 5 == 0 else str(i), "source": ["a.com", "b.org", None][i % 3],
+                "severity": ["high", "low"][i % 2], "leaked_date": f"2024-01-{i % 28 + 1:02d}"}
+               for i in range(60)]
+    whole, batched = LeakStore(clusters=False), LeakStore(clusters=False)
+    whole.add_results(_results(entries, 0.75))
+    for start in range(0, 60, 7):
+        batched.add_results(_results(entries[start:start + 7], 0.75))
+        assert batched.summary()["total_leaks"] == min(start + 7, 60)
+
+    assert batched.summary() == whole.summary()
+    assert batched.domains() == whole.domains() == [
+        {"source": "a.com", "avg_risk_score": 75.0, "total_leaks": 16, "last_seen": "2024-01-28"},
+        {"source": "b.org", "avg_risk_score": 75.0, "total_leaks": 16, "last_seen": "2024-01-28"},
+    ]
+
+
+def test_non_string_dates_are_indexed_as_undated():
+    store = LeakStore(clusters=False)
+    store.add_results(_results([{"id": "a", "leaked_date": "2024-01-03"},
+                                {"id": "b", "leaked_date": 20240103},
+                                {"id": "c", "leaked_date": "2024-01-01"}]))
+    ids = lambda rows: [r["id"] for r in rows]
+    assert ids(store.query(sort="leaked_date")[0]) == ["c", "a", "b"]
+    assert ids(store.query(sort="leaked_date", descending=True)[0]) == ["a", "c", "b"]
+    rows, _, total = store.query(date_from="2024-01-02")
+    assert ids(rows) == ["a"] and total == 1
+
+
+def test_mixed_date_formats_filter_and_sort_by_day():
+    store = LeakStore(clusters=False)
+    store.add_results(_results([{"id": "a", "leaked_date": "2024-01-10"},
+                                {"id": "b", "leaked_date": "2024-1-5"},
+                                {"id": "c", "leaked_date": "2024-01-05T10:00"},
+                                {"id": "d", "leaked_date": "2024-1-9 23:59:59"},
+                                {"id": "e", "leaked_date": "not a date"}]))
+    ids = lambda rows: [r["id"] for r in rows]
+    # Times are dropped, so b and c tie on the day; undated rows come last.
+    assert ids(store.query(sort="leaked_date")[0]) == ["b", "c", "d", "a", "e"]
+    assert ids(store.query(sort="leaked_date", descending=True)[0]) == ["a", "d", "c", "b", "e"]
+    rows, _, total = store.query(date_from="2024-1-5", date_to="2024-01-09")
+    assert ids(rows) == ["b", "c", "d"] and total == 3
+    rows, _, total = store.query(date_from="2024-01-06T00:00", sort="leaked_date")
+    assert ids(rows) == ["d", "a"] and total == 2
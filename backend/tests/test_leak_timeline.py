@@ -0,0 +1,33 @@
+import numpy as np
+
+from leak_results import NO_DATE, ScanResults, day_number, leaked_day
+from leak_store import LeakStore
+from leak_timeline import _Counts
+
+
+def _store(dates):
+    results = ScanResults()
+    entries = [{"id": str(i), "source": f"source{i}", "leaked_date": d} for i, d in enumerate(dates)]
+    results.append_batch(entries, [0.5] * len(entries), "2024-01-01T00:00:00")
+    store = LeakStore(clusters=False)
+    store.add_results(results)
+    return store
+
+
+def test_extreme_dates_are_undated():
+    assert leaked_day("0001-01-01") == leaked_day("9999-12-31") == NO_DATE
+    store = _store(["0001-01-01", "2024-03-05", "9999-12-31"])
+    timeline = store.timeline("month", date_from="0001-01-01", date_to="9999-12-31")
+    assert timeline["undated"] == 2
+    assert [(b["start"], b["total"]) for b in timeline["buckets"]] == [("2024-03-01", 1)]
+
+
+def test_counts_hold_only_the_buckets_present():
+    counts = _Counts()
+    lo, hi = day_number("0001-01-01"), day_number("9999-12-31")
+    counts.add(np.array([lo, hi, hi]), np.array([1, 2, 300]))
+    assert len(counts.pairs) == 3
+    keys = counts.keys(lo, hi)
+    assert keys.tolist() == [lo, hi]
+    assert counts.rows(keys, 301)[:, [1, 2, 300]].tolist() == [[1, 0, 0], [0, 1, 1]]
+    assert counts.total(lo, hi, 301).sum() == 3
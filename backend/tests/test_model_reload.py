@@ -0,0 +1,39 @@
+import threading
+
+import joblib
+
+from compiled_model import compiled_model_path, export_compiled_model, file_digest
+from leak_detector_ml import LeakDetectorML
+from leak_store import LeakStore
+from model_reload import ModelReloader
+
+
+def _reload(reloader, current_version):
+    assert reloader.start(current_version)
+    reloader._thread.join(60)
+    return reloader.status()
+
+
+def test_reload_picks_up_a_new_pickle_over_a_stale_export(tmp_path, texts, train_pipeline):
+    pkl, compiled = str(tmp_path / "model.pkl"), str(tmp_path / "compiled")
+    pipeline = train_pipeline([1, 1, 0, 0])
+    joblib.dump(pipeline, pkl)
+    export_compiled_model(pipeline, compiled, file_digest(pkl))
+
+    def load_detector():
+        return LeakDetectorML(model_path=compiled_model_path(pkl, compiled), cache_size=0)
+
+    detector = load_detector()
+    store = LeakStore(clusters=False)
+    store.add_results(detector.scan_batch([{"id": str(i), "content": t} for i, t in enumerate(texts)]))
+    swapped = []
+    reloader = ModelReloader(store, load_detector, swapped.append, threading.Lock())
+
+    assert _reload(reloader, detector.model_version)["state"] == "unchanged"
+
+    joblib.dump(train_pipeline([0, 0, 1, 1]), pkl)
+    status = _reload(reloader, detector.model_version)
+    assert status["state"] == "done", status
+    assert status["model_path"] == pkl and status["model_version"] == file_digest(pkl)
+    assert swapped[0].model_version == file_digest(pkl)
+    assert store.get_rows([0])[0]["risk_score"] < 50 < store.get_rows([3])[0]["risk_score"]
@@ -0,0 +1,101 @@
+import json
+import time
+
+import pytest
+
+from scan_jobs import FINISHED_STATES, JobDB, ScanJobScheduler
+
+
+def _wait(scheduler, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while scheduler.status(job_id)["state"] not in FINISHED_STATES:
+        assert time.monotonic() < deadline, scheduler.status(job_id)
+        time.sleep(0.01)
+    return scheduler.status(job_id)
+
+
+@pytest.fixture
+def dump(tmp_path):
+    root = tmp_path / "dumps"
+    (root / "sub").mkdir(parents=True)
+    (root / "a.json").write_text(json.dumps([{"id": f"a{i}"} for i in range(5)]), encoding="utf-8")
+    (root / "sub" / "b.csv").write_text("id\n" + "".join(f"b{i}\n" for i in range(3)), encoding="utf-8")
+    (root / "notes.txt").write_text("not a dump", encoding="utf-8")
+    return root
+
+
+@pytest.fixture
+def make_scheduler(tmp_path):
+    schedulers = []
+
+    def make(ingest, **kwargs):
+        scheduler = ScanJobScheduler(ingest, JobDB(str(tmp_path / "jobs.db")), root=str(tmp_path), workers=1,
+                                     **kwargs)
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.stop()
+        scheduler.db.close()
+
+
+def test_job_ingests_every_file_in_batches(make_scheduler, dump):
+    batches = []
+    scheduler = make_scheduler(batches.append, batch_size=2)
+    job = scheduler.submit("dumps")
+    assert job["state"] == "queued" and scheduler.counts()["queued"] == 1
+
+    scheduler.start()
+    status = _wait(scheduler, job["id"])
+    assert status["state"] == "done" and status["entries_done"] == 8
+    # A folder's files before its subfolders; batches run on across files.
+    assert [[e["id"] for e in batch] for batch in batches] == [["a0", "a1"], ["a2", "a3"], ["a4", "b0"], ["b1", "b2"]]
+    assert scheduler.jobs() == [status]
+
+
+def test_higher_priority_job_runs_first(make_scheduler, dump):
+    seen = []
+    scheduler = make_scheduler(lambda entries: seen.extend(e["id"] for e in entries), batch_size=2)
+    low = scheduler.submit("dumps/a.json", priority="low")
+    high = scheduler.submit("dumps/sub/b.csv", priority="high")
+    scheduler.start()
+    _wait(scheduler, low["id"])
+    assert _wait(scheduler, high["id"])["state"] == "done"
+    assert seen == ["b0", "b1", "b2", "a0", "a1", "a2", "a3", "a4"]
+
+
+def test_bad_submissions_and_failures(make_scheduler, dump):
+    def ingest(entries):
+        raise RuntimeError("disk full")
+
+    scheduler = make_scheduler(ingest)
+    for path in ("../elsewhere", "dumps/notes.txt", "dumps/missing.json"):
+        with pytest.raises(ValueError):
+            scheduler.submit(path)
+    with pytest.raises(ValueError):
+        scheduler.submit("dumps", priority="urgent")
+
+    cancelled = scheduler.submit("dumps/a.json")
+    assert scheduler.cancel(cancelled["id"])
+    assert not scheduler.cancel(cancelled["id"])
+    failed = scheduler.submit("dumps/a.json")
+    scheduler.start()
+    status = _wait(scheduler, failed["id"])
+    assert status["state"] == "failed" and "disk full" in status["error"]
+    assert scheduler.status(cancelled["id"])["state"] == "cancelled"
+    with pytest.raises(KeyError):
+        scheduler.status(99)
+
+
+def test_unfinished_jobs_resume_from_the_database(make_scheduler, dump):
+    first = make_scheduler(lambda entries: None)
+    job = first.submit("dumps")
+    first.db.close()
+
+    seen = []
+    second = make_scheduler(lambda entries: seen.extend(e["id"] for e in entries))
+    assert second.status(job["id"])["state"] == "queued"
+    second.start()
+    assert _wait(second, job["id"])["entries_done"] == 8
+    assert len(seen) == 8
@@ -0,0 +1,19 @@
+from score_cache import ScoreCache, text_hash
+
+
+def test_saved_cache_loads_in_lru_order(tmp_path):
+    path = str(tmp_path / "scores.json")
+    cache = ScoreCache(maxsize=3)
+    for i in range(3):
+        cache.put(text_hash(f"leak {i}", "v1"), i / 10)
+    cache.get(text_hash("leak 0", "v1"))
+    cache.save(path)
+
+    restored = ScoreCache(maxsize=2)
+    assert restored.load(path) == 3
+    # leak 1 was least recently used, so the smaller cache dropped it.
+    assert restored.get(text_hash("leak 1", "v1")) is None
+    assert restored.get_many([text_hash("leak 0", "v1"), text_hash("leak 2", "v1")]) == {
+        text_hash("leak 0", "v1"): 0.0, text_hash("leak 2", "v1"): 0.2,
+    }
+    assert ScoreCache().load(str(tmp_path / "missing.json")) == 0
@@ -0,0 +1,20 @@
+import synthetic_data
+from synthetic_data import generate_entries
+
+
+def test_reposts_get_fresh_ids_and_copy_recent_originals(monkeypatch):
+    monkeypatch.setattr(synthetic_data, "REPOST_WINDOW", 5)
+    entries = list(generate_entries(2000, seed=3, dup_rate=0.5))
+    assert len({e["id"] for e in entries}) == len(entries)
+    assert entries == list(generate_entries(2000, seed=3, dup_rate=0.5))
+
+    originals, reposts = [], 0
+    for entry in entries:
+        text = entry["content"]
+        if text in originals:
+            # Only the last REPOST_WINDOW originals can be reposted.
+            assert text in originals[-5:]
+            reposts += 1
+        else:
+            originals.append(text)
+    assert 800 < reposts < 1200
@@ -1,5 +1,40 @@
-from leak_detector_ml import LeakDetectorML
+import argparse
+import os
+import shutil
+
+from compiled_model import export_compiled_model
+from leak_detector_ml import DEFAULT_TRAIN_CHUNK_SIZE, LeakDetectorML
+
+MODEL_PATH = "../models/leak_model.pkl"
+COMPILED_MODEL_PATH = "../models/leak_model_compiled"
+TRAINING_DATA = "../models/training_data.csv"
 
 if __name__ == "__main__":
-    detector = LeakDetectorML(model_path="../models/leak_model.pkl")
-    detector.train_model_from_csv("../models/training_data.csv", label_field="label")
+    parser = argparse.ArgumentParser(description="Train the leak model")
+    parser.add_argument("data", nargs="?", default=TRAINING_DATA,
+                        help="Labelled training file (.csv; with --stream also .json, .ndjson)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Out-of-core training in fixed memory; updates the saved model "
+                             "(which must be a streaming one; see --fresh)")
+    parser.add_argument("--fresh", action="store_true",
+                        help="With --stream, start a new model instead of updating the saved one")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_TRAIN_CHUNK_SIZE,
+                        help="Rows per training step with --stream")
+    args = parser.parse_args()
+
+    detector = LeakDetectorML(model_path=MODEL_PATH)
+    if not args.stream:
+        detector.train_model_from_csv(args.data, label_field="label")
+
+        # Compact, memory-mappable copy for fast, sklearn-free loading (see compiled_model.py)
+        export_compiled_model(detector.model, COMPILED_MODEL_PATH, detector.model_version)
+        print(f"[INFO] Compiled model written to {COMPILED_MODEL_PATH}")
+    else:
+        detector.train_model_streaming(args.data, label_field="label",
+                                       chunk_size=args.chunk_size, update=not args.fresh)
+
+        # The compiled format covers TF-IDF models only; drop the export of
+        # the previous model so the API does not keep serving it.
+        if os.path.isdir(COMPILED_MODEL_PATH):
+            shutil.rmtree(COMPILED_MODEL_PATH)
+            print(f"[INFO] Removed stale compiled model {COMPILED_MODEL_PATH}")
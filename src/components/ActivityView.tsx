@@ -130,7 +130,7 @@ export function ActivityView() {
       .catch((err) => console.error('Failed to load summary', err));
 
     // Detailed leaks
-    fetch('http://127.0.0.1:8000/api/leaks')
+    fetch('http://127.0.0.1:8000/api/leaks?exclude=content')
       .then((res) => res.json())
       .then(setLeaks)
       .catch((err) => console.error('Failed to load leaks', err));
@@ -7,6 +7,20 @@ const fallbackData = [
   { timestamp: "2025-11-08 09:18:42", ipAddress: "10.0.0.25", severity: "High", source: "github.com", type: "API Key", size: "45MB", alert: 9 },
 ];
 
+// Most recent threats kept in the feed
+const MAX_THREATS = 200;
+
+// Map backend fields -> frontend table format
+const formatThreat = (item: any) => ({
+  timestamp: item.leaked_date || "N/A",
+  ipAddress: "—", // Backend has no IP field; placeholder
+  severity: item.severity || "Unknown",
+  source: item.source || "Unknown",
+  type: item.patterns?.join(", ") || "Leak",
+  size: item.size || `${item.risk_score}MB`,
+  alert: item.risk_score || 0,
+});
+
 const getSeverityColor = (severity: string) => {
   switch (severity) {
     case "critical":
@@ -49,34 +63,50 @@ export function LiveThreatFeed() {
   const [threats, setThreats] = useState(fallbackData);
 
   useEffect(() => {
-    async function fetchLeaks() {
+    let stream: EventSource | null = null;
+    let cancelled = false;
+
+    // Load the newest MAX_THREATS leaks, then stream the ones after them
+    async function connect() {
+      stream?.close();
+      let lastId: number | null = null;
       try {
-        const res = await fetch("http://127.0.0.1:8000/api/leaks");
+        const res = await fetch(
+          `http://127.0.0.1:8000/api/leaks?sort=-id&limit=${MAX_THREATS}&exclude=content,description`
+        );
         const data = await res.json();
+        // Event ids are store positions, so the newest leak's is total - 1
+        const total = res.headers.get("X-Total-Count");
+        if (total !== null) lastId = Number(total) - 1;
 
         if (!Array.isArray(data) || data.length === 0) {
           console.warn("API returned no data, using fallback");
-          return;
+        } else {
+          setThreats(data.map(formatThreat));
         }
-
-        // Map backend fields -> frontend table format
-        const formatted = data.map((item: any) => ({
-          timestamp: item.leaked_date || "N/A",
-          ipAddress: "—", // Backend has no IP field; placeholder
-          severity: item.severity || "Unknown",
-          source: item.source || "Unknown",
-          type: item.patterns?.join(", ") || "Leak",
-          size: item.size || `${item.risk_score}MB`,
-          alert: item.risk_score || 0,
-        }));
-
-        setThreats(formatted);
       } catch (err) {
         console.error("Failed loading leaks:", err);
       }
+      if (cancelled) return;
+
+      // New leaks are pushed by the backend as they are scored; the browser
+      // resumes from the last event it saw (Last-Event-ID) on reconnect
+      const resume = lastId === null ? "" : `?last_event_id=${lastId}`;
+      stream = new EventSource(`http://127.0.0.1:8000/api/leaks/stream${resume}`);
+      stream.addEventListener("leak", (event) => {
+        const threat = formatThreat(JSON.parse((event as MessageEvent).data));
+        setThreats((prev) => [threat, ...prev].slice(0, MAX_THREATS));
+      });
+      // We fell behind the server's backlog: reload the feed
+      stream.addEventListener("overflow", () => connect());
     }
 
-    fetchLeaks();
+    connect();
+
+    return () => {
+      cancelled = true;
+      stream?.close();
+    };
   }, []);
 
   return (
@@ -147,7 +147,7 @@ export function ReportsView() {
   try {
     const [summaryRes, leaksRes] = await Promise.all([
       fetch("http://127.0.0.1:8000/api/summary"),
-      fetch("http://127.0.0.1:8000/api/leaks"),
+      fetch("http://127.0.0.1:8000/api/leaks?fields=source,risk_level"),
     ]);
 
     const summaryData: SummaryResponse = await summaryRes.json();